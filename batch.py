@@ -0,0 +1,373 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Batch evaluation of a trace over many rows of inputs.
+# The inputs of the trace are bound to columns (numpy arrays, one value per
+# row), each node is evaluated once for the whole batch: builtin operators on
+# numeric columns run as numpy operations, the other nodes run per row.
+# Integer results that overflow the fixed width numpy ints are computed again
+# as Python ints.
+# batch_call traces a function on one row, evaluates the trace on all rows,
+# and traces again for the rows whose guards (the conversions done while
+# tracing, e.g. the bool of an if) give other results.
+
+import inspect
+import numbers
+import numpy as np
+from traced import Traced, DeepTraced, BuiltinOp1, BuiltinOp2, SetAttr, Call, \
+        Function, from_traced
+from evaluator import Evaluator
+from jit import recording_guards, traced_call
+
+
+class Column:
+    """ The values of a node for each row of a batch """
+    __slots__ = ('values', '_rows')
+
+    def __init__(self, values):
+        self.values = values
+        self._rows = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"Column({self.values!r})"
+
+    def row(self, index):
+        """ The value of a row, numbers as Python numbers """
+        values = self.values
+        if values.ndim == 1 and values.dtype != object:
+            return values[index].item()
+        return values[index]
+
+    def rows(self):
+        """ The values as a list, numbers as Python numbers """
+        if self._rows is None:
+            values = self.values
+            if values.ndim == 1 and values.dtype != object:
+                self._rows = values.tolist()
+            else:
+                self._rows = list(values)
+        return self._rows
+
+
+# values of the numeric operands of vectorized operators
+NUMBER_TYPES = (numbers.Number, np.number, np.bool_)
+# Python ints of this range are vectorized as numpy int64
+INT64_MIN, INT64_MAX = -2**63, 2**63-1
+# operators which keep bools (the others see bools as ints, as Python does)
+LOGICAL_OP_NAMES = frozenset(('__and__', '__or__', '__xor__',
+                              '__rand__', '__ror__', '__rxor__'))
+
+def column_of(values):
+    """ Column array of the per row values, numbers give a numeric array """
+    if (all(isinstance(value, NUMBER_TYPES) for value in values) and
+        # Python ints beyond int64 stay exact
+        not any(isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX 
+                for value in values)):
+        return np.array(values)
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+class BatchEvaluator(Evaluator):
+    """ Evaluates a trace for n_rows rows: the values of the input nodes are
+    columns, the value of a node is a Column when it depends on an input.
+    Builtin operators on numeric columns are vectorized (with numpy's fixed
+    width numbers), the other nodes are evaluated per row. """
+    def __init__(self, inputs, columns):
+        super().__init__()
+        self.n_rows = None
+        for node, column in zip(inputs, columns):
+            if not isinstance(column, Column):
+                column = Column(np.asarray(column))
+            if self.n_rows is None:
+                self.n_rows = len(column)
+            elif len(column) != self.n_rows:
+                raise ValueError(f"columns of {self.n_rows} and {len(column)} rows")
+            self.self2value[id(node)] = column
+        # indices of the rows still evaluated, see select
+        self.rows = np.arange(self.n_rows or 0)
+        self.n_vectorized = 0
+        self.n_per_row = 0
+
+    def select(self, mask):
+        """ Continue with the rows of mask, e.g. the rows that pass a guard """
+        for key, value in self.self2value.items():
+            if isinstance(value, Column):
+                self.self2value[key] = Column(value.values[mask])
+        self.rows = self.rows[mask]
+        self.n_rows = len(self.rows)
+
+    def check(self, guards):
+        """ Keep the rows for which the (node, conversion method name, value)
+        guards give the recorded values, in the order they were recorded """
+        for node, method_name, value in guards:
+            converted = self(node)
+            if not isinstance(converted, Column):
+                continue
+            values = converted.values
+            if method_name == '__bool__' and values.dtype != object:
+                mask = values.astype(bool) == value
+            else:
+                mask = np.array([getattr(v, method_name)() == value
+                                 for v in converted.rows()], dtype=bool)
+            if not mask.all():
+                self.select(mask)
+
+    def output(self, traced):
+        """ Array of the values of traced, one per row """
+        value = self(traced) if isinstance(traced, Traced) else traced
+        if isinstance(value, Column):
+            return value.values
+        if isinstance(value, NUMBER_TYPES):
+            return np.full(self.n_rows, value)
+        return column_of([value] * self.n_rows)
+
+    def per_row(self, function, operands):
+        """ Column of function applied to the operands of each row """
+        self.n_per_row += 1
+        operand_rows = [operand.rows() if isinstance(operand, Column) else None
+                        for operand in operands]
+        return Column(column_of([
+            function(*[operand if rows is None else rows[row]
+                       for operand, rows in zip(operands, operand_rows)])
+            for row in range(self.n_rows)]))
+
+    def vectorized(self, function, operands, keep_bool=False):
+        """ Column of function applied to numeric columns, or None """
+        arrays = list()
+        for operand in operands:
+            if isinstance(operand, Column):
+                values = operand.values
+                if values.dtype.kind not in 'biufc':
+                    return None
+                if values.dtype.kind == 'b' and not keep_bool:
+                    values = values.astype(int)
+                arrays.append(values)
+            elif isinstance(operand, NUMBER_TYPES):
+                arrays.append(operand)
+            else:
+                return None
+        try:
+            with np.errstate(all='raise'):
+                values = function(*arrays)
+        except (TypeError, ValueError, ArithmeticError):
+            # e.g. negative powers of ints, or division by zero
+            return None
+        if not isinstance(values, np.ndarray) or values.shape[:1] != (self.n_rows,):
+            return None
+        if values.dtype.kind in 'iu':
+            values = self.exact_integers(function, arrays, values)
+            if values is None:
+                return None
+        self.n_vectorized += 1
+        return Column(values)
+
+    def exact_integers(self, function, arrays, values):
+        """ The integer values of function, or when they may have wrapped 
+        around (fixed width numpy ints), its exact values as Python ints 
+        (an object array), or None """
+        info = np.iinfo(values.dtype)
+        try:
+            # the same in floats, precise enough to tell overflows
+            with np.errstate(all='ignore'):
+                approximated = function(*[array.astype(float) if isinstance(array, np.ndarray)
+                                          else float(array) for array in arrays])
+            margin = 1 - 2.0**-40
+            if np.all((approximated >= info.min * margin) & 
+                      (approximated <= info.max * margin)):
+                return values
+        except (TypeError, ValueError, ArithmeticError):
+            # e.g. bitwise operators
+            pass
+        try:
+            exact = function(*[array.astype(object) if isinstance(array, np.ndarray) 
+                               else array for array in arrays])
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+        if not isinstance(exact, np.ndarray) or exact.shape != values.shape:
+            return None
+        return values if (exact == values).all() else exact
+
+    def op1(self, traced, op1):
+        if not isinstance(op1, Column):
+            return super().op1(traced, op1)
+        if isinstance(traced, SetAttr):
+            return op1
+        if isinstance(traced, BuiltinOp1):
+            column = self.vectorized(traced._op1o, (op1,))
+            if column is not None:
+                return column
+        return self.per_row(traced._op1o, (op1,))
+
+    def op2(self, traced, op1, op2):
+        if not isinstance(op1, Column) and not isinstance(op2, Column):
+            return super().op2(traced, op1, op2)
+        if isinstance(traced, BuiltinOp2):
+            column = self.vectorized(traced._op2o, (op1, op2),
+                                     traced._name in LOGICAL_OP_NAMES)
+            if column is not None:
+                return column
+        return self.per_row(traced._op2o, (op1, op2))
+
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        operands = [evaled_callable] + evaled_args + list(evaled_kwargs.values())
+        if not any(isinstance(operand, Column) for operand in operands):
+            return super().ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+        names = list(evaled_kwargs)
+        n_args = len(evaled_args)
+        def call(callable_, *values):
+            return callable_(*values[:n_args], **dict(zip(names, values[n_args:])))
+        if isinstance(evaled_callable, np.ufunc):
+            column = self.vectorized(lambda *values: call(evaled_callable, *values),
+                                     operands[1:])
+            if column is not None:
+                return column
+        return self.per_row(call, operands)
+
+    def udispatch(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return self.ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+
+    def argument(self, traced, tag, trace):
+        # the value given to the call, guards are evaluated out of their call
+        return self(trace)
+
+    def obj(self, traced):
+        # an object per row
+        cls = traced._value.__class__
+        return Column(column_of([cls.__new__(cls) for _ in range(self.n_rows)]))
+
+    def new_init(self, call_env, traced):
+        attributes = {name: self(traced_attribute)
+                      for name, traced_attribute in traced._trace._attributes.items()}
+        objs = self(traced._trace)
+        for row, obj in enumerate(objs.rows()):
+            obj.__dict__ = {name: value.rows()[row] if isinstance(value, Column) else value
+                            for name, value in attributes.items()}
+        return objs
+
+    def deeptraced(self, traced):
+        columns = list()
+        value = self.structure_row(traced._traced_value, None, columns)
+        if not columns:
+            return value
+        return self.per_row(lambda row: self.structure_row(traced._traced_value, row, columns),
+                            (Column(np.arange(self.n_rows)),))
+
+    def structure_row(self, value, row, columns):
+        """ A structure that may hold traced nodes, with the values of row.
+        Without row, columns are kept and appended to columns. """
+        match value:
+            case Traced():
+                value = self(value)
+                if not isinstance(value, Column):
+                    return value
+                if row is None:
+                    columns.append(value)
+                    return value
+                return value.rows()[row]
+            case tuple():
+                return tuple(self.structure_row(e, row, columns) for e in value)
+            case list():
+                return [self.structure_row(e, row, columns) for e in value]
+            case slice():
+                return slice(self.structure_row(value.start, row, columns),
+                             self.structure_row(value.stop, row, columns),
+                             self.structure_row(value.step, row, columns))
+            case frozenset():
+                return frozenset(self.structure_row(e, row, columns) for e in value)
+            case dict():
+                return {self.structure_row(k, row, columns):
+                        self.structure_row(v, row, columns)
+                        for k, v in value.items()}
+            case _:
+                return value
+
+
+def batch_call(func, *columns, **kwcolumns):
+    """ Values of a traced function for each row of the columns of its
+    arguments: an array, or a tuple of arrays when func returns a tuple.
+    The function is traced on the first row, the trace is evaluated on all
+    rows, and traced again for the first row that fails a guard. """
+    func = from_traced(func)
+    signature = inspect.signature(func)
+    bound = signature.bind(*columns, **kwcolumns)
+    for name in bound.arguments:
+        if signature.parameters[name].kind in (inspect.Parameter.VAR_POSITIONAL,
+                                               inspect.Parameter.VAR_KEYWORD):
+            raise TypeError(f"{func.__name__}: *args and **kwargs are not batched")
+    if not bound.arguments:
+        raise TypeError(f"{func.__name__}: no argument columns")
+    columns = {name: Column(np.asarray(column))
+               for name, column in bound.arguments.items()}
+    n_rows = len(next(iter(columns.values())))
+    # the (rows, outputs) of each trace
+    pieces = list()
+    remaining = np.arange(n_rows)
+    while len(remaining):
+        first = remaining[0]
+        row = inspect.BoundArguments(signature, {name: column.row(first)
+                                                 for name, column in columns.items()})
+        with recording_guards() as guards:
+            result = Function(func)(*row.args, **row.kwargs)
+        call = traced_call(result)
+        if not isinstance(call, Call):
+            raise TypeError(f"{func.__name__} is not a function of a traced module")
+        args = list(call._args) + list(call._kwargs.values())
+        inputs = [arg for arg in args if arg._tag.name in columns]
+        evaluator = BatchEvaluator(inputs, [columns[arg._tag.name].values[remaining]
+                                            for arg in inputs])
+        for arg in args:
+            if arg._tag.name not in columns:
+                # defaults, the same for all rows
+                evaluator.self2value[id(arg)] = arg._value
+        evaluator.check(guards)
+        if not len(evaluator.rows) or evaluator.rows[0] != 0:
+            raise RuntimeError(f"{func.__name__} traced differently on the same row")
+        returned = call._trace
+        if isinstance(returned, DeepTraced) and isinstance(returned._traced_value, tuple):
+            outputs = tuple(map(evaluator.output, returned._traced_value))
+        else:
+            outputs = evaluator.output(returned)
+        done = remaining[evaluator.rows]
+        pieces.append((done, outputs))
+        remaining = np.setdiff1d(remaining, done, assume_unique=True)
+    if len(pieces) == 1:
+        return pieces[0][1]
+    if len({len(outputs) if isinstance(outputs, tuple) else None 
+            for _, outputs in pieces}) != 1:
+        raise TypeError(f"{func.__name__} returns values of different shapes")
+    rows = np.concatenate([done for done, _ in pieces])
+    def gathered(outputs):
+        values = np.concatenate(outputs)
+        result = np.empty_like(values)
+        result[rows] = values
+        return result
+    if isinstance(pieces[0][1], tuple):
+        return tuple(map(gathered, zip(*(outputs for _, outputs in pieces))))
+    return gathered([outputs for _, outputs in pieces])
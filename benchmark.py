@@ -0,0 +1,789 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Micro benchmarks of the tracing machinery.
+# Run with: python benchmark.py > bench_output.txt
+
+import gc
+import random
+import sys
+import time
+import types
+import tracemalloc
+from traced import Hashable, DeepTraced, GetItem, GetAttr, Argument, Attribute, \
+        Arg, Generation, Generator, trace_fields, trace, signature_helper, \
+        is_traced_value, TRACED_MODULE_NAMES, Traced, get_field, \
+        resolve_trace_field, interning, trace_modules, TRACE_OBSERVERS, type_kind
+from evaluator import Evaluator, Env
+from compiler import Compiler, SourceCompiler, upstream_nodes
+from jit import jit
+from optimize import optimize
+from batch import batch_call
+from constraints import BuildUpstreamConstraints, Arg2Content, streaming_constraints
+from solver import Solver, TypeLattice
+from export import export_trace
+from render import Render, DotWriter
+import io
+import numpy as np
+import collections.abc
+
+N_NODES = 100000
+
+
+def allocated_bytes(make, n):
+    """ Bytes allocated per object when making n objects with make(i) """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [None] * n
+    for i in range(n):
+        objs[i] = make(i)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n
+
+
+def as_dict_layout(node):
+    """ The same fields as node, but stored in a per instance __dict__ """
+    DictNode = type('Dict'+node.__class__.__name__, (), {})
+    def make(_):
+        obj = DictNode()
+        obj.__dict__.update(trace_fields(node))
+        return obj
+    return make
+
+
+def bench_node_memory(n=N_NODES):
+    """ Memory per node, slots layout versus an equivalent __dict__ layout """
+    leaf = Hashable(1)
+    items = DeepTraced([leaf, leaf], [1, 1])
+    arg = Arg('POSITIONAL_OR_KEYWORD', 'x')
+    attr = Attribute('real')
+    generator = Generator(iter(()))
+    node_makers = {
+        'Hashable': lambda i: Hashable(1),
+        'Argument': lambda i: Argument(arg, leaf),
+        'GetAttr': lambda i: GetAttr(attr, leaf),
+        'GetItem': lambda i: GetItem(items, leaf),
+        'Generation': lambda i: Generation(generator, 0, 1, leaf),
+    }
+    print(f"node memory ({n} nodes, bytes per node)")
+    print(f"  {'node':12} {'slots':>8} {'dict':>8}")
+    for name, make in node_makers.items():
+        slots_bytes = allocated_bytes(make, n)
+        dict_bytes = allocated_bytes(as_dict_layout(make(0)), n)
+        print(f"  {name:12} {slots_bytes:8.1f} {dict_bytes:8.1f}")
+
+
+def timed(f, repeat=5):
+    """ Best wall time of f() over repeat runs """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_operators(n=10000):
+    """ Tracing cost per operator, direct operator nodes versus dispatch """
+    def dispatch_add(a, b):
+        # how operators were traced before: GetAttr, then an untraced dispatch
+        op_name = a._value.__add__.__reduce__()[1][1]
+        return GetAttr(Attribute(op_name), a)(trace(b))
+
+    def chain_direct():
+        x = trace(1)
+        for i in range(n):
+            x = x + i
+        return x
+
+    def chain_dispatch():
+        x = trace(1)
+        for i in range(n):
+            x = dispatch_add(x, i)
+        return x
+
+    direct = timed(chain_direct)
+    dispatch = timed(chain_dispatch)
+    print(f"operator tracing ({n} additions, usec per operator)")
+    print(f"  direct op node {1e6*direct/n:8.2f}")
+    print(f"  dispatch       {1e6*dispatch/n:8.2f}  ({dispatch/direct:.1f}x)")
+
+
+def bench_binder(n=100000):
+    """ Argument binding per call, generated binder versus inspect """
+    def method_like(self, y, z=0, *args, scale=1, **kwargs):
+        pass
+    sighelper = signature_helper(method_like)
+    signature = sighelper.signature
+    bind = sighelper.bind
+    args = (None, 5)
+    kwargs = {'z': 2, 'scale': 3}
+
+    def inspect_bind():
+        for _ in range(n):
+            bound_args = signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            tuple(bound_args.arguments.values())
+
+    def generated_bind():
+        for _ in range(n):
+            bind(*args, **kwargs)
+
+    inspected = timed(inspect_bind)
+    generated = timed(generated_bind)
+    print(f"argument binding ({n} calls, usec per call)")
+    print(f"  inspect bind   {1e6*inspected/n:8.2f}")
+    print(f"  generated      {1e6*generated/n:8.2f}  ({inspected/generated:.1f}x)")
+
+
+def bench_routing(n=100000):
+    """ Traced or untraced call routing, cached versus classifying each call """
+    def classify(value):
+        # the checks done on every call before routing was cached
+        return ((isinstance(value, type) and 
+                 value.__module__ in TRACED_MODULE_NAMES) or 
+                value.__class__.__module__ in TRACED_MODULE_NAMES)
+    values = [1, 'a', (1,), Hashable, Hashable(1)]
+
+    def classified():
+        for _ in range(n):
+            for value in values:
+                classify(value)
+
+    def cached():
+        for _ in range(n):
+            for value in values:
+                is_traced_value(value)
+
+    classified_time = timed(classified)
+    cached_time = timed(cached)
+    m = n*len(values)
+    print(f"call routing ({m} routes, nsec per route)")
+    print(f"  classify       {1e9*classified_time/m:8.1f}")
+    print(f"  cached         {1e9*cached_time/m:8.1f}  ({classified_time/cached_time:.1f}x)")
+
+
+def bench_wrapping(n=100000):
+    """ Wrapping untraced values, type dispatch table versus ABC checks """
+    def abc_to_traced(value):
+        # the checks done on every value before the type dispatch table
+        if isinstance(value, Traced):
+            return value
+        elif isinstance(value, (tuple, list, slice, frozenset, dict)):
+            return None
+        elif isinstance(value, collections.abc.Generator):
+            return Generator(value)
+        elif isinstance(value, collections.abc.Hashable):
+            return Hashable(value)
+        else:
+            return Traced(value)
+    values = [1, 2.5, 'a', None, bytearray()]
+
+    def abc_checked():
+        for _ in range(n):
+            for value in values:
+                abc_to_traced(value)
+
+    def dispatched():
+        for _ in range(n):
+            for value in values:
+                trace(value)
+
+    def abc_kinds():
+        # the classification alone, without building the nodes
+        for _ in range(n):
+            for value in values:
+                (isinstance(value, Traced), 
+                 isinstance(value, (tuple, list, slice, frozenset, dict)),
+                 isinstance(value, collections.abc.Generator),
+                 isinstance(value, collections.abc.Hashable))
+
+    def table_kinds():
+        for _ in range(n):
+            for value in values:
+                type_kind(type(value))
+
+    checked_time = timed(abc_checked)
+    dispatched_time = timed(dispatched)
+    abc_kinds_time = timed(abc_kinds)
+    table_kinds_time = timed(table_kinds)
+    m = n*len(values)
+    print(f"value wrapping ({m} values, nsec per value)")
+    print(f"  abc checks     {1e9*checked_time/m:8.1f}")
+    print(f"  type table     {1e9*dispatched_time/m:8.1f}  ({checked_time/dispatched_time:.1f}x)")
+    print(f"  classification only")
+    print(f"  abc checks     {1e9*abc_kinds_time/m:8.1f}")
+    print(f"  type table     {1e9*table_kinds_time/m:8.1f}  ({abc_kinds_time/table_kinds_time:.1f}x)")
+
+
+def bench_chain_fields(n=10000, chain_lengths=(1, 10, 100)):
+    """ Field access through _trace chains, memoized versus walking the chain """
+    def walk(t, name):
+        # how fields were looked up before they were memoized
+        while t is not None:
+            if name in t._trace_field_set:
+                value = get_field(t, name, None)
+                if value is not None:
+                    return value
+            t = get_field(t, '_trace')
+
+    print(f"trace chain field access ({n} lookups, nsec per lookup)")
+    print(f"  {'chain':>8} {'walk':>8} {'memo':>8}")
+    for chain_length in chain_lengths:
+        t = trace((trace(1), 2))
+        for _ in range(chain_length):
+            t = Hashable(t._value, t)
+        def walked():
+            for _ in range(n):
+                walk(t, '_traced_value')
+        def memoized():
+            for _ in range(n):
+                resolve_trace_field(t, '_traced_value')
+        walk_time = timed(walked)
+        memo_time = timed(memoized)
+        print(f"  {chain_length:8} {1e9*walk_time/n:8.1f} {1e9*memo_time/n:8.1f}")
+
+
+def bench_interning(n_runs=200, n_range=20):
+    """ Nodes and memory of the show_render examples, with and without interning """
+    import show_render
+    trace_modules(['show_render'])
+
+    def run():
+        traces = list()
+        for _ in range(n_runs):
+            traces.append(show_render.simple01(trace({'a': trace(3)})))
+            traces.append(show_render.simple03(1, n_range))
+        return traces
+
+    def measure(interned):
+        node_count = 0
+        def count(node):
+            nonlocal node_count
+            node_count += 1
+        gc.collect()
+        TRACE_OBSERVERS.append(count)
+        tracemalloc.start()
+        if interned:
+            with interning():
+                traces = run()
+        else:
+            traces = run()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        TRACE_OBSERVERS.remove(count)
+        return node_count, size
+
+    plain_nodes, plain_size = measure(False)
+    interned_nodes, interned_size = measure(True)
+    print(f"interning (show_render examples, {n_runs} runs)")
+    print(f"  {'':12} {'nodes':>8} {'KiB':>8}")
+    print(f"  {'plain':12} {plain_nodes:8} {plain_size/1024:8.0f}")
+    print(f"  {'interned':12} {interned_nodes:8} {interned_size/1024:8.0f}")
+
+
+def bench_evaluator(chain_length=10000, diamond_depth=20):
+    """ Evaluation of long and of shared traces, which the recursive
+    evaluator could not do (recursion limit, one evaluation per path) """
+    chain = trace(0)
+    for _ in range(chain_length):
+        chain = chain + 1
+    diamond = trace(1)
+    for _ in range(diamond_depth):
+        diamond = diamond + diamond
+    chain_time = timed(lambda: Evaluator()(chain))
+    diamond_time = timed(lambda: Evaluator()(diamond))
+    print("evaluator (usec per node)")
+    print(f"  chain of {chain_length:<6} {1e6*chain_time/chain_length:8.2f}"
+          f"  (recursive: over recursion limit)")
+    print(f"  diamond of {diamond_depth:<4} {1e6*diamond_time/diamond_depth:8.2f}"
+          f"  (recursive: {2**diamond_depth} evaluations)")
+
+
+def traced_module(name, source, tiered=None):
+    """ A traced module made from source """
+    if name in sys.modules:
+        return sys.modules[name]
+    module = types.ModuleType(name)
+    exec(source, module.__dict__)
+    sys.modules[name] = module
+    trace_modules([name], tiered=tiered)
+    return module
+
+
+RECURSION_SOURCE = """
+def sum_to(n, a=0, b=0, c=0, d=0):
+    if n == 0:
+        return a
+    return sum_to(n - 1, a + n, b, c, d)
+"""
+
+class CopyEnvEvaluator(Evaluator):
+    """ The evaluator with the parent env copied into each call env """
+    def __init__(self):
+        super().__init__()
+        self.env = [dict()]
+
+    def new_env(self, args, kwargs):
+        call_env = dict(self.env[-1])
+        call_env.update((arg._tag, self(arg._trace)) for arg in args)
+        call_env.update((arg._tag, self(arg._trace)) for arg in kwargs.values())
+        return call_env
+
+
+def bench_env(depths=(100, 400)):
+    """ Evaluation of deep recursion traces, chained env frames versus copies """
+    module = traced_module('bench_recursion', RECURSION_SOURCE)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20*max(depths)))
+    print("call env (recursive calls, usec per call)")
+    print(f"  {'depth':>8} {'copied':>8} {'chained':>8}")
+    for depth in depths:
+        r = module.sum_to(depth)
+        copied = timed(lambda: CopyEnvEvaluator()(r))
+        chained = timed(lambda: Evaluator()(r))
+        print(f"  {depth:8} {1e6*copied/depth:8.2f} {1e6*chained/depth:8.2f}")
+    # a tag bound by the outermost frame, looked up from the innermost
+    n = 10000
+    for depth in depths:
+        env = Env({('a', 0): 0})
+        for i in range(1, depth):
+            env = Env({('a', i): i}, env)
+        env[('a', 0)]
+        walked = timed(lambda: [env.found.clear() or env[('a', 0)] for _ in range(n)])
+        cached = timed(lambda: [env[('a', 0)] for _ in range(n)])
+        print(f"  enclosing lookup, {depth} frames up: walked {1e6*walked/n:.2f}"
+              f" cached {1e6*cached/n:.2f} usec")
+
+
+ADDERS_SOURCE = """
+class AddX:
+    def __init__(self, x):
+        self.x = x
+
+    def add_to(self, y, z=0):
+        return self.x + y + z
+
+class AddX2:
+    def __init__(self, x):
+        self.add10 = AddX(x)
+
+    def add_to(self, y, z=0):
+        return self.add10.add_to(y, z)
+"""
+
+def bench_codegen(scale=50, n=2000):
+    """ Compiled trace runs, closures versus generated source, on the
+    test_compiler cases scaled up """
+    module = traced_module('bench_adders', ADDERS_SOURCE)
+    adder = module.AddX2(10)
+    total = trace(0)
+    for i in range(scale):
+        total = adder.add_to(total, z=i)
+    a = trace(2)
+    expression = a
+    for i in range(scale):
+        expression = (expression+3)*a - a**2
+    d = trace({'a': trace(1), 'b': 2})
+    items = trace(0)
+    for i in range(scale):
+        items = items + d['a']
+    print(f"compiled trace runs ({n} runs, usec per run)")
+    print(f"  {'case':12} {'closures':>9} {'source':>9}")
+    for name, t in (('dispatch', total), ('operators', expression),
+                    ('getitem', items)):
+        f_closures = Compiler()(t)
+        f_source = SourceCompiler()(t)
+        assert f_closures(()) == f_source(())
+        def run(f):
+            return lambda: [f(()) for _ in range(n)]
+        closures_time = timed(run(f_closures))
+        source_time = timed(run(f_source))
+        print(f"  {name:12} {1e6*closures_time/n:9.2f} {1e6*source_time/n:9.2f}"
+              f"  ({closures_time/source_time:.1f}x)")
+
+
+class VarStackCompiler(Compiler):
+    """ The compiler with arguments on a linked (args, var_stack) stack """
+    def __call__(self, traced):
+        # no frame allocation, compiled closures take the var stack
+        return Evaluator.__call__(self, traced)
+
+    def build_access(self, id_):
+        depth, j = self.env[-1].locate(id_)
+        def by_depth(i):
+            if i == 0:
+                return lambda var_stack: var_stack[0][j]
+            else:
+                next_level = by_depth(i-1)
+                return lambda var_stack: next_level(var_stack[1])
+        return by_depth(depth)
+
+    def push_to_var_stack(self, call_env):
+        f_args = list(call_env.values())
+        def new_args(var_stack):
+            return tuple(f_arg(var_stack) for f_arg in f_args)
+        return lambda var_stack: (new_args(var_stack), var_stack)
+
+
+def bench_slots(depths=(50, 200), n=200):
+    """ Compiled recursion traces, flat frame slots versus linked var stack """
+    module = traced_module('bench_recursion', RECURSION_SOURCE)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20*max(depths)))
+    print(f"compiled argument access ({n} runs, usec per traced call)")
+    print(f"  {'depth':>8} {'linked':>8} {'slots':>8}")
+    for depth in depths:
+        r = module.sum_to(depth)
+        f_linked = VarStackCompiler()(r)
+        f_slots = Compiler()(r)
+        assert f_linked(()) == f_slots(())
+        linked = timed(lambda: [f_linked(()) for _ in range(n)])
+        slots = timed(lambda: [f_slots(()) for _ in range(n)])
+        print(f"  {depth:8} {1e6*linked/(n*depth):8.2f} {1e6*slots/(n*depth):8.2f}")
+
+
+POLY_SOURCE = """
+def poly(x, y=2):
+    if x > 10:
+        return x * y + x
+    return (x + y) * (x - y)
+"""
+
+def bench_jit(n=2000):
+    """ Repeated calls of a traced function, traced and compiled at each call
+    versus the guarded specialization cache """
+    module = traced_module('bench_poly', POLY_SOURCE)
+    f_jit = jit(module.poly)
+    def retrace(x):
+        return f_jit.trace_and_compile((x,), {})[0]
+    inputs = [i % 20 for i in range(n)]
+    assert [retrace(x) for x in inputs] == [f_jit(x) for x in inputs]
+    retrace_time = timed(lambda: [retrace(x) for x in inputs])
+    jit_time = timed(lambda: [f_jit(x) for x in inputs])
+    print(f"jit calls ({n} calls, usec per call)")
+    print(f"  {'retrace':>8} {'cached':>8}")
+    print(f"  {1e6*retrace_time/n:8.2f} {1e6*jit_time/n:8.2f}"
+          f"  ({retrace_time/jit_time:.1f}x, {f_jit.cache_info()})")
+
+
+def bench_tiered(n=2000, warmup=3):
+    """ Calls from untraced code: always traced, tiered (after warmup), and
+    the plain Python function """
+    traced = traced_module('bench_poly', POLY_SOURCE)
+    tiered = traced_module('bench_poly_tiered', POLY_SOURCE, tiered=warmup)
+    native = types.ModuleType('bench_poly_native')
+    exec(POLY_SOURCE, native.__dict__)
+    inputs = [i % 20 for i in range(n)]
+    assert ([traced.poly(x)._value for x in inputs] == 
+            [tiered.poly(x) for x in inputs] == [native.poly(x) for x in inputs])
+    traced_time = timed(lambda: [traced.poly(x) for x in inputs])
+    tiered_time = timed(lambda: [tiered.poly(x) for x in inputs])
+    native_time = timed(lambda: [native.poly(x) for x in inputs])
+    print(f"tiered calls ({n} calls, usec per call, warmup {warmup})")
+    print(f"  {'traced':>8} {'tiered':>8} {'native':>8}")
+    print(f"  {1e6*traced_time/n:8.2f} {1e6*tiered_time/n:8.2f} {1e6*native_time/n:8.2f}"
+          f"  ({tiered.poly._tiered.cache_info()})")
+
+
+def bench_optimize(scale=50, n=2000):
+    """ Compiled trace runs before and after constant folding and pruning,
+    the input is the first value of the traced computation """
+    module = traced_module('bench_adders', ADDERS_SOURCE)
+    adder = module.AddX2(10)
+    start = trace(0)
+    total = start
+    for i in range(scale):
+        total = adder.add_to(total, z=i)
+    a = trace(2)
+    x = trace(3)
+    expression = x
+    for i in range(scale):
+        expression = (expression+3)*a - a**2
+    d = trace({('a', 'x'): 1, ('b', 'y'): 2})
+    items = trace(0)
+    for i in range(scale):
+        items = items + d[('a', 'x')] * d[('b', 'y')]
+    print(f"optimized traces ({n} compiled runs, usec per run)")
+    print(f"  {'case':12} {'nodes':>13} {'before':>8} {'after':>8}")
+    for name, t, input_, value in (('dispatch', total, start, 1), 
+                                   ('operators', expression, x, 1),
+                                   ('getitem', items, d, d._value)):
+        optimized, report = optimize(t, [input_])
+        f_before = SourceCompiler().compile(t, [input_])
+        f_after = SourceCompiler().compile(optimized, [input_])
+        assert f_before(value) == f_after(value)
+        before = timed(lambda: [f_before(value) for _ in range(n)])
+        after = timed(lambda: [f_after(value) for _ in range(n)])
+        nodes = f"{report['before']} -> {report['after']}"
+        print(f"  {name:12} {nodes:>13} {1e6*before/n:8.2f} {1e6*after/n:8.2f}")
+
+
+class UnrolledCompiler(SourceCompiler):
+    """ SourceCompiler without loops, a line per element """
+    def loop_source(self, elements, is_dict=False):
+        return None
+
+
+def bench_loops(sizes=(4, 32, 100, 1000), n=200):
+    """ Compiled comprehension over a list, one line per element or a loop:
+    source lines, compile time and run time. The list is an input, or a
+    constant (below SourceCompiler.min_trip_count elements it stays unrolled) """
+    print("compiled loops (usec per compile and per run)")
+    print(f"  {'list':>8} {'size':>6} {'lines':>13} {'compile':>17} {'run':>17}")
+    for list_kind in ('input', 'constant'):
+        for size in sizes:
+            l = trace(list(range(size)))
+            y = trace(3)
+            t = trace([e * y + 1 for e in l])
+            inputs, args = ((l, y), (l._value, 3)) if list_kind == 'input' else ((y,), (3,))
+            results = list()
+            for compiler_class in (UnrolledCompiler, SourceCompiler):
+                compiler = compiler_class()
+                compile_time = timed(lambda: compiler.compile(t, inputs), repeat=3)
+                f_value = compiler.compile(t, inputs)
+                assert f_value(*args) == t._value
+                run_time = timed(lambda: [f_value(*args) for _ in range(n)])
+                results.append((compiler.source.count('\n'), compile_time, run_time/n))
+            (lines0, compile0, run0), (lines1, compile1, run1) = results
+            print(f"  {list_kind:>8} {size:6} {lines0:6} -> {lines1:<4} "
+                  f"{1e6*compile0:8.0f} {1e6*compile1:8.0f} {1e6*run0:8.2f} {1e6*run1:8.2f}")
+
+
+def bench_batch(n=10000):
+    """ A traced function over n rows: traced per row, jit per row, and batch
+    evaluation of the columns (two traces, one per branch) """
+    module = traced_module('bench_poly', POLY_SOURCE)
+    f_jit = jit(module.poly)
+    x = np.arange(n) % 20
+    rows = x.tolist()
+    assert ([module.poly(v)._value for v in rows] == [f_jit(v) for v in rows] ==
+            batch_call(module.poly, x).tolist())
+    traced_time = timed(lambda: [module.poly(v) for v in rows], repeat=3)
+    jit_time = timed(lambda: [f_jit(v) for v in rows])
+    batch_time = timed(lambda: batch_call(module.poly, x))
+    print(f"batch evaluation ({n} rows, usec per row)")
+    print(f"  {'traced':>8} {'jit':>8} {'batch':>8}")
+    print(f"  {1e6*traced_time/n:8.2f} {1e6*jit_time/n:8.2f} {1e6*batch_time/n:8.3f}"
+          f"  ({jit_time/batch_time:.0f}x jit)")
+
+
+def bench_fusion(sizes=(1000, 100000, 1000000, 4000000), n_ops=10):
+    """ Compiled closures of a chain of elementwise operators on arrays, an
+    operator at a time versus fused kernels: run time and peak memory """
+    print(f"fused elementwise kernels ({2*n_ops} operators, msec and MB per run)")
+    print(f"  {'size':>8} {'unfused':>8} {'fused':>8} {'peak MB':>17}")
+    for size in sizes:
+        t = x = trace(np.random.rand(size))
+        for _ in range(n_ops):
+            t = t * 1.0001 + 0.5
+        results = list()
+        for fuse in (False, True):
+            f_value = Compiler(fuse=fuse)(t)
+            assert np.allclose(f_value(()), t._value)
+            run_time = timed(lambda: f_value(()))
+            tracemalloc.start()
+            f_value(())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((run_time, peak))
+        (time0, peak0), (time1, peak1) = results
+        print(f"  {size:8} {1e3*time0:8.3f} {1e3*time1:8.3f} "
+              f"{peak0/1e6:8.1f} {peak1/1e6:8.1f}")
+
+
+WIDE_SOURCE = """
+class Wide:
+    def __init__(self, n):
+        for i in range(int(n)):
+            setattr(self, f"a{i}", i)
+
+def wide(n):
+    return Wide(n)
+"""
+
+class ListConstraints(BuildUpstreamConstraints):
+    """ Constraints kept in a list per from node, checked for duplicates
+    by a linear search """
+    def add_constraint(self, constraint):
+        constraints = self.from_id_to_constraints.setdefault(
+                id(constraint.from_traced), list())
+        if constraint not in constraints:
+            constraints.append(constraint)
+
+
+def bench_constraints(widths=(500, 2000, 8000)):
+    """ Upstream constraints of an object with many attributes (out-edges of
+    one node), with lists versus the indexed store """
+    module = traced_module('bench_wide', WIDE_SOURCE)
+    print("upstream constraints (msec per object)")
+    print(f"  {'attrs':>8} {'lists':>8} {'store':>8}")
+    for width in widths:
+        t = module.wide(width)
+        times = list()
+        for builder in (ListConstraints, BuildUpstreamConstraints):
+            times.append(timed(lambda: builder()(t), repeat=1))
+        print(f"  {width:8} {1e3*times[0]:8.2f} {1e3*times[1]:8.2f}")
+
+
+def naive_types(constraints):
+    """ Types of the nodes of equality constraints, joined over all the
+    constraints until no type changes """
+    types = dict()
+    for constraint in constraints:
+        for node in (constraint.from_traced, constraint.to_traced):
+            types[id(node)] = frozenset((type(node._value),))
+    changed = True
+    while changed:
+        changed = False
+        for constraint in constraints:
+            from_id, to_id = id(constraint.from_traced), id(constraint.to_traced)
+            joined = types[from_id] | types[to_id]
+            if joined != types[from_id] or joined != types[to_id]:
+                types[from_id] = types[to_id] = joined
+                changed = True
+    return types
+
+
+def bench_solver(sizes=(1000, 10000, 100000), class_size=100, n_new=10):
+    """ Types over random equality constraints (classes of class_size nodes),
+    a naive loop over all constraints versus the worklist solver, then the
+    re-solve after n_new more constraints """
+    rng = random.Random(0)
+    print(f"constraint solving (classes of {class_size} nodes, msec per solve)")
+    print(f"  {'nodes':>8} {'naive':>9} {'solver':>9} {'re-solve':>9}")
+    for size in sizes:
+        nodes = [trace(i if rng.random() < 0.5 else float(i)) for i in range(size)]
+        constraints = [Arg2Content(nodes[i-1], nodes[i]) for i in range(size) 
+                       if i % class_size]
+        rng.shuffle(constraints)
+        new_constraints = [Arg2Content(rng.choice(nodes), rng.choice(nodes)) 
+                           for _ in range(n_new)]
+        naive_time = timed(lambda: naive_types(constraints), repeat=1)
+        solver = Solver([TypeLattice()])
+        solve_time = timed(lambda: solver.add_constraints(constraints).solve(), 
+                           repeat=1)
+        resolve_time = timed(lambda: solver.add_constraints(new_constraints).solve(),
+                             repeat=1)
+        print(f"  {size:8} {1e3*naive_time:9.2f} {1e3*solve_time:9.2f} "
+              f"{1e3*resolve_time:9.3f}")
+
+
+def bench_streaming(depths=(100, 400)):
+    """ Constraints of a recursive trace, extracted by an evaluator pass over
+    the trace versus streamed while tracing: time and peak memory """
+    module = traced_module('bench_recursion', RECURSION_SOURCE)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20*max(depths)))
+    def two_pass(depth):
+        buc = BuildUpstreamConstraints()
+        buc(module.sum_to(depth))
+        return buc.store
+    def streamed(depth):
+        with streaming_constraints() as observer:
+            module.sum_to(depth)
+        return observer.constraints
+    print("constraint extraction (recursive calls, msec and peak KiB per trace)")
+    print(f"  {'depth':>8} {'pass':>8} {'stream':>8} {'pass KiB':>9} {'stream KiB':>11}")
+    for depth in depths:
+        results = list()
+        for extract in (two_pass, streamed):
+            run_time = timed(lambda: extract(depth), repeat=3)
+            gc.collect()
+            tracemalloc.start()
+            extract(depth)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((run_time, peak))
+        (time0, peak0), (time1, peak1) = results
+        print(f"  {depth:8} {1e3*time0:8.2f} {1e3*time1:8.2f} "
+              f"{peak0/1024:9.0f} {peak1/1024:11.0f}")
+
+
+def bench_export(sizes=(10000, 100000, 1000000)):
+    """ Slice (the upstream nodes) of a balanced sum of size leaves: a walk
+    over the node objects versus the vectorized search over the export """
+    print("trace slicing (msec per slice, and per export)")
+    print(f"  {'nodes':>8} {'walk':>9} {'csr':>9} {'export':>9}")
+    for size in sizes:
+        level = [trace(i) for i in range(size)]
+        while len(level) > 1:
+            level = [level[i] + level[i+1] if i+1 < len(level) else level[i]
+                     for i in range(0, len(level), 2)]
+        root = level[0]
+        walk_time = timed(lambda: sum(1 for _ in upstream_nodes([root])), repeat=1)
+        export_time = timed(lambda: export_trace(root), repeat=1)
+        export = export_trace(root)
+        csr_time = timed(lambda: export.slice([root]))
+        print(f"  {len(export):8} {1e3*walk_time:9.2f} {1e3*csr_time:9.2f} "
+              f"{1e3*export_time:9.2f}")
+
+
+def bench_render(sizes=(1000, 10000, 100000), max_nodes=1000):
+    """ DOT source of a balanced sum of size leaves: the in memory graphviz
+    graph versus the streamed DOT, in full and with a node budget """
+    print("trace rendering (msec per DOT source)")
+    print(f"  {'nodes':>8} {'graphviz':>9} {'stream':>9} {'budget':>9}")
+    for size in sizes:
+        level = [trace(i) for i in range(size)]
+        while len(level) > 1:
+            level = [level[i] + level[i+1] if i+1 < len(level) else level[i]
+                     for i in range(0, len(level), 2)]
+        root = level[0]
+        def rendered():
+            render = Render()
+            render.to_graph(root)
+            return render.dot.source
+        # the in memory graph is only built for the smaller traces
+        graph_time = timed(rendered, repeat=1) if size <= 10000 else None
+        stream_time = timed(lambda: DotWriter(io.StringIO())(root), repeat=1)
+        budget_time = timed(lambda: DotWriter(io.StringIO(), max_nodes=max_nodes)(root), 
+                            repeat=1)
+        graph = '-' if graph_time is None else f"{1e3*graph_time:.2f}"
+        print(f"  {2*size-1:8} {graph:>9} {1e3*stream_time:9.2f} {1e3*budget_time:9.2f}")
+
+
+if __name__ == '__main__':
+    bench_node_memory()
+    bench_operators()
+    bench_binder()
+    bench_routing()
+    bench_wrapping()
+    bench_chain_fields()
+    bench_interning()
+    bench_evaluator()
+    bench_env()
+    bench_codegen()
+    bench_slots()
+    bench_jit()
+    bench_tiered()
+    bench_optimize()
+    bench_loops()
+    bench_batch()
+    bench_fusion()
+    bench_constraints()
+    bench_solver()
+    bench_streaming()
+    bench_export()
+    bench_render()
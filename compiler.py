@@ -24,43 +24,76 @@ SOFTWARE.
 
 # evaluation deep structure
 
-from traced import Traced, NewInit, Obj, Call, Dispatch, UCall, UDispatch, Argument, Op1, Op2
+from traced import Traced, NewInit, Obj, Call, Dispatch, UCall, UDispatch, Argument, Op1, Op2, \
+    GetAttr, SetAttr, GetItem, BuiltinOp1, BuiltinOp2, BUILTIN_OP2_CLASSES, \
+    Hashable, Iteration, Generation, Iterator, Generator, Function, ArrayUFunc, \
+    CONSTANT_CLASSES, trace_fields, get_field, constant_key, from_traced, \
+    callable_name2type_reflected
 from evaluator import Evaluator
+import inspect
+import itertools
+import numpy as np
+from tape import OPCODE_NAMES, fill_template
 from typing import List, Dict, Any
 
-# for the moment the env of the evaluator is a stack (list) of dictionaries
-# So... we need to "count" where the id are when we find them, the accessor then uses that count.
+# The var_stack of compiled closures is one flat list (frame), with a slot per
+# argument of each traced call. Slots are assigned when the call's env is
+# built, so an argument access is an indexed load whatever the call depth.
 
-class Compiler(Evaluator):
-    def build_access(self, id_):
-        for i, env in enumerate(reversed(self.env)):
-            if id_ in env:
-                for j, k in enumerate(env.keys()):
-                    if id_ == k:
-                        def by_depth(i):
-                            if i == 0:
-                                return lambda var_stack: var_stack[0][j]
-                            else:
-                                next_level = by_depth(i-1)
-                                return lambda var_stack: next_level(var_stack[1]) 
-                        return by_depth(i) 
-        assert id_stack, f"{id_} not defined)"
+# Elementwise operators on arrays are fused: a tree of operators whose
+# intermediate results are not used elsewhere runs as one ElementwiseKernel.
 
+class Compiler(Evaluator):
+    """ Compiles a trace into nested closures over a frame of slots. Loops
+    are not rerolled here, every iteration of the trace has its closures;
+    SourceCompiler reruns loops over their origin (see loop_source). """
+    def __init__(self, fuse=True):
+        super().__init__()
+        self.n_slots = 0
+        self.compiling = False
+        self.fuse = fuse
+        # id -> number of users, of the nodes of the compiled trace
+        self.uses = None
 
-    def push_to_var_stack(self, call_env):
-        f_args = list(call_env.values())
-        def new_args(var_stack):
-            return tuple(f_arg(var_stack) for f_arg in f_args)
+    def __call__(self, traced):
+        if self.compiling:
+            return super().__call__(traced)
+        if self.fuse:
+            self.uses = count_uses(traced, self.alias_classes)
+        self.compiling = True
+        try:
+            f_traced = super().__call__(traced)
+        finally:
+            self.compiling = False
+        n_slots = self.n_slots
+        # the frame of a run, the var_stack argument is kept for compatibility
+        return lambda var_stack=(): f_traced([None] * n_slots)
 
-        return lambda var_stack: (new_args(var_stack), var_stack)
+    def new_env(self, args, kwargs):
+        call_env = super().new_env(args, kwargs)
+        call_env.base = self.n_slots
+        self.n_slots += len(call_env.bindings)
+        return call_env
 
+    def build_access(self, id_):
+        env = self.env[-1].frame_of(id_)
+        assert env is not None, f"{id_} not defined"
+        slot = env.slot_of(id_)
+        return lambda var_stack: var_stack[slot]
 
+    def push_to_var_stack(self, call_env):
+        slot_args = tuple(enumerate(call_env.values(), call_env.base))
+        def push(var_stack):
+            for slot, f_arg in slot_args:
+                var_stack[slot] = f_arg(var_stack)
+            return var_stack
+        return push
 
     def new_init(self, call_env, traced):
         f_value_attributes = dict({k:self(traced_attribute) 
                                    for k, traced_attribute 
-                                   in traced._obj._attributes.items()})
-        f_self_obj = self(traced._obj)
+                                   in traced._trace._attributes.items()})
+        f_self_obj = self(traced._trace)
         push = self.push_to_var_stack(call_env)
         def f_new_init(var_stack):
             var_stack2 = push(var_stack)
@@ -75,15 +108,19 @@ class Compiler(Evaluator):
 
     def call(self, call_env, traced):
         push = self.push_to_var_stack(call_env)
-        f_call = self(traced._return)
+        f_call = self(traced._trace)
         return lambda var_stack: f_call(push(var_stack))
 
     def dispatch(self, call_env, traced):
         push = self.push_to_var_stack(call_env)
-        f_call = self(traced._return)
+        f_call = self(traced._trace)
         return lambda var_stack: f_call(push(var_stack))
 
     def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        if isinstance(traced, ArrayUFunc) and not evaled_kwargs:
+            kernel = self.elementwise(traced, evaled_args)
+            if kernel is not None:
+                return kernel
         return lambda var_stack: (evaled_callable(var_stack)(
             *(evaled_arg(var_stack) for evaled_arg in evaled_args),
             **{var_id:evaled_kwarg(var_stack) for var_id, evaled_kwarg in evaled_kwargs.items()}))
@@ -95,17 +132,54 @@ class Compiler(Evaluator):
             **{var_id:evaled_kwarg(var_stack) for var_id, evaled_kwarg in evaled_kwargs.items()}))
 
     def argument(self, traced, tag, op1):
-        accessor = self.build_access(tag)
-        return lambda var_stack: accessor(var_stack)
+        return self.build_access(tag)
+
+    def constant(self, value):
+        return just_const(value)
 
     def op1(self, traced, op1):
+        kernel = self.elementwise(traced, (op1,))
+        if kernel is not None:
+            return kernel
         op1o = traced._op1o
         return lambda var_stack: op1o(op1(var_stack))
 
     def op2(self, traced, op1, op2):
+        kernel = self.elementwise(traced, (op1, op2))
+        if kernel is not None:
+            return kernel
         op2o = traced._op2o
         return lambda var_stack: op2o(op1(var_stack), op2(var_stack))
 
+    def elementwise(self, traced, operands):
+        """ Kernel of an elementwise operator (or ufunc) on arrays, with the
+        kernels of its operands that have no other users, else None """
+        if self.uses is None or type(traced._value) is not np.ndarray:
+            return None
+        match traced:
+            case BuiltinOp1(_name=name, _op1=op1):
+                ufunc = ELEMENTWISE_UFUNCS.get(name, None)
+                function, nodes = traced._op1o, (op1,)
+            case BuiltinOp2(_name=name, _op1=op1, _op2=op2):
+                ufunc = ELEMENTWISE_UFUNCS.get(name, None)
+                function, nodes = traced._op2o, (op1, op2)
+            case ArrayUFunc(_ufunc=ufunc_, _method='__call__', _args=args) if (
+                    ufunc_.nout == 1 and ufunc_.nin == len(args)):
+                ufunc = (ufunc_, False)
+                function, nodes = ufunc_, args
+            case _:
+                return None
+        if ufunc is None:
+            return None
+        fused = [isinstance(operand, ElementwiseKernel) and 
+                 self.uses.get(id(operand.node), 0) <= 1 
+                 for operand in operands]
+        constants = [node.__class__ in CONSTANT_CLASSES and node._trace is None
+                     for node in nodes]
+        operands = [node._value if constant else operand 
+                    for node, operand, constant in zip(nodes, operands, constants)]
+        return ElementwiseKernel(traced, ufunc, function, operands, fused, constants)
+
     def traced(self, traced):
         cst = traced._value
         return lambda var_stack: cst 
@@ -120,7 +194,7 @@ class Compiler(Evaluator):
                 return just_const(value)
         match cst_that_includes_traced:
             case tuple():
-                f_t = tuple(map(either_cst_or_traced, cst_that_includs_traced)) 
+                f_t = tuple(map(either_cst_or_traced, cst_that_includes_traced)) 
                 return lambda var_stack: tuple(f_e(var_stack) for f_e in f_t)                
             case list():
                 f_l = list(map(either_cst_or_traced, cst_that_includes_traced)) 
@@ -155,3 +229,863 @@ def evalt2_1(arg):
     return f
 
 
+# numpy ufuncs of the elementwise operators
+UFUNC_NAMES = {'__add__': 'add', '__sub__': 'subtract', '__mul__': 'multiply',
+               '__truediv__': 'true_divide', '__floordiv__': 'floor_divide',
+               '__mod__': 'remainder', '__pow__': 'power', 
+               '__lshift__': 'left_shift', '__rshift__': 'right_shift',
+               '__and__': 'bitwise_and', '__xor__': 'bitwise_xor', 
+               '__or__': 'bitwise_or', '__lt__': 'less', '__le__': 'less_equal',
+               '__eq__': 'equal', '__ne__': 'not_equal', '__gt__': 'greater',
+               '__ge__': 'greater_equal', '__neg__': 'negative', 
+               '__pos__': 'positive', '__invert__': 'invert', '__abs__': 'absolute'}
+
+def elementwise_ufuncs():
+    """ Operator name -> (ufunc, reflected) of the elementwise operators of the
+    operator table """
+    ufuncs = dict()
+    for name, (op_type, reflected_name) in callable_name2type_reflected.items():
+        if (op_type in ('Unary', 'Binary Arithmetic', 'Binary Bitwise', 'Comparison') 
+            and name in UFUNC_NAMES):
+            ufunc = getattr(np, UFUNC_NAMES[name])
+            ufuncs[name] = (ufunc, False)
+            if reflected_name:
+                ufuncs[reflected_name] = (ufunc, True)
+    return ufuncs
+
+ELEMENTWISE_UFUNCS = elementwise_ufuncs()
+
+
+def leaf_signature(value):
+    """ Type (and shape, dtype of arrays) of a kernel input, None when the
+    operators of the kernel are not ufuncs for the value """
+    if type(value) is np.ndarray:
+        return (value.shape, value.dtype)
+    if isinstance(value, (bool, int, float, complex, np.generic)):
+        return type(value)
+    return None
+
+
+class ElementwiseKernel:
+    """ Closure of a tree of elementwise operators on arrays. The program has
+    a position per leaf (constants, and closures of the other nodes) and per
+    operator, the operators run as ufuncs in program order. For the shapes and dtypes of the
+    inputs of the last run, the intermediate results are written (out=) to
+    buffers kept between runs: large arrays of one shape are computed a chunk
+    at a time, so that intermediate results stay in cache. """
+    # elements per chunk, and the smallest arrays computed in chunks
+    chunk_size = 8192
+    min_chunked_size = 262144
+
+    def __init__(self, node, ufunc, function, operands, fused, constants):
+        self.node = node
+        ufunc, reflected = ufunc
+        # (ufunc, reflected, function, argument positions), (None, closure)
+        # or (None, None, constant)
+        program = list()
+        args = list()
+        for operand, is_fused, constant in zip(operands, fused, constants):
+            if constant:
+                program.append((None, None, operand))
+            elif is_fused:
+                offset = len(program)
+                for instruction in operand.program:
+                    if instruction[0] is None:
+                        program.append(instruction)
+                    else:
+                        op_ufunc, op_reflected, function, op_args = instruction
+                        program.append((op_ufunc, op_reflected, function, 
+                                        tuple(arg + offset for arg in op_args)))
+            else:
+                program.append((None, operand))
+            args.append(len(program) - 1)
+        program.append((ufunc, reflected, function, tuple(args)))
+        self.program = program
+        self.leaves = [(position, instruction[1]) 
+                       for position, instruction in enumerate(program) 
+                       if instruction[0] is None and instruction[1] is not None]
+        # positions of the leaves and constants
+        self.inputs = [position for position, instruction in enumerate(program)
+                       if instruction[0] is None]
+        # the registers of a run, with the constants
+        self.registers = [instruction[2] if instruction[0] is None and 
+                          instruction[1] is None else None 
+                          for instruction in program]
+        self.steps = [(position, instruction) 
+                      for position, instruction in enumerate(program) 
+                      if instruction[0] is not None]
+        self.signature = None
+        self.buffers = None
+        # shape and dtype of the result, when computed in chunks
+        self.chunked = None
+
+    def __call__(self, var_stack):
+        regs = list(self.registers)
+        for position, f_leaf in self.leaves:
+            regs[position] = f_leaf(var_stack)
+        signature = tuple(leaf_signature(regs[position]) for position, _ in self.leaves)
+        if signature == self.signature:
+            if self.chunked is not None:
+                return self.run_chunked(regs)
+            return self.run(regs, self.buffers)
+        if any(leaf_signature(regs[position]) is None for position in self.inputs):
+            # e.g. lists, the Python operators apply
+            for position, (_, _, function, args) in self.steps:
+                regs[position] = function(*[regs[arg] for arg in args])
+            return regs[-1]
+        value = self.run(regs, None)
+        self.allocate(regs)
+        self.signature = signature
+        return value
+
+    def run(self, regs, buffers):
+        for position, (ufunc, reflected, _, args) in self.steps:
+            values = [regs[arg] for arg in args]
+            if reflected:
+                values.reverse()
+            if buffers is None or buffers[position] is None:
+                regs[position] = ufunc(*values)
+            else:
+                regs[position] = ufunc(*values, out=buffers[position])
+        return regs[-1]
+
+    def run_chunked(self, regs):
+        shape, dtype = self.chunked
+        result = np.empty(shape, dtype)
+        flat_result = result.reshape(-1)
+        flat_leaves = [(position, regs[position].reshape(-1))
+                       for position in self.inputs
+                       if type(regs[position]) is np.ndarray]
+        size = flat_result.shape[0]
+        chunk_size = self.chunk_size
+        buffers = self.buffers
+        steps = self.steps[:-1]
+        root_position, (root_ufunc, root_reflected, _, root_args) = self.steps[-1]
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            if stop - start < chunk_size:
+                buffers = [None if buffer is None else buffer[:stop - start] 
+                           for buffer in buffers]
+            for position, flat_leaf in flat_leaves:
+                regs[position] = flat_leaf[start:stop]
+            for position, (ufunc, reflected, _, args) in steps:
+                values = [regs[arg] for arg in args]
+                if reflected:
+                    values.reverse()
+                regs[position] = ufunc(*values, out=buffers[position])
+            values = [regs[arg] for arg in root_args]
+            if root_reflected:
+                values.reverse()
+            root_ufunc(*values, out=flat_result[start:stop])
+        return result
+
+    def allocate(self, regs):
+        """ Buffers for the intermediate results of regs, a buffer is reused
+        once its last reader ran. The result is a new array on each run. """
+        self.buffers = None
+        self.chunked = None
+        results = [regs[position] for position, _ in self.steps]
+        if any(type(value) is not np.ndarray for value in results):
+            return
+        shape = results[-1].shape
+        size = results[-1].size
+        chunked = (size >= self.min_chunked_size and 
+                   all(value.shape == shape for value in results) and
+                   all(regs[position].shape == shape for position in self.inputs
+                       if type(regs[position]) is np.ndarray))
+        last_read = dict()
+        for step, (_, (_, _, _, args)) in enumerate(self.steps):
+            for arg in args:
+                last_read[arg] = step
+        buffers = [None] * len(self.program)
+        free = dict()
+        for step, (position, (_, _, _, args)) in enumerate(self.steps[:-1]):
+            value = regs[position]
+            buffer_shape = (self.chunk_size,) if chunked else value.shape
+            pool = free.get((buffer_shape, value.dtype), None)
+            if pool:
+                buffers[position] = pool.pop()
+            else:
+                buffers[position] = np.empty(buffer_shape, value.dtype)
+            # the buffers of arguments read for the last time are free again
+            for arg in set(args):
+                buffer = buffers[arg]
+                if buffer is not None and last_read[arg] == step:
+                    free.setdefault((buffer.shape, buffer.dtype), list()).append(buffer)
+        self.buffers = buffers
+        if chunked:
+            self.chunked = (shape, results[-1].dtype)
+
+
+def iteration_origin(traced):
+    """ The Iterator or Generator of an Iteration or Generation, else None """
+    match traced:
+        case Iteration(_iterator=iterator):
+            return iterator
+        case Generation(_generator=generator):
+            return generator
+    return None
+
+
+def origin_counter(origin):
+    """ Number of next calls on an Iterator or Generator, the last one raised
+    StopIteration when the iteration was exhausted """
+    if isinstance(origin, Iterator):
+        return origin._iter_counter
+    return get_field(origin, '_gen_counter', 0)
+
+
+def origin_stopped(origin):
+    """ Whether the last next call on an Iterator or Generator raised 
+    StopIteration """
+    if isinstance(origin, Iterator):
+        return get_field(origin, '_iter_stopped', False)
+    return get_field(origin, '_gen_stopped', False)
+
+
+def upstream_nodes(roots, known=()):
+    """ The nodes of the traces of roots, without the traces of known nodes """
+    seen = set()
+    todo = list(roots)
+    while todo:
+        node = todo.pop()
+        if id(node) in seen or id(node) in known:
+            continue
+        seen.add(id(node))
+        yield node
+        for _, value in trace_fields(node):
+            todo.extend(traced_in(value))
+
+
+def count_uses(root, alias_classes):
+    """ Number of users of the nodes of the trace of root, by id. Alias
+    wrappers are not users, their users use their trace. """
+    def resolved(node):
+        while node.__class__ in alias_classes and isinstance(node._trace, Traced):
+            node = node._trace
+        return node
+    uses = {id(resolved(root)): 1}
+    for node in upstream_nodes([root]):
+        if resolved(node) is not node:
+            continue
+        for _, value in trace_fields(node):
+            for used in traced_in(value):
+                key = id(resolved(used))
+                uses[key] = uses.get(key, 0) + 1
+    return uses
+
+
+def loop_origins(roots, length, known):
+    """ Origins of first iterations in the traces of roots, that were iterated
+    length times """
+    origins = list()
+    for node in upstream_nodes(roots, known):
+        origin = iteration_origin(node)
+        if (origin is not None and node._count == 0 and 
+            origin_counter(origin) == length + 1 and 
+            not any(origin is o for o in origins)):
+            origins.append(origin)
+    return origins
+
+
+def depends_on(roots, origin):
+    """ Whether the traces of roots hold iterations of origin """
+    return any(iteration_origin(node) is origin for node in upstream_nodes(roots))
+
+
+def traced_in(value):
+    """ The traced nodes of a field value """
+    match value:
+        case Traced():
+            yield value
+        case tuple() | list() | frozenset():
+            for e in value:
+                yield from traced_in(e)
+        case dict():
+            for e in value.values():
+                yield from traced_in(e)
+        case slice():
+            yield from traced_in((value.start, value.stop, value.step))
+
+
+class IterationMismatch(Exception):
+    """ Compiled code iterates an input a different number of times than its
+    trace did """
+
+
+class NotALoop(Exception):
+    """ The elements of a structure are not the iterations of one loop """
+
+
+class LoopTemplate:
+    """ Signatures of the traces of a structure's elements, where the
+    iterations of origin are the loop variable. The elements of a loop have
+    equal signatures: the same operations on the loop variable, constants of
+    equal value, and the same nodes that do not depend on the loop. """
+    # fields that are not part of a node's computation
+    skipped_fields = frozenset(('_value', '_iter_counter', '_gen_counter',
+                                '_iter_stopped', '_gen_stopped'))
+
+    def __init__(self, origin, known):
+        self.origin = origin
+        # nodes that have a value before the loop, by id
+        self.known = known
+        # id -> (signature, depends on the loop), and the index of its element
+        self.signatures = dict()
+        # the element of the loop's iteration index
+        self.index = 0
+        # loop invariant nodes, evaluated before the loop
+        self.invariants = list()
+        # iterators of the loop's iterations (e.g. unpacking), by id
+        self.dynamic_origins = set()
+        # the iteration of the first element, the loop variable
+        self.first_iteration = None
+
+    def element(self, index, value):
+        """ Signature of the element of iteration index """
+        self.index = index
+        try:
+            signature, depends = self.value_signature(value)
+        except RecursionError:
+            raise NotALoop()
+        if not depends:
+            raise NotALoop()
+        return signature
+
+    def signature(self, node):
+        known = self.signatures.get(id(node), None)
+        if known is not None:
+            known, index = known
+            if known[1] and index != self.index:
+                # the trace of another iteration
+                raise NotALoop()
+            return known
+        if id(node) in self.known:
+            return ('INV', id(node)), False
+        if iteration_origin(node) is self.origin:
+            if node._count != self.index:
+                raise NotALoop()
+            if self.index == 0:
+                self.first_iteration = node
+            # not memoized, to check the index of each element
+            return ('LOOP',), True
+        if node.__class__ in CONSTANT_CLASSES and node._trace is None:
+            try:
+                known = ('CONST', node.__class__, constant_key(node._value)), False
+                hash(known)
+            except TypeError:
+                known = self.invariant(node)
+        elif isinstance(node, (UCall, UDispatch, Obj)):
+            # calls with possible side effects happen as often as in the trace
+            known = self.fields_signature(node)
+            if not known[1]:
+                known = self.invariant(node)
+        else:
+            known = self.fields_signature(node)
+        if known[1] and isinstance(node, (Iterator, Generator)):
+            if not isinstance(node, Iterator) or node._trace is not None:
+                raise NotALoop()
+            self.dynamic_origins.add(id(node))
+        self.signatures[id(node)] = known, self.index
+        return known
+
+    def invariant(self, node):
+        """ Signature of a node shared by the elements, it is hoisted """
+        self.invariants.append(node)
+        return ('INV', id(node)), False
+
+    def fields_signature(self, node):
+        fields = list()
+        depends = False
+        for name, value in trace_fields(node):
+            if name not in self.skipped_fields:
+                field_signature, field_depends = self.value_signature(value)
+                fields.append((name, field_signature))
+                depends = depends or field_depends
+        if isinstance(node, Obj):
+            fields.append(('class', id(node._value.__class__)))
+        return (node.__class__, tuple(fields)), depends
+
+    def value_signature(self, value):
+        """ (signature, depends on the loop) of a field value """
+        match value:
+            case Traced():
+                return self.signature(value)
+            case tuple() | list() | frozenset() | slice() | dict():
+                if isinstance(value, dict):
+                    items = [e for kv in value.items() for e in kv]
+                elif isinstance(value, slice):
+                    items = [value.start, value.stop, value.step]
+                else:
+                    items = list(value)
+                signatures = [self.value_signature(e) for e in items]
+                return ((value.__class__, tuple(sig for sig, _ in signatures)),
+                        any(depends for _, depends in signatures))
+            case _:
+                try:
+                    key = constant_key(value)
+                    hash(key)
+                    return key, False
+                except TypeError:
+                    return ('RAW', id(value)), False
+
+
+class SourceCompiler(Evaluator):
+    """ Compiles a trace into the source of one flat Python function, with a
+    local variable per node. Hooks return the name holding a node's value,
+    and the env frames map argument tags to the names of their values. 
+    The elements of untraced iterations of the inputs (e.g. a for loop over
+    an input list) are not constants: unless the loop is rerolled, they are
+    read from the input, which must have as many as in the trace, else 
+    mismatch_error is raised. """
+    # reflected operators are emitted with the operands swapped
+    reflected_op2_names = {'__r'+name[2:]: name for name in BUILTIN_OP2_CLASSES 
+                           if '__r'+name[2:] in BUILTIN_OP2_CLASSES}
+    infix_symbols = frozenset(('+', '-', '*', '@', '/', '//', '%', '**', '<<', 
+                               '>>', '&', '^', '|', '<', '<=', '==', '!=', 
+                               '>', '>='))
+    prefix_symbols = frozenset(('-', '+', '~'))
+    # iterated elements are their upstream traces too
+    alias_classes = (Traced, Hashable, Iteration, Generation)
+    mismatch_error = IterationMismatch
+    # loops over constants with fewer elements stay unrolled: a line per
+    # element runs faster, and compiles about as fast (longer ones are
+    # rerolled for the size of their source, see benchmark.bench_loops).
+    # Loops that depend on the inputs are always rerolled, their number of
+    # elements may change and reading the elements costs as much as the loop.
+    min_trip_count = 32
+    n_compiled = 0
+
+    def __init__(self, name='f_trace'):
+        super().__init__()
+        self.name = name
+        self.compiling = False
+        self.source = None
+        self.dynamic_origins = set()
+
+    def __call__(self, traced):
+        if self.compiling:
+            return super().__call__(traced)
+        return self.compile(traced)
+
+    def compile(self, traced, inputs=(), first=(), origins=()):
+        """ Function returning the value of traced. The values of the input
+        nodes become the function's arguments, the first nodes are evaluated
+        (in order) before traced. The iterations of origins (iterators and
+        generators of the trace) that iterate the inputs are checked to have
+        as many elements as in the trace, even when none are used. """
+        # a new function: locals of a previous compilation are not valid
+        self.self2value = dict()
+        self.lines = list()
+        self.n_locals = 0
+        self.namespace = dict()
+        self.constant_names = dict()
+        self.dynamic_origins = set()
+        self.input_ids = set(map(id, inputs))
+        self.input_dependence = dict()
+        self.rerolled_origins = set()
+        parameters = list()
+        for node in inputs:
+            name = f"a{len(parameters)}"
+            self.self2value[id(node)] = name
+            parameters.append(name)
+        self.compiling = True
+        try:
+            for node in first:
+                super().__call__(node)
+            result = super().__call__(traced)
+            for origin in origins:
+                if (id(origin) not in self.rerolled_origins and 
+                    self.iterates_inputs(origin)):
+                    self.origin_elements(origin)
+        finally:
+            self.compiling = False
+        self.lines.append(f"return {result}")
+        signature = ', '.join(parameters) if inputs else 'var_stack=()'
+        self.source = (f"def {self.name}({signature}):\n" + 
+                       ''.join('    '+line+'\n' for line in self.lines))
+        SourceCompiler.n_compiled += 1
+        filename = f"<trace {SourceCompiler.n_compiled}>"
+        exec(compile(self.source, filename, 'exec'), self.namespace)
+        return self.namespace[self.name]
+
+    def visit(self, traced):
+        if id(traced) in self.dynamic_origins:
+            # iterated again in each iteration of a loop
+            yield traced._iterable
+            return self.emit(f"tuple({self(traced._iterable)})")
+        origin = iteration_origin(traced)
+        if origin is not None and id(origin) in self.dynamic_origins:
+            yield origin
+            return self.emit(f"{self(origin)}[{traced._count}]")
+        if (origin is not None and self.iterates_inputs(origin) and
+            (traced._trace is None or not self.depends_on_inputs(traced._trace))):
+            # an element of an input, not a constant
+            return self.emit(f"{self.origin_elements(origin)}[{traced._count}]")
+        return (yield from super().visit(traced))
+
+    def depends_on_inputs(self, traced):
+        """ Whether the trace of traced holds an input """
+        depends = self.input_dependence.get(id(traced), None)
+        if depends is None:
+            depends = any(id(node) in self.input_ids 
+                          for node in upstream_nodes([traced]))
+            self.input_dependence[id(traced)] = depends
+        return depends
+
+    def iterates_inputs(self, origin):
+        """ Whether origin iterates, untraced, a value of the inputs """
+        match origin:
+            case Iterator() | Generator(_trace=UCall() | UDispatch()):
+                return self.depends_on_inputs(origin)
+        return False
+
+    def origin_elements(self, origin):
+        """ Name of the tuple of the elements iterated by origin, as many
+        next calls as in the trace, checked to give as many elements """
+        key = ('elements', id(origin))
+        name = self.self2value.get(key, None)
+        if name is None:
+            stopped = origin_stopped(origin)
+            length = origin_counter(origin) - stopped
+            islice = self.constant(itertools.islice)
+            name = self.emit(f"tuple({islice}({self.origin_source(origin)}, "
+                             f"{length + stopped}))")
+            self.lines.append(f"if len({name}) != {length}: "
+                              f"raise {self.constant(self.mismatch_error)}")
+            self.self2value[key] = name
+        return name
+
+    def emit(self, expression):
+        """ Assign expression to a new local, returns its name """
+        name = f"v{self.n_locals}"
+        self.n_locals += 1
+        self.lines.append(f"{name} = {expression}")
+        return name
+
+    def constant(self, value):
+        """ Name of value in the function's namespace """
+        name = self.constant_names.get(id(value), None)
+        if name is None:
+            name = f"c{len(self.constant_names)}"
+            self.constant_names[id(value)] = name
+            self.namespace[name] = value
+        return name
+
+    def arguments_source(self, evaled_args, evaled_kwargs):
+        return ', '.join(list(evaled_args) + 
+                         [f"{name}={arg}" for name, arg in evaled_kwargs.items()])
+
+    def new_init(self, call_env, traced):
+        attributes = ', '.join(f"{name!r}: {self(traced_attribute)}" 
+                               for name, traced_attribute 
+                               in traced._trace._attributes.items())
+        self_obj = self(traced._trace)
+        self.lines.append(f"{self_obj}.__dict__ = {{{attributes}}}")
+        return self_obj
+
+    def obj(self, traced):
+        cls = self.constant(traced._value.__class__)
+        return self.emit(f"{cls}.__new__({cls})")
+
+    def call(self, call_env, traced):
+        return self(traced._trace)
+
+    def dispatch(self, call_env, traced):
+        return self(traced._trace)
+
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return self.emit(f"{evaled_callable}"
+                         f"({self.arguments_source(evaled_args, evaled_kwargs)})")
+
+    def udispatch(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return self.ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+
+    def op1(self, traced, op1):
+        match traced:
+            case BuiltinOp1(_symbol=symbol) if symbol in self.prefix_symbols:
+                return self.emit(f"{symbol}{op1}")
+            case BuiltinOp1():
+                return self.emit(f"{self.constant(traced._function)}({op1})")
+            case GetAttr(_tag=tag):
+                getattribute = self.constant(object.__getattribute__)
+                return self.emit(f"{getattribute}({op1}, {tag.name!r})")
+            case SetAttr():
+                return op1
+            case _:
+                return self.emit(f"{self.constant(traced._op1o)}({op1})")
+
+    def op2(self, traced, op1, op2):
+        match traced:
+            case BuiltinOp2(_name=name) if name in self.reflected_op2_names:
+                symbol = BUILTIN_OP2_CLASSES[self.reflected_op2_names[name]]._symbol
+                if symbol in self.infix_symbols:
+                    return self.emit(f"{op2} {symbol} {op1}")
+                return self.emit(f"{self.constant(traced._function)}({op1}, {op2})")
+            case BuiltinOp2(_symbol=symbol) if symbol in self.infix_symbols:
+                return self.emit(f"{op1} {symbol} {op2}")
+            case BuiltinOp2():
+                return self.emit(f"{self.constant(traced._function)}({op1}, {op2})")
+            case GetItem():
+                return self.emit(f"{op1}[{op2}]")
+            case _:
+                return self.emit(f"{self.constant(traced._op2o)}({op1}, {op2})")
+
+    def argument(self, traced, tag, trace):
+        # an argument is the value given to the call, where ever it is used
+        return self(trace)
+
+    def traced(self, traced):
+        return self.constant(traced._value)
+
+    def deeptraced(self, traced):
+        # structures are rebuilt on each call, with their traced elements
+        return self.emit(self.structure_source(traced._traced_value))
+
+    def structure_source(self, value):
+        """ Expression building a structure that may hold traced nodes """
+        match value:
+            case Traced():
+                return self(value)
+            case tuple() if (loop := self.loop_source(value)) is not None:
+                return f"tuple({loop})"
+            case tuple():
+                return ('(' + ''.join(self.structure_source(e) + ', ' 
+                                      for e in value) + ')')
+            case list() if (loop := self.loop_source(value)) is not None:
+                return loop
+            case list():
+                return '[' + ', '.join(map(self.structure_source, value)) + ']'
+            case slice():
+                return (f"slice({self.structure_source(value.start)}, "
+                        f"{self.structure_source(value.stop)}, "
+                        f"{self.structure_source(value.step)})")
+            case frozenset():
+                return ('frozenset((' + ''.join(self.structure_source(e) + ', ' 
+                                                for e in value) + '))')
+            case dict() if (loop := self.loop_source(tuple(value.items()), 
+                                                     is_dict=True)) is not None:
+                return loop
+            case dict():
+                return ('{' + ', '.join(f"{self.structure_source(k)}: "
+                                        f"{self.structure_source(v)}" 
+                                        for k, v in value.items()) + '}')
+            case _:
+                return self.constant(value)
+
+    def loop_source(self, elements, is_dict=False):
+        """ Name of the list (or dict of the items) of elements built by a
+        loop, when the elements are the iterations of one loop, else None.
+        The loop runs over the origin of the iterations, so it has as many
+        elements as the origin iterates when the function is called. Short
+        loops that do not depend on the inputs stay unrolled (min_trip_count). """
+        if len(elements) < 2:
+            return None
+        for origin in loop_origins(traced_in(elements[0]), len(elements), 
+                                   self.self2value):
+            if not self.can_iterate(origin):
+                continue
+            if (len(elements) < self.min_trip_count and 
+                not self.depends_on_inputs(origin)):
+                continue
+            template = LoopTemplate(origin, self.self2value)
+            try:
+                signature = template.element(0, elements[0])
+                for index, element in enumerate(elements[1:], 1):
+                    if template.element(index, element) != signature:
+                        raise NotALoop()
+            except NotALoop:
+                continue
+            return self.emit_loop(template, elements[0], is_dict)
+        return None
+
+    def can_iterate(self, origin):
+        """ Whether the iterations of origin can be iterated by the compiled
+        code: iterators of a traced value or of an untraced call, and
+        generators of untraced calls or of traced functions """
+        match origin:
+            case Iterator(_trace=None) | Iterator(_trace=UCall() | UDispatch()):
+                return True
+            case Generator(_trace=UCall() | UDispatch()):
+                return True
+            case Generator(_trace=Call(_callable=Function())):
+                return True
+        return False
+
+    def origin_source(self, origin):
+        """ Expression of the iterable of origin's iterations """
+        match origin:
+            case Iterator(_trace=None, _iterable=iterable):
+                return self(iterable)
+            case Generator(_trace=Call(_callable=function, _args=args, _kwargs=kwargs)):
+                # the generator runs (untraced) again
+                arguments = list()
+                for arg in list(args) + list(kwargs.values()):
+                    value = self(arg._trace)
+                    match arg._tag.param_kind:
+                        case inspect.Parameter.VAR_POSITIONAL:
+                            arguments.append(f"*{value}")
+                        case inspect.Parameter.VAR_KEYWORD:
+                            arguments.append(f"**{value}")
+                        case inspect.Parameter.KEYWORD_ONLY:
+                            arguments.append(f"{arg._tag.name}={value}")
+                        case _:
+                            arguments.append(value)
+                generator = f"{self.constant(from_traced(function))}({', '.join(arguments)})"
+                return f"map({self.constant(from_traced)}, {generator})"
+            case _:
+                return self(origin._trace)
+
+    def emit_loop(self, template, element, is_dict):
+        """ Loop over the iterable of the template's origin, with the first
+        element as body """
+        for node in template.invariants:
+            self(node)
+        self.rerolled_origins.add(id(template.origin))
+        iterable = self.origin_source(template.origin)
+        result = self.emit('{}' if is_dict else '[]')
+        variable = f"v{self.n_locals}"
+        self.n_locals += 1
+        lines = self.lines
+        self.lines = list()
+        evaluated = set(self.self2value)
+        self.self2value[id(template.first_iteration)] = variable
+        self.dynamic_origins.update(template.dynamic_origins)
+        try:
+            if is_dict:
+                key, value = element
+                self.lines.append(f"{result}[{self.structure_source(key)}] = "
+                                  f"{self.structure_source(value)}")
+            else:
+                self.lines.append(f"{result}.append({self.structure_source(element)})")
+        finally:
+            body = self.lines
+            self.lines = lines
+            # the nodes of the body have other values out of the loop
+            for key in set(self.self2value) - evaluated:
+                del self.self2value[key]
+            self.dynamic_origins.difference_update(template.dynamic_origins)
+        self.lines.append(f"for {variable} in {iterable}:")
+        self.lines.extend('    ' + line for line in body)
+        return result
+
+
+class TapeCompiler:
+    """ Compiles a tape into a straight line program over a register list """
+    def __init__(self, tape):
+        self.tape = tape
+        self.builders = [getattr(self, name) for name in OPCODE_NAMES]
+
+    def __call__(self, root, inputs=()):
+        """ Function of the values at the input indices, returns root's value """
+        tape = self.tape
+        live = tape.live(root)
+        inputs = tuple(inputs)
+        input_set = set(inputs)
+        builders = self.builders
+        program = tuple((idx, builders[tape.opcode[idx]](idx))
+                        for idx in range(root+1)
+                        if live[idx] and idx not in input_set)
+        n_regs = root+1
+        def f_tape(*input_values):
+            regs = [None] * n_regs
+            for idx, value in zip(inputs, input_values):
+                regs[idx] = value
+            for idx, step in program:
+                regs[idx] = step(regs)
+            return regs[root]
+        return f_tape
+
+    def copy_trace(self, idx):
+        trace_idx = self.tape.trace[idx]
+        return lambda regs: regs[trace_idx]
+
+    def call_operands(self, idx):
+        kwarg_names = self.tape.info[idx]
+        operands = self.tape.operands_of(idx)
+        n_args = len(operands) - len(kwarg_names)
+        return (tuple(operands[:n_args]), 
+                tuple(zip(kwarg_names, operands[n_args:])))
+
+    def const(self, idx):
+        cst = self.tape.value_of(idx)
+        return lambda regs: cst
+
+    def alias(self, idx):
+        return self.copy_trace(idx)
+
+    def deep(self, idx):
+        template = self.tape.info[idx]
+        operands = tuple(self.tape.operands_of(idx))
+        return lambda regs: fill_template(template, [regs[i] for i in operands])
+
+    def obj(self, idx):
+        cls = self.tape.value_of(idx)
+        return lambda regs: cls.__new__(cls)
+
+    def new_init(self, idx):
+        _, attribute_names = self.tape.info[idx]
+        operands = self.tape.operands_of(idx)
+        attributes = tuple(zip(attribute_names, 
+                               operands[len(operands)-len(attribute_names):]))
+        obj_idx = self.tape.trace[idx]
+        def f_new_init(regs):
+            self_obj = regs[obj_idx]
+            self_obj.__dict__ = {name: regs[i] for name, i in attributes}
+            return self_obj
+        return f_new_init
+
+    def argument(self, idx):
+        return self.copy_trace(idx)
+
+    def call(self, idx):
+        return self.copy_trace(idx)
+
+    def dispatch(self, idx):
+        return self.copy_trace(idx)
+
+    def ucall(self, idx):
+        callable_idx = self.tape.op1[idx]
+        args, kwargs = self.call_operands(idx)
+        return lambda regs: regs[callable_idx](
+                *[regs[i] for i in args],
+                **{name: regs[i] for name, i in kwargs})
+
+    def udispatch(self, idx):
+        return self.ucall(idx)
+
+    def getattr(self, idx):
+        op1_idx = self.tape.op1[idx]
+        name = self.tape.tag_of(idx).name
+        return lambda regs: object.__getattribute__(regs[op1_idx], name)
+
+    def setattr(self, idx):
+        op1_idx = self.tape.op1[idx]
+        return lambda regs: regs[op1_idx]
+
+    def getitem(self, idx):
+        op1_idx, op2_idx = self.tape.op1[idx], self.tape.op2[idx]
+        return lambda regs: regs[op1_idx][regs[op2_idx]]
+
+    def op1(self, idx):
+        op1o, op1_idx = self.tape.info[idx], self.tape.op1[idx]
+        return lambda regs: op1o(regs[op1_idx])
+
+    def op2(self, idx):
+        op2o, op1_idx, op2_idx = self.tape.info[idx], self.tape.op1[idx], self.tape.op2[idx]
+        return lambda regs: op2o(regs[op1_idx], regs[op2_idx])
+
+    def iterator(self, idx):
+        return self.const(idx)
+
+    def iteration(self, idx):
+        if self.tape.trace[idx] >= 0:
+            return self.copy_trace(idx)
+        else:
+            return self.const(idx)
+
+    def generator(self, idx):
+        return self.const(idx)
+
+    def generation(self, idx):
+        return self.iteration(idx)
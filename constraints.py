@@ -24,14 +24,19 @@ SOFTWARE.
 
 
 from traced import Traced, Obj, NewInit, Call, Dispatch, UCall, UDispatch, Argument, \
-        Op1, Op2, GetAttr, SetAttr, GetItem 
+        Op1, Op2, GetAttr, SetAttr, GetItem, TRACE_OBSERVERS
 from evaluator import Evaluator
+import contextlib
+import weakref
+from tape import NEWINIT, CALL, DISPATCH, ARGUMENT, GETATTR, GETITEM
 
 
 class Constraint:
     def __init__(self, from_node, to_node):
         self.from_traced = from_node
         self.to_traced = to_node
+        # the identity of the constraint, for hashing and equality
+        self._key = (self.__class__, id(from_node), id(to_node))
 
     def __repr__(self):
         return (f"{self.__class__.__name__}"
@@ -41,14 +46,10 @@ class Constraint:
                     f"({self.from_traced!r}))")
 
     def __hash__(self):
-        return hash((self.__class__, 
-                     id(self.from_traced), 
-                     id(self.to_traced)))
+        return hash(self._key)
 
     def __eq__(self, other):
-        return ((self.__class__ == other.__class__) and
-                (id(self.from_traced) == id(other.from_traced)) and
-                (id(self.to_traced) == id(other.to_traced)))
+        return self._key == other._key
 
 class HasAttr(Constraint):
     pass
@@ -68,20 +69,73 @@ class HasItem(Constraint):
 class Arg2Content(Constraint):
     pass
 
+class ConstraintStore:
+    """ Set of constraints, indexed by the id of their from node, the id of
+    their to node, and their class. Each index keeps the constraints in the
+    order they were added. """
+    def __init__(self):
+        self.constraints = set()
+        self.from_id_to_constraints = dict()
+        self.to_id_to_constraints = dict()
+        self.class_to_constraints = dict()
+
+    def add(self, constraint):
+        """ Add the constraint, False if it was already in the store """
+        if constraint in self.constraints:
+            return False
+        self.constraints.add(constraint)
+        self.from_id_to_constraints.setdefault(
+                id(constraint.from_traced), list()).append(constraint)
+        self.to_id_to_constraints.setdefault(
+                id(constraint.to_traced), list()).append(constraint)
+        self.class_to_constraints.setdefault(
+                constraint.__class__, list()).append(constraint)
+        return True
+
+    def __len__(self):
+        return len(self.constraints)
+
+    def __iter__(self):
+        return iter(self.constraints)
+
+    def __contains__(self, constraint):
+        return constraint in self.constraints
+
+    @staticmethod
+    def select(constraints, constraint_class):
+        if constraint_class is None:
+            return list(constraints)
+        return [constraint for constraint in constraints 
+                if isinstance(constraint, constraint_class)]
+
+    def from_node(self, traced, constraint_class=None):
+        """ Constraints from the node (of the class) """
+        return self.select(self.from_id_to_constraints.get(id(traced), ()), 
+                           constraint_class)
+
+    def to_node(self, traced, constraint_class=None):
+        """ Constraints to the node (of the class) """
+        return self.select(self.to_id_to_constraints.get(id(traced), ()), 
+                           constraint_class)
+
+    def of_class(self, constraint_class):
+        """ Constraints of the class, or of its subclasses """
+        return [constraint 
+                for cls, constraints in self.class_to_constraints.items()
+                if issubclass(cls, constraint_class)
+                for constraint in constraints]
+
+
 class BuildUpstreamConstraints(Evaluator):
     # we use evaluator, but return previous tracing
     def __init__(self):
-        self.from_id_to_constraints = dict()
+        self.store = ConstraintStore()
+        # the store's index, by id of the from node
+        self.from_id_to_constraints = self.store.from_id_to_constraints
         super().__init__()
 
     def add_constraint(self, constraint):
-        from_traced, to_node = constraint.from_traced, constraint.to_traced
-        constraints = self.from_id_to_constraints.get(id(from_traced), None)
-        if not constraints:
-            constraints = list();
-            self.from_id_to_constraints[id(from_traced)] = constraints
-        if constraint not in constraints:
-            constraints.append(constraint)
+        self.store.add(constraint)
 
     def new_init(self, call_env, traced):
         self.add_constraint(HasInit(traced._trace, traced))
@@ -107,10 +161,19 @@ class BuildUpstreamConstraints(Evaluator):
         self.add_constraint(HasCallableMethod(traced, traced._callable))
         return traced
 
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return traced
+
+    def udispatch(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return traced
+
     def argument(self, traced, tag, op1):
         self.add_constraint(Arg2Content(traced, op1))
         return traced
 
+    def alias(self, traced, trace_value):
+        return traced
+
     def op1(self, traced, op1):
         match traced:
             case GetAttr(_tag=tag, _op1=op1, _value=prev_value):
@@ -137,4 +200,142 @@ class BuildUpstreamConstraints(Evaluator):
         return traced
 
 
+class IndexConstraints:
+    """ Set of constraints between node handles (integer indices), as
+    (constraint class, from index, to index), indexed by their from index """
+    def __init__(self):
+        self.from_index_to_constraints = dict()
+        self.constraints = set()
+
+    def add_constraint(self, constraint_class, from_idx, to_idx):
+        constraint = (constraint_class, from_idx, to_idx)
+        if constraint not in self.constraints:
+            self.constraints.add(constraint)
+            self.from_index_to_constraints.setdefault(from_idx, list()).append(
+                    (constraint_class, to_idx))
+
+
+class StreamingConstraints(IndexConstraints):
+    """ BuildUpstreamConstraints of the nodes as they are created, a trace 
+    observer. The trace need not be kept, nor walked again. Unlike the 
+    evaluator pass, the constraints of every created node are extracted, not
+    only those of the nodes upstream of a result.
+    By default the constraints are kept between node handles, numbered in
+    creation order (id2index maps the id of a live node to its handle, the
+    entry is dropped when the node dies), so that no node is kept alive.
+    Given an emit, the constraints go to it as Constraint objects, which hold
+    their nodes: an emit that keeps them (e.g. the add of a store or Solver)
+    keeps the whole trace alive. """
+    def __init__(self, emit=None):
+        super().__init__()
+        self.id2index = dict()
+        self.n_nodes = 0
+        # id -> weak reference of the node, its handle is dropped when it dies
+        # so that a new node with the same id is not given it
+        self.node_refs = dict()
+        self_ref = weakref.ref(self)
+        def forget(node_ref):
+            streamed = self_ref()
+            if (streamed is not None and 
+                streamed.node_refs.get(node_ref.key) is node_ref):
+                del streamed.node_refs[node_ref.key]
+                del streamed.id2index[node_ref.key]
+        self.forget = forget
+        if emit is None:
+            self.constrain = self.add_handles
+        else:
+            self.constrain = lambda constraint_class, from_traced, to_traced: \
+                    emit(constraint_class(from_traced, to_traced))
+
+    def new_index(self, traced):
+        """ A new handle for the node """
+        key = id(traced)
+        idx = self.id2index[key] = self.n_nodes
+        self.n_nodes += 1
+        self.node_refs[key] = weakref.KeyedRef(traced, self.forget, key)
+        return idx
+
+    def index_of(self, traced):
+        """ Handle of the node, numbered when first seen """
+        idx = self.id2index.get(id(traced), None)
+        if idx is None:
+            idx = self.new_index(traced)
+        return idx
+
+    def add_handles(self, constraint_class, from_traced, to_traced):
+        self.add_constraint(constraint_class, self.index_of(from_traced), 
+                            self.index_of(to_traced))
+
+    def __call__(self, traced):
+        self.new_index(traced)
+        constrain = self.constrain
+        match traced:
+            case NewInit(_trace=obj):
+                # the attributes set by __init__
+                constrain(HasInit, obj, traced)
+                for set_attr in obj._attributes.values():
+                    constrain(HasAttr, obj, set_attr)
+            case Call(_callable=callable_):
+                constrain(IsCallableFunction, traced, callable_)
+            case Dispatch(_callable=callable_):
+                constrain(HasCallableMethod, traced, callable_)
+            case Argument(_trace=trace):
+                constrain(Arg2Content, traced, trace)
+            case GetAttr(_op1=op1, _trace=set_attr):
+                constrain(HasAttr, traced, op1)
+                if isinstance(op1, Obj):
+                    # e.g. an attribute set after __init__
+                    constrain(HasAttr, op1, set_attr)
+            case GetItem(_op1=op1):
+                if op1._trace is not None:
+                    constrain(HasItem, traced, op1._trace)
 
+
+@contextlib.contextmanager
+def streaming_constraints(emit=None):
+    """ Extract the constraints of all traced nodes created within the
+    context, see StreamingConstraints """
+    observer = StreamingConstraints(emit)
+    TRACE_OBSERVERS.append(observer)
+    try:
+        yield observer
+    finally:
+        TRACE_OBSERVERS.remove(observer)
+
+
+class TapeConstraints(IndexConstraints):
+    """ BuildUpstreamConstraints over a tape, constraints are index pairs """
+    def __init__(self, tape):
+        super().__init__()
+        self.tape = tape
+
+    def __call__(self, root):
+        tape = self.tape
+        live = tape.live(root)
+        for idx in range(root+1):
+            if live[idx]:
+                self.visit(idx)
+        return self.from_index_to_constraints
+
+    def visit(self, idx):
+        tape = self.tape
+        opcode = tape.opcode[idx]
+        if opcode == NEWINIT:
+            obj_idx = tape.trace[idx]
+            self.add_constraint(HasInit, obj_idx, idx)
+            _, attribute_names = tape.info[idx]
+            operands = tape.operands_of(idx)
+            for set_attr_idx in operands[len(operands)-len(attribute_names):]:
+                self.add_constraint(HasAttr, obj_idx, set_attr_idx)
+        elif opcode == CALL:
+            self.add_constraint(IsCallableFunction, idx, tape.op1[idx])
+        elif opcode == DISPATCH:
+            self.add_constraint(HasCallableMethod, idx, tape.op1[idx])
+        elif opcode == ARGUMENT:
+            self.add_constraint(Arg2Content, idx, tape.trace[idx])
+        elif opcode == GETATTR:
+            self.add_constraint(HasAttr, idx, tape.op1[idx])
+        elif opcode == GETITEM:
+            op1_trace_idx = tape.trace[tape.op1[idx]]
+            if op1_trace_idx >= 0:
+                self.add_constraint(HasItem, idx, op1_trace_idx)
@@ -26,78 +26,212 @@ SOFTWARE.
 
 import traced
 from traced import Traced, NewInit, Obj, Call, Dispatch, UCall, UDispatch, \
-    Argument, Op1, Op2, DeepTraced, rebuild_deep, basic_to_traced
+    Argument, Op1, Op2, DeepTraced, Hashable, rebuild_deep, basic_to_traced
+from tape import OPCODE_NAMES, fill_template
+
+NOT_EVALUATED = object()
+
+class Env:
+    """ Linked env frame: the bindings of one call, and the enclosing frame.
+    Entering a call is O(1), rather than a copy of the enclosing bindings.
+    A tag bound by an enclosing frame is found once by walking up the frames,
+    then cached in the frame it was looked up from. """
+    __slots__ = ('bindings', 'parent', 'positions', 'base', 'found')
+
+    def __init__(self, bindings, parent=None):
+        self.bindings = bindings
+        self.parent = parent
+        self.positions = None
+        # first slot of the frame's bindings, when slots are allocated
+        self.base = None
+        # tag -> (frames up, binding frame), of tags bound by enclosing frames
+        # (valid as the bindings of a frame do not change once built)
+        self.found = None
+
+    def __getitem__(self, tag):
+        value = self.bindings.get(tag, NOT_EVALUATED)
+        if value is not NOT_EVALUATED:
+            return value
+        env = self.frame_of(tag)
+        if env is None:
+            raise KeyError(tag)
+        return env.bindings[tag]
+
+    def __contains__(self, tag):
+        return self.frame_of(tag) is not None
+
+    def values(self):
+        """ Values of the frame's own bindings """
+        return self.bindings.values()
+
+    def enclosing(self, tag):
+        """ (frames up, frame) of the enclosing frame binding tag, None if
+        not bound """
+        found = self.found
+        if found is None:
+            found = self.found = dict()
+        else:
+            cached = found.get(tag, None)
+            if cached is not None:
+                return cached
+        env = self.parent
+        depth = 1
+        while env is not None:
+            if tag in env.bindings:
+                found[tag] = (depth, env)
+                return depth, env
+            env = env.parent
+            depth += 1
+        return None
+
+    def frame_of(self, tag):
+        """ The innermost frame binding tag, None if not bound """
+        if tag in self.bindings:
+            return self
+        located = self.enclosing(tag)
+        return None if located is None else located[1]
+
+    def position(self, tag):
+        """ Position of tag in the frame's own bindings """
+        if self.positions is None:
+            self.positions = {k: j for j, k in enumerate(self.bindings)}
+        return self.positions[tag]
+
+    def slot_of(self, tag):
+        return self.base + self.position(tag)
+
+    def locate(self, tag):
+        """ (frames up, position in that frame) of tag, None if not bound """
+        if tag in self.bindings:
+            return 0, self.position(tag)
+        located = self.enclosing(tag)
+        if located is None:
+            return None
+        depth, env = located
+        return depth, env.position(tag)
 
 class Evaluator:
+    """ Evaluates a trace, each node once. The trace is walked with an explicit
+    stack: before a node's hook is called its upstream nodes are evaluated
+    (within the env of the call they belong to), so that the hooks' own
+    self(upstream) calls are memo lookups. """
+    # plain wrappers, when they have a _trace they are evaluated as their _trace
+    alias_classes = (Traced, Hashable)
     def __init__(self):
         self.env = list();
-        self.env.append(dict())
+        self.env.append(Env(dict()))
+        # memo of all evaluated nodes, by id
         self.self2value = dict()
 
     def __call__(self, traced):
+        value = self.self2value.get(id(traced), NOT_EVALUATED)
+        if value is not NOT_EVALUATED:
+            return value
+        self2value = self.self2value
+        stack = [(traced, self.visit(traced))]
+        while stack:
+            node, visit = stack[-1]
+            try:
+                upstream = next(visit)
+            except StopIteration as stop:
+                stack.pop()
+                self2value[id(node)] = stop.value
+                continue
+            if id(upstream) not in self2value:
+                stack.append((upstream, self.visit(upstream)))
+        return self2value[id(traced)]
+
+    def visit(self, traced):
+        """ Generator yielding the upstream nodes needed before the node's
+        hook can be called, returns the hook's value """
         match traced:
             case NewInit(_args=args, _kwargs=kwargs):
-                if id(traced) not in self.self2value:
-                    assert(id(traced._trace) == id(args[0]._trace))
-                    call_env = self.new_env(args, kwargs)
-                    self.enter_env(call_env)
-                    value = self.new_init(call_env, traced)
-                    self.exit_env()
-                    self.self2value[id(traced)] = value
-                    return value
-                else:
-                    return self.self2value[id(traced)]
+                assert(id(traced._trace) == id(args[0]._trace))
+                yield from self.argument_traces(args, kwargs)
+                call_env = self.new_env(args, kwargs)
+                self.enter_env(call_env)
+                yield traced._trace
+                yield from traced._trace._attributes.values()
+                value = self.new_init(call_env, traced)
+                self.exit_env()
+                return value
             case Obj():
-                if id(traced) not in self.self2value:
-                    value = self.obj(traced)
-                    self.self2value[id(traced)] = value
-                    return value
-                else:
-                    return self.self2value[id(traced)]
+                # attributes are evaluated by NewInit, within the __init__ env
+                return self.obj(traced)
             case Call(_args=args, _kwargs=kwargs):
+                yield from self.argument_traces(args, kwargs)
                 call_env = self.new_env(args, kwargs)
                 self.enter_env(call_env)
+                yield traced._trace
                 value = self.call(call_env, traced)
                 self.exit_env()
                 return value
             case Dispatch(_args=args, _kwargs=kwargs):
+                yield from self.argument_traces(args, kwargs)
                 call_env = self.new_env(args, kwargs)
                 self.enter_env(call_env)
+                yield traced._trace
                 value = self.dispatch(call_env, traced)
                 self.exit_env()
                 return value
             case UCall(_callable=callable_, _args=args, _kwargs=kwargs):
-                evaled_callable = self(callable_)
-                evaled_args = [self(arg._op1) for arg in args]
-                evaled_kwargs = {arg._tag: self(arg._op1) for kwarg in kwargs}
-                value = self.ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
-                return value
+                yield callable_
+                yield from self.traced_only(args, kwargs)
+                evaled_args, evaled_kwargs = self.untraced_args(args, kwargs)
+                return self.ucall(traced, self(callable_), evaled_args, evaled_kwargs)
             case UDispatch(_callable=callable_, _args=args, _kwargs=kwargs):
-                evaled_callable = self(callable_)
-                evaled_args = [self(arg._trace) for arg in args]
-                evaled_kwargs = {arg._tag: self(arg._op1) for kwarg in kwargs}
-                value = self.udispatch(traced, evaled_callable, evaled_args, evaled_kwargs)
-                return value
+                yield callable_
+                yield from self.traced_only(args, kwargs)
+                evaled_args, evaled_kwargs = self.untraced_args(args, kwargs)
+                return self.udispatch(traced, self(callable_), evaled_args, evaled_kwargs)
             case Argument(_tag=tag, _trace=trace):
+                # usually already evaluated, as argument of the call
+                yield trace
                 return self.argument(traced, tag, trace) 
             case Op1(_op1=op1):
+                yield op1
                 return self.op1(traced, self(op1))
             case Op2(_op1=op1, _op2=op2):
+                yield op1
+                yield op2
                 return self.op2(traced, self(op1), self(op2))
             case DeepTraced():
                 return self.deeptraced(traced)
+            case Traced(_trace=Traced() as trace) if traced.__class__ in self.alias_classes:
+                yield trace
+                return self.alias(traced, self(trace))
             case Traced():
                 return self.traced(traced)
             case _:
                 assert(False)
 
+    def argument_traces(self, args, kwargs):
+        """ The traces of the arguments of a traced call """
+        for arg in args:
+            yield arg._trace
+        for arg in kwargs.values():
+            yield arg._trace
+
+    def traced_only(self, args, kwargs):
+        """ The traced arguments of an untraced call """
+        for arg in args:
+            if isinstance(arg, Traced):
+                yield arg
+        for arg in kwargs.values():
+            if isinstance(arg, Traced):
+                yield arg
+
+    def untraced_args(self, args, kwargs):
+        """ Evaluated arguments of an untraced call, which may be raw values """
+        def evaled(arg):
+            return self(arg) if isinstance(arg, Traced) else self.constant(arg)
+        return ([evaled(arg) for arg in args], 
+                {name: evaled(arg) for name, arg in kwargs.items()})
+
     def new_env(self, args, kwargs):
-        evaled_args = [(arg._tag, self(arg._trace)) for arg in args]
-        evaled_kwargs = {arg._tag: self(arg._trace) for kwarg in kwargs}
-        call_env = dict(self.env[-1])
-        call_env.update({arg[0]: arg[1] for arg in evaled_args})
-        call_env.update(evaled_kwargs)
-        return call_env
+        bindings = {arg._tag: self(arg._trace) for arg in args}
+        bindings.update({arg._tag: self(arg._trace) for arg in kwargs.values()})
+        return Env(bindings, self.env[-1])
 
     def enter_env(self, call_env):
         self.env.append(call_env)
@@ -133,6 +267,14 @@ class Evaluator:
     def argument(self, traced, tag, trace):
         return self.env[-1][tag]
 
+    def alias(self, traced, trace_value):
+        """ Wrappers of an upstream trace (e.g. the result of a call) """
+        return trace_value
+
+    def constant(self, value):
+        """ Untraced values given to untraced calls """
+        return value
+
     def op1(self, traced, op1):
         return traced._op1o(op1)
 
@@ -165,3 +307,104 @@ class Evaluator:
 
 
 
+class TapeEvaluator:
+    """ Evaluates a tape in index order, the tape counterpart of Evaluator """
+    def __init__(self, tape):
+        self.tape = tape
+        self.visitors = [getattr(self, name) for name in OPCODE_NAMES]
+
+    def __call__(self, root, inputs=None):
+        """ Value of tape index root, inputs maps tape indices to new values """
+        tape = self.tape
+        inputs = inputs or dict()
+        live = tape.live(root)
+        values = [None] * (root+1)
+        visitors = self.visitors
+        opcodes = tape.opcode
+        for idx in range(root+1):
+            if live[idx]:
+                if idx in inputs:
+                    values[idx] = inputs[idx]
+                else:
+                    values[idx] = visitors[opcodes[idx]](idx, values)
+        return values[root]
+
+    def call_args(self, idx, values):
+        """ The evaluated args and kwargs of a call tape entry """
+        kwarg_names = self.tape.info[idx]
+        operands = self.tape.operands_of(idx)
+        n_args = len(operands) - len(kwarg_names)
+        args = [values[i] for i in operands[:n_args]]
+        kwargs = {name: values[i] for name, i in zip(kwarg_names, operands[n_args:])}
+        return args, kwargs
+
+    def const(self, idx, values):
+        return self.tape.value_of(idx)
+
+    def alias(self, idx, values):
+        return values[self.tape.trace[idx]]
+
+    def deep(self, idx, values):
+        element_values = [values[i] for i in self.tape.operands_of(idx)]
+        return fill_template(self.tape.info[idx], element_values)
+
+    def obj(self, idx, values):
+        cls = self.tape.value_of(idx)
+        return cls.__new__(cls)
+
+    def new_init(self, idx, values):
+        tape = self.tape
+        _, attribute_names = tape.info[idx]
+        operands = tape.operands_of(idx)
+        attribute_values = [values[i] for i in operands[len(operands)-len(attribute_names):]]
+        self_obj = values[tape.trace[idx]]
+        self_obj.__dict__ = dict(zip(attribute_names, attribute_values))
+        return self_obj
+
+    def argument(self, idx, values):
+        return values[self.tape.trace[idx]]
+
+    def call(self, idx, values):
+        return values[self.tape.trace[idx]]
+
+    def dispatch(self, idx, values):
+        return values[self.tape.trace[idx]]
+
+    def ucall(self, idx, values):
+        args, kwargs = self.call_args(idx, values)
+        return values[self.tape.op1[idx]](*args, **kwargs)
+
+    def udispatch(self, idx, values):
+        args, kwargs = self.call_args(idx, values)
+        return values[self.tape.op1[idx]](*args, **kwargs)
+
+    def getattr(self, idx, values):
+        return object.__getattribute__(values[self.tape.op1[idx]],
+                                       self.tape.tag_of(idx).name)
+
+    def setattr(self, idx, values):
+        return values[self.tape.op1[idx]]
+
+    def getitem(self, idx, values):
+        return values[self.tape.op1[idx]][values[self.tape.op2[idx]]]
+
+    def op1(self, idx, values):
+        return self.tape.info[idx](values[self.tape.op1[idx]])
+
+    def op2(self, idx, values):
+        return self.tape.info[idx](values[self.tape.op1[idx]],
+                                   values[self.tape.op2[idx]])
+
+    def iterator(self, idx, values):
+        return self.tape.value_of(idx)
+
+    def iteration(self, idx, values):
+        trace_idx = self.tape.trace[idx]
+        return values[trace_idx] if trace_idx >= 0 else self.tape.value_of(idx)
+
+    def generator(self, idx, values):
+        return self.tape.value_of(idx)
+
+    def generation(self, idx, values):
+        return self.iteration(idx, values)
+
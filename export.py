@@ -0,0 +1,169 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Export of a trace, and of its constraints, as numpy arrays: node kinds (the
+# tape opcodes) and one compressed sparse row (CSR) adjacency per edge label.
+# Node indices are tape indices, so upstream nodes come first. Analyses over
+# large traces (reachability, slicing, ...) then run vectorized over arrays
+# rather than walking Python objects.
+
+import numpy as np
+from traced import Traced
+from tape import Tape, OPCODE_NAMES
+
+# edge labels of the trace itself, one per tape index column
+TRACE_LABELS = ('trace', 'op1', 'op2', 'operand')
+
+
+class CSRGraph:
+    """ Adjacency of n_nodes nodes in compressed sparse row form: the targets
+    of node i are indices[indptr[i]:indptr[i+1]] """
+    def __init__(self, n_nodes, sources, targets):
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        self.n_nodes = n_nodes
+        self.indptr = np.zeros(n_nodes+1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n_nodes), out=self.indptr[1:])
+        self.indices = targets[np.argsort(sources, kind='stable')]
+
+    def __len__(self):
+        return len(self.indices)
+
+    def targets(self, idx):
+        return self.indices[self.indptr[idx]:self.indptr[idx+1]]
+
+    def edges(self):
+        """ The (sources, targets) arrays of the edges """
+        sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        return sources, self.indices
+
+    def transpose(self):
+        """ The graph with reversed edges """
+        sources, targets = self.edges()
+        return CSRGraph(self.n_nodes, targets, sources)
+
+    def union(self, *others):
+        """ The graph with the edges of all the graphs """
+        sources, targets = zip(self.edges(), *(other.edges() for other in others))
+        return CSRGraph(self.n_nodes, np.concatenate(sources), np.concatenate(targets))
+
+    def reachable(self, roots):
+        """ Mask of the nodes reachable from roots, one vectorized step per
+        level of a breadth first search """
+        indptr, indices = self.indptr, self.indices
+        mask = np.zeros(self.n_nodes, dtype=bool)
+        # position of a node in the new frontier, to drop its duplicates
+        position = np.empty(self.n_nodes, dtype=np.int64)
+        frontier = np.unique(np.asarray(roots, dtype=np.int64))
+        mask[frontier] = True
+        while len(frontier):
+            starts = indptr[frontier]
+            lengths = indptr[frontier+1] - starts
+            # the indices of the targets of the frontier, concatenated
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+            targets = indices[offsets + np.arange(len(offsets))]
+            targets = targets[~mask[targets]]
+            positions = np.arange(len(targets))
+            position[targets] = positions
+            frontier = targets[position[targets] == positions]
+            mask[frontier] = True
+        return mask
+
+
+def tape_edges(tape):
+    """ (sources, targets) of each trace edge label of a tape """
+    n = len(tape)
+    index = np.arange(n)
+    edges = dict()
+    for label in TRACE_LABELS[:3]:
+        column = np.frombuffer(getattr(tape, label), dtype=np.int64)
+        has_edge = column >= 0
+        edges[label] = index[has_edge], column[has_edge]
+    operand_start = np.frombuffer(tape.operand_start, dtype=np.int64)
+    edges['operand'] = (np.repeat(index, np.diff(operand_start)),
+                        np.frombuffer(tape.operands, dtype=np.int64).copy())
+    return edges
+
+
+class GraphExport:
+    """ A trace (and constraints) as arrays: kinds[i] is the opcode of node i
+    (see OPCODE_NAMES), graphs maps each edge label to a CSRGraph, trace 
+    edges go upstream. Constraint edges are labeled by the constraint class
+    name. id2index maps the ids of the nodes to their index, index2id is 
+    its inverse (-1 for raw values of untraced calls). """
+    kind_names = OPCODE_NAMES
+
+    def __init__(self, tape, constraints=()):
+        self.tape = tape
+        constraint_edges = dict()
+        for constraint in constraints:
+            sources, targets = constraint_edges.setdefault(
+                    constraint.__class__.__name__, (list(), list()))
+            # nodes not upstream of the root are added to the tape
+            sources.append(tape.add(constraint.from_traced))
+            targets.append(tape.add(constraint.to_traced))
+        n = len(tape)
+        self.kinds = np.frombuffer(tape.opcode, dtype=np.uint8).copy()
+        self.id2index = tape.id2index
+        self.index2id = np.full(n, -1, dtype=np.int64)
+        self.index2id[np.fromiter(self.id2index.values(), dtype=np.int64, 
+                                  count=len(self.id2index))] = \
+            np.fromiter(self.id2index.keys(), dtype=np.int64, count=len(self.id2index))
+        self.graphs = {label: CSRGraph(n, sources, targets) for label, (sources, targets) 
+                       in (*tape_edges(tape).items(), *constraint_edges.items())}
+        self.upstream_graph = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def index(self, node):
+        return self.id2index[id(node)]
+
+    def kind_counts(self):
+        """ Number of nodes by kind name """
+        counts = np.bincount(self.kinds, minlength=len(self.kind_names))
+        return {name: int(count) for name, count in zip(self.kind_names, counts) if count}
+
+    def upstream(self):
+        """ The graph of all the trace edges """
+        if self.upstream_graph is None:
+            graphs = [self.graphs[label] for label in TRACE_LABELS]
+            self.upstream_graph = graphs[0].union(*graphs[1:])
+        return self.upstream_graph
+
+    def slice(self, roots):
+        """ Mask of the nodes the roots (nodes or indices) are built from """
+        return self.upstream().reachable(
+                [self.index(root) if isinstance(root, Traced) else root for root in roots])
+
+
+def export_trace(root, constraints=()):
+    """ GraphExport of the trace of root, with the constraints: an iterable,
+    a ConstraintStore, or a dict of lists (e.g. from_id_to_constraints) """
+    if isinstance(constraints, dict):
+        constraints = [constraint for node_constraints in constraints.values() 
+                       for constraint in node_constraints]
+    tape = Tape()
+    tape.record(root)
+    return GraphExport(tape, constraints)
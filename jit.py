@@ -0,0 +1,266 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Guarded specialization cache of compiled traces.
+# A jit function traces its first call, compiles the trace, and runs the
+# compiled code for later calls with inputs of the same types (and shapes).
+# The conversions applied eagerly while tracing (e.g. the __bool__ of an if)
+# are recorded as guards: the compiled code checks they give the same results,
+# otherwise the call is traced again. Elements of inputs iterated untraced (e.g.
+# a for loop over an input list) are read from the inputs, and the number of
+# elements is guarded.
+
+import collections
+import contextlib
+import inspect
+import weakref
+from traced import Traced, Function, Class, Call, NewInit, Iterator, Generator, \
+        CONVERSION_OBSERVERS, TRACE_OBSERVERS, from_traced, signature_helper
+from compiler import SourceCompiler, depends_on
+
+
+class GuardFailure(Exception):
+    """ A compiled trace does not apply to the given inputs """
+
+
+@contextlib.contextmanager
+def recording_guards():
+    """ Record the (node, conversion method name, result) of conversions """
+    guards = list()
+    def record(op1, method_name, value):
+        guards.append((op1, method_name, value))
+    CONVERSION_OBSERVERS.append(record)
+    try:
+        yield guards
+    finally:
+        CONVERSION_OBSERVERS.remove(record)
+
+
+@contextlib.contextmanager
+def recording_origins():
+    """ Record the iterators and generators traced """
+    origins = list()
+    def record(traced):
+        if isinstance(traced, (Iterator, Generator)):
+            origins.append(traced)
+    TRACE_OBSERVERS.append(record)
+    try:
+        yield origins
+    finally:
+        TRACE_OBSERVERS.remove(record)
+
+
+class GuardedCompiler(SourceCompiler):
+    """ SourceCompiler which checks the results of recorded conversions, and
+    the number of elements of the recorded origins that iterate the inputs """
+    mismatch_error = GuardFailure
+
+    def __init__(self, guards, name='f_trace', origins=()):
+        super().__init__(name)
+        self.origins = origins
+        self.guards = dict()
+        for node, method_name, value in guards:
+            self.guards.setdefault(id(node), list()).append((method_name, value))
+        self.guard_nodes = [node for node, _, _ in guards]
+
+    def compile(self, traced, inputs=(), first=()):
+        # guards first, so no code runs for inputs the trace does not apply to
+        return super().compile(traced, inputs, tuple(first) + tuple(self.guard_nodes),
+                               self.origins)
+
+    def can_iterate(self, origin):
+        # guards are checked once, not in each iteration of a loop
+        return (super().can_iterate(origin) and 
+                not depends_on(self.guard_nodes, origin))
+
+    def visit(self, traced):
+        name = yield from super().visit(traced)
+        for method_name, value in self.guards.get(id(traced), ()):
+            guard_failure = self.constant(GuardFailure)
+            self.lines.append(f"if {name}.{method_name}() != {self.constant(value)}: "
+                              f"raise {guard_failure}")
+        return name
+
+
+# inputs keyed on their type only
+SCALAR_TYPES = frozenset((int, float, complex, bool, str, bytes, type(None)))
+
+def input_guard(value, param_kind):
+    """ Cache key part of an input: its type, and shape of arrays. Values of
+    *args and **kwargs are spread as constants into the trace, so their
+    values are part of the key. """
+    if param_kind == inspect.Parameter.VAR_POSITIONAL:
+        return value
+    elif param_kind == inspect.Parameter.VAR_KEYWORD:
+        return tuple(value.items())
+    cls = type(value)
+    if cls in SCALAR_TYPES:
+        return cls
+    shape = getattr(value, 'shape', None)
+    if shape is not None:
+        return (cls, shape, getattr(value, 'dtype', None))
+    return cls
+
+
+def traced_call(result):
+    """ The Call (or NewInit of a class) of the result of a traced call, 
+    or None """
+    call = result
+    while call is not None and not isinstance(call, (Call, NewInit)):
+        call = call._trace
+    return call
+
+
+# all jit functions, with the tiered functions and classes of traced modules
+JIT_FUNCTIONS = weakref.WeakSet()
+
+class JitFunction:
+    """ A traced function (or class) that runs compiled code for inputs seen
+    before. With warmup=N, the first N calls of an input signature are only
+    traced, the trace is compiled at the next call. """
+    def __init__(self, func, maxsize=128, max_variants=8, warmup=0):
+        self.func = from_traced(func)
+        self.is_class = isinstance(self.func, type)
+        if self.is_class:
+            self.sighelper = signature_helper(self.func.__init__)
+            # self is made by the call, it is not an input
+            argument_tags = self.sighelper.argument_tags[1:]
+        else:
+            self.sighelper = signature_helper(self.func)
+            argument_tags = self.sighelper.argument_tags
+        self.param_kinds = [tag.param_kind for tag in argument_tags]
+        self.maxsize = maxsize
+        self.max_variants = max_variants
+        self.warmup = warmup
+        # key -> compiled variants, most recently compiled first
+        self.cache = collections.OrderedDict()
+        # key -> number of traced calls, while warming up
+        self.warmup_counts = dict()
+        self.hits = 0
+        self.misses = 0
+        self.guard_failures = 0
+        self.evictions = 0
+        self.compilations = 0
+        self.__name__ = self.func.__name__
+        self.__doc__ = self.func.__doc__
+        JIT_FUNCTIONS.add(self)
+
+    def __repr__(self):
+        return f"jit({self.func.__name__})"
+
+    def cache_info(self):
+        return dict(hits=self.hits, misses=self.misses,
+                    guard_failures=self.guard_failures,
+                    evictions=self.evictions, compilations=self.compilations, 
+                    size=len(self.cache))
+
+    def cache_clear(self):
+        self.cache.clear()
+        self.warmup_counts.clear()
+
+    def traced(self):
+        """ A traced callable of func, without jit """
+        return Class(self.func) if self.is_class else Function(self.func)
+
+    def bind(self, args, kwargs):
+        if self.is_class:
+            return self.sighelper.bind(None, *args, **kwargs)[1:]
+        return self.sighelper.bind(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        if (any(isinstance(arg, Traced) for arg in args) or 
+            any(isinstance(arg, Traced) for arg in kwargs.values())):
+            # called while tracing (e.g. recursion), traced as a normal call
+            return self.traced()(*args, **kwargs)
+        bound = self.bind(args, kwargs)
+        try:
+            key = tuple(map(input_guard, bound, self.param_kinds))
+            variants = self.cache.get(key, None)
+        except TypeError:
+            # unhashable *args or **kwargs values, not cached
+            key = variants = None
+        if variants is not None:
+            self.cache.move_to_end(key)
+            for i, f_compiled in enumerate(variants):
+                try:
+                    value = f_compiled(*bound)
+                except GuardFailure:
+                    self.guard_failures += 1
+                    continue
+                if i:
+                    # the variant of the last call is tried first
+                    variants.insert(0, variants.pop(i))
+                self.hits += 1
+                return value
+        self.misses += 1
+        if key is not None and self.warmup:
+            count = self.warmup_counts.get(key, 0)
+            if count < self.warmup:
+                self.warmup_counts[key] = count + 1
+                return self.traced()(*args, **kwargs)._value
+        value, f_compiled = self.trace_and_compile(args, kwargs)
+        if key is not None:
+            variants = self.cache.setdefault(key, list())
+            variants.insert(0, f_compiled)
+            del variants[self.max_variants:]
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.maxsize:
+                evicted, _ = self.cache.popitem(last=False)
+                self.warmup_counts.pop(evicted, None)
+                self.evictions += 1
+        return value
+
+    def trace_and_compile(self, args, kwargs):
+        """ Value of the call and compiled function of its trace """
+        with recording_guards() as guards, recording_origins() as origins:
+            result = self.traced()(*args, **kwargs)
+        call = traced_call(result)
+        if call is None:
+            raise TypeError(f"{self.func.__name__} is not a function of a traced module")
+        if isinstance(call, NewInit):
+            # the object is made by the compiled code, from the other arguments
+            inputs = list(call._args[1:]) + list(call._kwargs.values())
+            traced = call
+        else:
+            inputs = list(call._args) + list(call._kwargs.values())
+            traced = call._trace
+        compiler = GuardedCompiler(guards, self.func.__name__, origins)
+        f_compiled = compiler.compile(traced, inputs)
+        self.compilations += 1
+        self.last_source = compiler.source
+        return result._value, f_compiled
+
+
+def tier_stats():
+    """ Tier statistics of the jit functions, by qualified name: calls traced
+    (misses) and calls run compiled (hits), and the cache info """
+    return {f"{f.func.__module__}.{f.func.__qualname__}": f.cache_info() 
+            for f in list(JIT_FUNCTIONS)}
+
+
+def jit(func=None, maxsize=128, warmup=0):
+    """ Decorator (or function) making a jit function, see JitFunction """
+    if func is None:
+        return lambda func: JitFunction(func, maxsize, warmup=warmup)
+    return JitFunction(func, maxsize, warmup=warmup)
@@ -0,0 +1,503 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Optimization passes over traces, run between tracing and the evaluators or
+# compilers. Passes are evaluators whose hooks return the rewritten node, so
+# they walk the trace with the same explicit stack and memo. A node is only
+# copied when one of its upstream nodes was rewritten.
+# - ConstantFolder replaces subgraphs that only depend on constants by a single
+#   constant leaf.
+# - CommonSubexpressions merges the nodes that compute the same pure operation
+#   of the same operands.
+# - DeadCodePruner drops call arguments that are not used and attributes of
+#   objects that are never read.
+
+from traced import Traced, Hashable, Function, Class, Obj, NewInit, Argument, \
+        Call, Dispatch, UCall, UDispatch, Op1, Op2, GetAttr, SetAttr, GetItem, \
+        DeepTraced, Generator, trace_fields, type_kind, basic_to_traced, \
+        constant_key, CONSTANT_CLASSES
+from evaluator import Evaluator
+import builtins
+import math
+import operator
+
+# Untraced callables known to have no side effects (and not to return mutable
+# values), their calls can be folded and merged
+PURE_CALLABLES = set()
+PURE_CALLABLES.update(getattr(builtins, name) for name in (
+    'abs', 'all', 'any', 'bool', 'bytes', 'chr', 'complex', 'divmod', 'float',
+    'frozenset', 'hash', 'int', 'isinstance', 'len', 'max', 'min', 'ord',
+    'pow', 'repr', 'round', 'str', 'sum', 'tuple'))
+PURE_CALLABLES.update(f for name, f in vars(math).items() 
+                      if callable(f) and not name.startswith('_'))
+PURE_CALLABLES.update(f for name, f in vars(operator).items() 
+                      if callable(f) and not name.startswith(('_', 'i')) and
+                      name not in ('setitem', 'delitem', 'attrgetter', 
+                                   'itemgetter', 'methodcaller', 'call'))
+PURE_CALLABLES.update((str.lower, str.upper, str.strip, str.join, str.format, 
+                       str.startswith, str.endswith, str.replace, str.find,
+                       tuple.index, tuple.count, dict.get))
+
+def is_pure_call(callable_node):
+    """ True when the callable of an untraced call or dispatch is known to
+    be pure, for dispatches it is the method of the object's class """
+    match callable_node:
+        case GetAttr(_tag=tag, _op1=op1):
+            callable_ = getattr(type(op1._value), tag.name, None)
+        case Traced():
+            callable_ = callable_node._value
+        case _:
+            return False
+    try:
+        return callable_ in PURE_CALLABLES
+    except TypeError:
+        return False
+
+
+def copy_node(node, **fields):
+    """ Copy of a trace node, with the given fields replaced """
+    copy = node.__class__.__new__(node.__class__)
+    for name, value in trace_fields(node):
+        object.__setattr__(copy, name, fields.get(name, value))
+    return copy
+
+
+def same(values, new_values):
+    """ True when the rewrite of values left them as is """
+    return (len(values) == len(new_values) and
+            all(v is nv for v, nv in zip(values, new_values)))
+
+
+class Rewriter(Evaluator):
+    """ Evaluates a trace into a new trace, the identity rewrite. Input nodes
+    are kept as is. Subclasses override the hooks, and decide which call
+    arguments and object attributes are kept. """
+    def __init__(self, inputs=()):
+        super().__init__()
+        self.input_ids = set()
+        for node in inputs:
+            self.input_ids.add(id(node))
+            self.self2value[id(node)] = node
+
+    def keep_argument(self, traced, arg):
+        return True
+
+    def keep_attribute(self, obj, name):
+        return True
+
+    def rewrite_arguments(self, traced):
+        """ The kept arguments of a call, the self of a NewInit always is """
+        def rewritten(arg):
+            new_arg = self(arg)
+            if isinstance(new_arg, Argument):
+                return new_arg
+            # e.g. substituted by a constant, the argument is still bound
+            return copy_node(arg, _trace=new_arg)
+        args = tuple(rewritten(arg) for i, arg in enumerate(traced._args)
+                     if (i == 0 and isinstance(traced, NewInit)) or 
+                     self.keep_argument(traced, arg))
+        kwargs = {name: rewritten(arg) for name, arg in traced._kwargs.items()
+                  if self.keep_argument(traced, arg)}
+        return args, kwargs
+
+    def new_init(self, call_env, traced):
+        obj = self(traced._trace)
+        obj._attributes.update((name, self(attribute)) for name, attribute 
+                               in traced._trace._attributes.items()
+                               if self.keep_attribute(traced._trace, name))
+        args, kwargs = self.rewrite_arguments(traced)
+        return copy_node(traced, _trace=obj, _args=args, _kwargs=kwargs)
+
+    def obj(self, traced):
+        # attributes are rewritten by new_init
+        return copy_node(traced, _attributes=dict())
+
+    def call(self, call_env, traced):
+        body = self(traced._trace)
+        args, kwargs = self.rewrite_arguments(traced)
+        if (body is traced._trace and same(traced._args, args) and
+            same(list(traced._kwargs.values()), list(kwargs.values()))):
+            return traced
+        return copy_node(traced, _trace=body, _args=args, _kwargs=kwargs)
+
+    def dispatch(self, call_env, traced):
+        return self.call(call_env, traced)
+
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        if (evaled_callable is traced._callable and 
+            same(traced._args, evaled_args) and
+            same(list(traced._kwargs.values()), list(evaled_kwargs.values()))):
+            return traced
+        return copy_node(traced, _callable=evaled_callable, 
+                         _args=type(traced._args)(evaled_args), 
+                         _kwargs=evaled_kwargs)
+
+    def udispatch(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        return self.ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+
+    def argument(self, traced, tag, trace):
+        new_trace = self(trace)
+        if new_trace is trace:
+            return traced
+        return copy_node(traced, _trace=new_trace)
+
+    def alias(self, traced, trace_value):
+        if trace_value is traced._trace:
+            return traced
+        return copy_node(traced, _trace=trace_value)
+
+    def constant(self, value):
+        return value
+
+    def op1(self, traced, op1):
+        if op1 is traced._op1:
+            return traced
+        return copy_node(traced, _op1=op1)
+
+    def op2(self, traced, op1, op2):
+        if op1 is traced._op1 and op2 is traced._op2:
+            return traced
+        return copy_node(traced, _op1=op1, _op2=op2)
+
+    def deeptraced(self, traced):
+        structure = self.rewrite_structure(traced._traced_value)
+        if structure is traced._traced_value:
+            return traced
+        return copy_node(traced, _traced_value=structure)
+
+    def rewrite_structure(self, value):
+        """ The structure with its traced elements rewritten, value itself
+        when none is """
+        match value:
+            case Traced():
+                return self(value)
+            case tuple() | list() | frozenset():
+                elements = [self.rewrite_structure(e) for e in value]
+                return value if same(list(value), elements) else type(value)(elements)
+            case slice():
+                parts = [self.rewrite_structure(e) 
+                         for e in (value.start, value.stop, value.step)]
+                return (value if same([value.start, value.stop, value.step], parts)
+                        else slice(*parts))
+            case dict():
+                items = [(self.rewrite_structure(k), self.rewrite_structure(v)) 
+                         for k, v in value.items()]
+                return (value if same([e for kv in value.items() for e in kv], 
+                                      [e for kv in items for e in kv])
+                        else dict(items))
+            case _:
+                return value
+
+    def traced(self, traced):
+        return traced
+
+
+def count_nodes(traced):
+    """ Number of nodes evaluated to evaluate traced """
+    rewriter = Rewriter()
+    rewriter(traced)
+    return len(rewriter.self2value)
+
+
+def object_of(node, alias_classes=(Traced, Hashable)):
+    """ The Obj that node is (through inits, arguments, calls, attributes and
+    wrappers), None when it is not an object """
+    while True:
+        match node:
+            case Obj():
+                return node
+            case NewInit() | Argument() | Call() | Dispatch():
+                node = node._trace
+            case SetAttr(_op1=op1):
+                node = op1
+            case GetAttr(_tag=tag, _op1=op1):
+                obj = object_of(op1, alias_classes)
+                if obj is None or tag.name not in obj._attributes:
+                    return None
+                node = obj._attributes[tag.name]
+            case Traced(_trace=Traced() as trace) if node.__class__ in alias_classes:
+                node = trace
+            case _:
+                return None
+
+
+def structure_elements(value):
+    """ The traced nodes held by a deep traced structure """
+    match value:
+        case Traced():
+            yield value
+        case tuple() | list() | frozenset():
+            for e in value:
+                yield from structure_elements(e)
+        case slice():
+            for e in (value.start, value.stop, value.step):
+                yield from structure_elements(e)
+        case dict():
+            for k, v in value.items():
+                yield from structure_elements(k)
+                yield from structure_elements(v)
+
+
+class ConstantFolder(Rewriter):
+    """ Replaces nodes whose upstream nodes are all constants (and not inputs)
+    by a constant leaf of their value. Objects, untraced calls (they may have
+    side effects) and iterations are not folded. """
+    def __init__(self, inputs=()):
+        super().__init__(inputs)
+        self.n_folded = 0
+
+    def is_constant(self, node):
+        return (node.__class__ in CONSTANT_CLASSES and node._trace is None and
+                id(node) not in self.input_ids)
+
+    def fold(self, traced):
+        """ The constant leaf of traced's value """
+        if type_kind(type(traced._value)).wrap is Generator:
+            # stateful, each evaluation needs its own
+            return None
+        self.n_folded += 1
+        return basic_to_traced(traced._value)
+
+    def call(self, call_env, traced):
+        body = self(traced._trace)
+        if self.is_constant(body):
+            return body
+        return super().call(call_env, traced)
+
+    def argument(self, traced, tag, trace):
+        new_trace = self(trace)
+        if self.is_constant(new_trace):
+            # the constant is used where ever the argument is
+            return new_trace
+        return super().argument(traced, tag, trace)
+
+    def alias(self, traced, trace_value):
+        if self.is_constant(trace_value):
+            return trace_value
+        return super().alias(traced, trace_value)
+
+    def op1(self, traced, op1):
+        if isinstance(traced, GetAttr):
+            # a constant attribute of an object is the constant
+            obj = object_of(traced._op1, self.alias_classes)
+            if obj is not None and traced._tag.name in obj._attributes:
+                attribute = obj._attributes[traced._tag.name]
+                value = self(attribute)._op1
+                if self.is_constant(value):
+                    return value
+        # set attributes stay, they are named by the object
+        if self.is_constant(op1) and not isinstance(traced, SetAttr):
+            folded = self.fold(traced)
+            if folded is not None:
+                return folded
+        return super().op1(traced, op1)
+
+    def op2(self, traced, op1, op2):
+        if self.is_constant(op1) and self.is_constant(op2):
+            folded = self.fold(traced)
+            if folded is not None:
+                return folded
+        if (isinstance(traced, GetItem) and isinstance(traced._op1, DeepTraced) and
+            traced._trace is not None and self.is_constant(op2)):
+            # constant key of a structure, the traced element itself
+            return self(traced._trace)
+        return super().op2(traced, op1, op2)
+
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        # also untraced dispatches, their method is constant when their object is
+        if (self.is_constant(evaled_callable) and is_pure_call(traced._callable) and
+            all(self.is_constant(arg) for arg in evaled_args 
+                if isinstance(arg, Traced)) and
+            all(self.is_constant(arg) for arg in evaled_kwargs.values() 
+                if isinstance(arg, Traced))):
+            folded = self.fold(traced)
+            if folded is not None:
+                return folded
+        return super().ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+
+    def deeptraced(self, traced):
+        new_traced = super().deeptraced(traced)
+        if all(self.is_constant(e) 
+               for e in structure_elements(new_traced._traced_value)):
+            folded = self.fold(traced)
+            if folded is not None:
+                return folded
+        return new_traced
+
+
+class CommonSubexpressions(Rewriter):
+    """ Merges the nodes that compute the same pure operation: operators,
+    attribute and item gets, wrappers, untraced calls of pure callables, and
+    equal constant leaves. Nodes are keyed on their kind, tag, and the
+    identity (or constant_key, recursive in tuples, when constant) of their
+    rewritten operands. Arguments, calls and objects are never merged, they
+    belong to their call. """
+    def __init__(self, inputs=()):
+        super().__init__(inputs)
+        self.nodes = dict()
+        self.n_merged = 0
+
+    def merge(self, node, key):
+        """ The first node rewritten with key """
+        try:
+            merged = self.nodes.setdefault(key, node)
+        except TypeError:
+            # unhashable constant
+            return node
+        if merged is not node:
+            self.n_merged += 1
+        return merged
+
+    def operand_key(self, operand):
+        if isinstance(operand, Traced):
+            return id(operand)
+        return constant_key(operand)
+
+    def traced(self, traced):
+        if traced.__class__ in CONSTANT_CLASSES and traced._trace is None:
+            return self.merge(traced, (traced.__class__, constant_key(traced._value)))
+        return traced
+
+    def alias(self, traced, trace_value):
+        node = super().alias(traced, trace_value)
+        return self.merge(node, (node.__class__, id(trace_value)))
+
+    def op1(self, traced, op1):
+        node = super().op1(traced, op1)
+        match node:
+            case SetAttr():
+                return node
+            case GetAttr(_tag=tag):
+                return self.merge(node, (node.__class__, tag.name, id(op1)))
+            case _:
+                return self.merge(node, (node.__class__, id(op1)))
+
+    def op2(self, traced, op1, op2):
+        node = super().op2(traced, op1, op2)
+        return self.merge(node, (node.__class__, id(op1), id(op2)))
+
+    def ucall(self, traced, evaled_callable, evaled_args, evaled_kwargs):
+        node = super().ucall(traced, evaled_callable, evaled_args, evaled_kwargs)
+        if not is_pure_call(traced._callable):
+            return node
+        return self.merge(node, (node.__class__, id(evaled_callable),
+                                 tuple(map(self.operand_key, evaled_args)),
+                                 tuple((name, self.operand_key(arg)) 
+                                       for name, arg in evaled_kwargs.items())))
+
+
+class DeadCodePruner(Rewriter):
+    """ Keeps the call arguments used by the call bodies, and the attributes
+    that are read of objects that do not escape. An object escapes when it is
+    the result, or is used otherwise than by getting its attributes (e.g. as
+    untraced call argument or structure element). """
+    def __init__(self, inputs=()):
+        super().__init__(inputs)
+        self.live = set()
+        self.reads = dict()
+        self.escaped = set()
+        self.n_pruned = 0
+
+    def __call__(self, traced):
+        if not self.live:
+            self.find_live(traced)
+        return super().__call__(traced)
+
+    def keep_argument(self, traced, arg):
+        if id(arg) in self.live:
+            return True
+        self.n_pruned += 1
+        return False
+
+    def keep_attribute(self, obj, name):
+        if id(obj) in self.escaped or name in self.reads.get(id(obj), ()):
+            return True
+        self.n_pruned += 1
+        return False
+
+    def find_live(self, root):
+        """ The nodes needed to evaluate root, an attribute is needed once it
+        is read or its object escapes """
+        pending = [root]
+        def use(node, name=None, escapes=True):
+            obj = object_of(node, self.alias_classes)
+            if obj is not None:
+                if name is not None:
+                    names = self.reads.setdefault(id(obj), set())
+                    if name not in names:
+                        names.add(name)
+                        if name in obj._attributes:
+                            pending.append(obj._attributes[name])
+                elif escapes and id(obj) not in self.escaped:
+                    self.escaped.add(id(obj))
+                    pending.extend(obj._attributes.values())
+            pending.append(node)
+        use(root)
+        live = self.live
+        while pending:
+            node = pending.pop()
+            if id(node) in live:
+                continue
+            live.add(id(node))
+            if id(node) in self.input_ids:
+                continue
+            match node:
+                case NewInit():
+                    use(node._trace, escapes=False)
+                    use(node._args[0], escapes=False)
+                case Call() | Dispatch() | Argument():
+                    use(node._trace, escapes=False)
+                case UCall() | UDispatch():
+                    use(node._callable)
+                    for arg in list(node._args) + list(node._kwargs.values()):
+                        if isinstance(arg, Traced):
+                            use(arg)
+                case GetAttr(_tag=tag, _op1=op1):
+                    use(op1, name=tag.name)
+                case Op1(_op1=op1):
+                    use(op1)
+                case Op2(_op1=op1, _op2=op2):
+                    use(op1)
+                    use(op2)
+                case DeepTraced():
+                    for e in structure_elements(node._traced_value):
+                        use(e)
+                case Traced(_trace=Traced() as trace) if node.__class__ in self.alias_classes:
+                    use(trace, escapes=False)
+
+
+def optimize(traced, inputs=()):
+    """ Constant folded, merged and pruned trace of traced, and a report of
+    the node counts before and after. The input nodes are kept, they are the
+    values that change between evaluations. """
+    folder = ConstantFolder(inputs)
+    folded = folder(traced)
+    merger = CommonSubexpressions(inputs)
+    merged = merger(folded)
+    pruner = DeadCodePruner(inputs)
+    pruned = pruner(merged)
+    report = dict(before=count_nodes(traced), after=count_nodes(pruned),
+                  folded=folder.n_folded, merged=merger.n_merged, 
+                  pruned=pruner.n_pruned)
+    return pruned, report
@@ -24,20 +24,19 @@ SOFTWARE.
 
 from traced import Traced, NewInit, Obj, Call, Dispatch, UCall, UDispatch, \
         Argument, Op1, Op2, GetAttr, SetAttr, DeepTraced, to_deep, rebuild_deep, \
-        Iterator, Iteration, Generator, Generation
+        Iterator, Iteration, Generator, Generation, BuiltinOp1, BuiltinOp2, \
+        trace_fields
 from constraints import BuildUpstreamConstraints
+from tape import opcode_of, ALIAS, ITERATION, GENERATION
+import collections
 import graphviz
+import html
 
 class Render:
     def __init__(self):
         pass
 
-    def to_graph(self, value):
-        buc = BuildUpstreamConstraints()
-        buc(value)
-        id2constraints = buc.from_id_to_constraints
-
-
+    def to_graph(self, value, constraints=False):
         self.dot = graphviz.Digraph('Graph')
         self.dot.attr(rankdir='TB', size='5,5', dpi='300', pad="0.1")
         self.dot.attr('node', shape='plain')
@@ -47,6 +46,20 @@ class Render:
         self.rendered_nodes = set()
 
         self.apply_node_and_edges(value)
+        if constraints:
+            buc = BuildUpstreamConstraints()
+            buc(value)
+            self.apply_constraints(buc.from_id_to_constraints)
+
+    def apply_constraints(self, id2constraints):
+        """ Constraints between rendered nodes, as dashed edges """
+        for constraints in id2constraints.values():
+            for constraint in constraints:
+                from_id, to_id = id(constraint.from_traced), id(constraint.to_traced)
+                if from_id in self.rendered_nodes and to_id in self.rendered_nodes:
+                    self.dot.edge(str(from_id), str(to_id), 
+                                  label=constraint.__class__.__name__,
+                                  style='dashed', color='blue', constraint='false')
 
     def mk_node_label(self, value):
         def val(x):
@@ -95,6 +108,13 @@ class Render:
                                     <TD>{tag.name}</TD>
                                 </TR>
                             </TABLE>>"""
+            case BuiltinOp1(_value=x) | BuiltinOp2(_value=x):
+                return  f"""<<TABLE>
+                                <TR>
+                                    <TD>{html.escape(value._symbol or value._name)}</TD>
+                                    <TD>{val(x)}</TD>
+                                </TR>
+                            </TABLE>>"""
             case DeepTraced(_value=x):
                 return  f"""<<TABLE>
                                 <TR>
@@ -185,7 +205,7 @@ class Render:
                     td = TraverseDeep(self, value)
                     td.apply_deep_edges(value._traced_value)
                 case Traced():
-                    for e_name, n_1 in value.__dict__.items():
+                    for e_name, n_1 in trace_fields(value):
                         if e_name not in {'_tag', '_value'}:
                             match n_1:
                                 case Traced():
@@ -222,7 +242,217 @@ class TraverseDeep:
         self.renderer.apply_node_and_edges(n_1)
         return n_1
 
-        
 
+def short_value(x):
+    if isinstance(x, (int, float, complex, bool, str, bytes, type(None))):
+        return repr(x)
+    elif hasattr(x, '__name__'):
+        return getattr(x, '__name__')
+    else:
+        return x.__class__.__name__
+
+
+def node_text(node, max_length=40):
+    """ One line label of a node """
+    name = node.__class__.__name__
+    match node:
+        case Argument(_tag=tag) | GetAttr(_tag=tag) | SetAttr(_tag=tag):
+            detail = tag.name
+        case BuiltinOp1() | BuiltinOp2():
+            name, detail = node._symbol or node._name, short_value(node._value)
+        case Iteration(_count=count) | Generation(_count=count):
+            detail = str(count)
+        case NewInit() | Obj() | Iterator() | Generator() | DeepTraced():
+            detail = node._value.__class__.__name__
+        case Call() | Dispatch() | UCall() | UDispatch():
+            detail = short_value(node._callable._value)
+        case _:
+            detail = short_value(node._value)
+    text = f"{name} {detail}"
+    return text if len(text) <= max_length else text[:max_length-3] + '...'
+
+
+def dot_quote(text):
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def upstream_edges(node):
+    """ The (edge name, node) of the traced nodes a node refers to, named as
+    Render names its edges """
+    edges = list()
+    if isinstance(node, DeepTraced):
+        def process_traced(element):
+            edges.append(('deep:'+str(len(edges)), element))
+            return element
+        rebuild_deep(node._traced_value, to_deep, process_traced)
+        return edges
+    for e_name, n_1 in trace_fields(node):
+        if e_name in ('_tag', '_value'):
+            continue
+        match n_1:
+            case Traced():
+                edges.append((e_name, n_1))
+            case tuple():
+                edges.extend((e_name+':'+str(idx), n_1_e) for idx, n_1_e 
+                             in enumerate(n_1) if isinstance(n_1_e, Traced))
+            case dict():
+                edges.extend((e_name+':'+str(item), n_1_e) for item, n_1_e 
+                             in n_1.items() if isinstance(n_1_e, Traced))
+    return edges
+
+
+def iteration_of(node):
+    """ The Iteration (or Generation) a node is, or is an alias of, or None """
+    opcode = opcode_of(node)
+    while opcode == ALIAS:
+        node = node._trace
+        opcode = opcode_of(node)
+    return node if opcode in (ITERATION, GENERATION) else None
+
+
+class DotWriter:
+    """ Writes the DOT graph of a trace to a file as it walks the trace, 
+    breadth first from the root, with one line labels. Nothing is kept but
+    the names of the nodes met. Level of detail:
+    - max_depth: the nodes max_depth edges upstream of the root are drawn
+      dashed, and their upstream nodes not at all.
+    - max_nodes: budget of the nodes drawn with their upstream edges, the
+      nodes met after it is spent are drawn dashed.
+    - call_depth: calls (and dispatches) nested deeper are drawn with a
+      double border and without their body.
+    - max_run: runs of more than max_run iterations (or generations) of the 
+      same iterator in a structure are drawn as their first and last, with
+      a summary node between them.
+    - constraints: dict of lists of constraints (from_id_to_constraints), 
+      drawn as dashed edges between the drawn nodes. """
+    def __init__(self, file, max_depth=None, max_nodes=None, call_depth=None,
+                 max_run=4, constraints=None):
+        self.file = file
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.call_depth = call_depth
+        self.max_run = max_run
+        self.constraints = constraints
+        self.names = dict()
+        self.n_nodes = 0
+        self.n_edges = 0
+        self.n_collapsed = 0
+        self.n_hidden = 0
+        self.n_summaries = 0
+
+    def name(self, node):
+        """ Name of the node, and True when it is new """
+        name = self.names.get(id(node), None)
+        if name is not None:
+            return name, False
+        name = 'n'+str(len(self.names))
+        self.names[id(node)] = name
+        return name, True
+
+    def write_node(self, name, text, **attributes):
+        attributes['label'] = dot_quote(text)
+        self.file.write(f"  {name} [" + 
+                        ', '.join(f"{key}={value}" for key, value in attributes.items()) +
+                        "];\n")
+        self.n_nodes += 1
+
+    def write_edge(self, name_0, name_1, label, **attributes):
+        attributes['label'] = dot_quote(label)
+        self.file.write(f"  {name_0} -> {name_1} [" +
+                        ', '.join(f"{key}={value}" for key, value in attributes.items()) +
+                        "];\n")
+        self.n_edges += 1
+
+    def __call__(self, root):
+        self.file.write("digraph Graph {\n  rankdir=TB;\n"
+                        "  node [shape=box, fontsize=10];\n"
+                        "  edge [fontsize=8];\n")
+        root_name, _ = self.name(root)
+        queue = collections.deque(((root, root_name, 0, 0),))
+        n_expanded = 0
+        while queue:
+            node, name, depth, calls = queue.popleft()
+            if ((self.max_depth is not None and depth >= self.max_depth) or
+                (self.max_nodes is not None and n_expanded >= self.max_nodes)):
+                self.write_node(name, node_text(node), style='dashed')
+                self.n_collapsed += 1
+                continue
+            n_expanded += 1
+            is_call = isinstance(node, (Call, Dispatch))
+            if is_call and self.call_depth is not None and calls >= self.call_depth:
+                self.write_node(name, node_text(node), peripheries=2)
+                self.n_collapsed += 1
+                skipped = '_trace'
+            else:
+                self.write_node(name, node_text(node))
+                skipped = None
+            edges = upstream_edges(node)
+            if isinstance(node, DeepTraced) and self.max_run is not None:
+                edges = self.collapse_runs(name, edges)
+            for e_name, n_1 in edges:
+                if e_name == skipped:
+                    continue
+                name_1, is_new = self.name(n_1)
+                self.write_edge(name, name_1, e_name)
+                if is_new:
+                    body = is_call and e_name == '_trace'
+                    queue.append((n_1, name_1, depth+1, calls+1 if body else calls))
+        if self.constraints is not None:
+            self.write_constraints()
+        self.file.write("}\n")
+        return self
+
+    def collapse_runs(self, name, edges):
+        """ The edges, less the middle of the long runs of iterations, which
+        are summarized by a node """
+        kept = list()
+        run = list()
+        def flush():
+            if len(run) <= self.max_run:
+                kept.extend(run)
+            else:
+                summary_name = 's'+str(self.n_summaries)
+                self.n_summaries += 1
+                kind = iteration_of(run[0][1]).__class__.__name__
+                self.write_node(summary_name, f"... {len(run)-2} {kind}s", shape='note')
+                # e.g. deep:1..9
+                self.write_edge(name, summary_name, 
+                                run[1][0]+'..'+run[-2][0].split(':')[-1], style='dotted')
+                self.n_hidden += len(run) - 2
+                kept.append(run[0])
+                kept.append(run[-1])
+            run.clear()
+        previous = None
+        for e_name, n_1 in edges:
+            iteration = iteration_of(n_1)
+            if iteration is None:
+                flush()
+                previous = None
+                kept.append((e_name, n_1))
+                continue
+            origin = (iteration._iterator if isinstance(iteration, Iteration) else
+                      iteration._generator)
+            if (previous is None or previous[0] is not origin or 
+                previous[1] + 1 != iteration._count):
+                flush()
+            run.append((e_name, n_1))
+            previous = (origin, iteration._count)
+        flush()
+        return kept
+
+    def write_constraints(self):
+        """ Constraints between the drawn nodes, as dashed edges """
+        names = self.names
+        for constraints in self.constraints.values():
+            for constraint in constraints:
+                name_0 = names.get(id(constraint.from_traced), None)
+                name_1 = names.get(id(constraint.to_traced), None)
+                if name_0 is not None and name_1 is not None:
+                    self.write_edge(name_0, name_1, constraint.__class__.__name__,
+                                    style='dashed', color='blue', constraint='false')
 
 
+def write_dot(root, path, **options):
+    """ Write the DOT graph of the trace of root to a file, see DotWriter """
+    with open(path, 'w') as file:
+        return DotWriter(file, **options)(root)
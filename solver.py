@@ -0,0 +1,313 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Fixpoint solver over the constraints extracted by BuildUpstreamConstraints.
+# Nodes known to be the same value are merged in equality classes (union-find):
+# the argument and its content (Arg2Content), the object and its init
+# (HasInit), and the reads and writes of an attribute of the same object
+# (HasAttr), so attributes unify as in a flow insensitive analysis. Each class
+# has a fact per lattice (e.g. types, units, shapes), the join of the facts of
+# its nodes. Lattices may also propagate facts along other constraints.
+# Constraints wait in a worklist, a constraint is visited again when a fact of
+# one of its classes changes. Constraints can be added after solving, solve()
+# then only visits what the new constraints change.
+
+import collections
+from traced import GetAttr, SetAttr
+from constraints import ConstraintStore, BuildUpstreamConstraints, \
+        HasAttr, HasInit, Arg2Content
+
+
+class Top:
+    """ The top of a lattice: conflicting facts """
+    def __repr__(self):
+        return 'TOP'
+
+TOP = Top()
+
+
+class Lattice:
+    """ Facts about nodes, ordered by join. Subclasses give the fact of a node
+    (initial) and the join of two facts. """
+    name = None
+    bottom = None
+
+    def initial(self, traced):
+        """ Fact of a node, before solving """
+        return self.bottom
+
+    def join(self, fact1, fact2):
+        raise NotImplementedError
+
+    def propagate(self, solver, constraint):
+        """ The (node, fact) updates implied by the constraint, the facts of
+        its nodes are given by solver.fact """
+        return ()
+
+
+class FlatLattice(Lattice):
+    """ Facts are equal or conflicting """
+    def join(self, fact1, fact2):
+        if fact1 is None:
+            return fact2
+        if fact2 is None or fact1 == fact2:
+            return fact1
+        return TOP
+
+
+class TypeLattice(Lattice):
+    """ The set of types of a node's values, widened to object when there 
+    are more than max_types """
+    name = 'type'
+    bottom = frozenset()
+
+    def __init__(self, max_types=8):
+        self.max_types = max_types
+
+    def initial(self, traced):
+        return frozenset((type(traced._value),))
+
+    def join(self, fact1, fact2):
+        fact = fact1 | fact2
+        if len(fact) > self.max_types:
+            return frozenset((object,))
+        return fact
+
+
+class UnitLattice(FlatLattice):
+    """ Units of nodes, given by unit_of(traced) for the nodes that have one
+    (None otherwise) """
+    name = 'unit'
+
+    def __init__(self, unit_of):
+        self.unit_of = unit_of
+
+    def initial(self, traced):
+        return self.unit_of(traced)
+
+
+class ShapeLattice(Lattice):
+    """ Shapes of the (array) values of nodes, dimensions that differ are 
+    None, and shapes of different lengths conflict """
+    name = 'shape'
+
+    def initial(self, traced):
+        shape = getattr(traced._value, 'shape', None)
+        return None if shape is None else tuple(shape)
+
+    def join(self, fact1, fact2):
+        if fact1 is None or fact1 is TOP:
+            return fact2 if fact1 is None else fact1
+        if fact2 is None or fact2 is TOP:
+            return fact1 if fact2 is None else fact2
+        if len(fact1) != len(fact2):
+            return TOP
+        return tuple(d1 if d1 == d2 else None for d1, d2 in zip(fact1, fact2))
+
+
+# constraints whose nodes are the same value
+EQUALITY_CONSTRAINTS = (Arg2Content, HasInit)
+
+
+class EquivalenceClass:
+    """ Nodes known to be the same value: their facts (a list, by lattice),
+    the constraints of their nodes, and the attribute name -> node id of the
+    attribute values """
+    __slots__ = ('size', 'facts', 'constraints', 'fields')
+
+    def __init__(self, facts):
+        self.size = 1
+        self.facts = facts
+        self.constraints = list()
+        self.fields = None
+
+
+class Solver:
+    """ Worklist solver of lattice facts over constraints, see module notes """
+    def __init__(self, lattices, equalities=EQUALITY_CONSTRAINTS):
+        self.lattices = list(lattices)
+        self.lattice_index = {lattice.name: i for i, lattice in enumerate(self.lattices)}
+        self.equalities = equalities
+        # constraints are only visited again for lattices that propagate
+        self.propagating = [lattice for lattice in self.lattices 
+                            if type(lattice).propagate is not Lattice.propagate]
+        self.store = ConstraintStore()
+        # node id -> node, the solver keeps its nodes alive
+        self.nodes = dict()
+        # union-find of node ids, roots are the ids of the classes
+        self.parent = dict()
+        self.classes = dict()
+        self.worklist = collections.deque()
+        self.queued = set()
+        self.n_visits = 0
+
+    def add_constraints(self, constraints):
+        """ Add constraints: an iterable, or a dict of lists of constraints
+        (e.g. from_id_to_constraints) """
+        if isinstance(constraints, dict):
+            constraints = (constraint for node_constraints in constraints.values() 
+                           for constraint in node_constraints)
+        for constraint in constraints:
+            self.add(constraint)
+        return self
+
+    def add(self, constraint):
+        if not self.store.add(constraint):
+            return
+        if self.propagating:
+            for traced in (constraint.from_traced, constraint.to_traced):
+                self.classes[self.find(self.node_id(traced))].constraints.append(constraint)
+        # the constraints are the store's, queued by identity
+        self.queued.add(id(constraint))
+        self.worklist.append(constraint)
+
+    def node_id(self, traced):
+        """ Id of the node, added as a class of its own when new """
+        key = id(traced)
+        if key not in self.parent:
+            self.nodes[key] = traced
+            self.parent[key] = key
+            self.classes[key] = EquivalenceClass(
+                    [lattice.initial(traced) for lattice in self.lattices])
+        return key
+
+    def find(self, key):
+        parent = self.parent
+        root = parent[key]
+        if root == key:
+            return key
+        while parent[root] != root:
+            root = parent[root]
+        while parent[key] != root:
+            parent[key], key = root, parent[key]
+        return root
+
+    def enqueue(self, constraints):
+        queued = self.queued
+        for constraint in constraints:
+            if id(constraint) not in queued:
+                queued.add(id(constraint))
+                self.worklist.append(constraint)
+
+    def union(self, key1, key2):
+        """ Merge the classes of the two node ids, and then the classes of
+        the attributes both classes have """
+        pending = [(key1, key2)]
+        while pending:
+            key1, key2 = pending.pop()
+            root1, root2 = self.find(key1), self.find(key2)
+            if root1 == root2:
+                continue
+            class1, class2 = self.classes[root1], self.classes[root2]
+            if class1.size < class2.size:
+                root1, root2, class1, class2 = root2, root1, class2, class1
+            self.parent[root2] = root1
+            del self.classes[root2]
+            class1.size += class2.size
+            facts = [lattice.join(fact1, fact2) for lattice, fact1, fact2 
+                     in zip(self.lattices, class1.facts, class2.facts)]
+            if self.propagating:
+                if facts != class1.facts:
+                    self.enqueue(class1.constraints)
+                if facts != class2.facts:
+                    self.enqueue(class2.constraints)
+                class1.constraints.extend(class2.constraints)
+            class1.facts = facts
+            if class2.fields:
+                if class1.fields is None:
+                    class1.fields = dict()
+                for name, field_key in class2.fields.items():
+                    other_key = class1.fields.setdefault(name, field_key)
+                    if other_key != field_key:
+                        pending.append((other_key, field_key))
+
+    def unify_field(self, obj, name, traced):
+        """ The node is the value of the attribute of the object """
+        obj_class = self.classes[self.find(self.node_id(obj))]
+        key = self.node_id(traced)
+        if obj_class.fields is None:
+            obj_class.fields = dict()
+        field_key = obj_class.fields.setdefault(name, key)
+        if field_key != key:
+            self.union(field_key, key)
+
+    def update(self, traced, lattice, fact):
+        """ Join the fact of a lattice into the class of the node """
+        node_class = self.classes[self.find(self.node_id(traced))]
+        i = self.lattice_index[lattice.name]
+        new_fact = lattice.join(node_class.facts[i], fact)
+        if new_fact != node_class.facts[i]:
+            node_class.facts[i] = new_fact
+            if self.propagating:
+                self.enqueue(node_class.constraints)
+
+    def visit(self, constraint):
+        from_traced, to_traced = constraint.from_traced, constraint.to_traced
+        if isinstance(constraint, self.equalities):
+            self.union(self.node_id(from_traced), self.node_id(to_traced))
+        elif isinstance(constraint, HasAttr):
+            if isinstance(to_traced, SetAttr):
+                self.unify_field(from_traced, to_traced._tag.name, to_traced)
+            elif isinstance(from_traced, GetAttr):
+                self.unify_field(to_traced, from_traced._tag.name, from_traced)
+        for lattice in self.propagating:
+            for traced, fact in lattice.propagate(self, constraint):
+                self.update(traced, lattice, fact)
+
+    def solve(self):
+        """ Visit the queued constraints until no fact changes """
+        worklist, queued = self.worklist, self.queued
+        while worklist:
+            constraint = worklist.popleft()
+            queued.discard(id(constraint))
+            self.n_visits += 1
+            self.visit(constraint)
+        return self
+
+    def fact(self, traced, name):
+        """ Fact of the node for the named lattice """
+        i = self.lattice_index[name]
+        if id(traced) not in self.parent:
+            return self.lattices[i].initial(traced)
+        return self.classes[self.find(id(traced))].facts[i]
+
+    def facts_of(self, traced):
+        """ Facts of the node, by lattice name """
+        return {lattice.name: self.fact(traced, lattice.name) 
+                for lattice in self.lattices}
+
+    def same_class(self, traced1, traced2):
+        """ True when the nodes are known to be the same value """
+        if traced1 is traced2:
+            return True
+        if id(traced1) not in self.parent or id(traced2) not in self.parent:
+            return False
+        return self.find(id(traced1)) == self.find(id(traced2))
+
+
+def solve(traced, lattices):
+    """ Solver of the upstream constraints of a trace """
+    buc = BuildUpstreamConstraints()
+    buc(traced)
+    return Solver(lattices).add_constraints(buc.from_id_to_constraints).solve()
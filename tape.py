@@ -0,0 +1,361 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Columnar (array backed) trace tape.
+# A tape stores traced nodes in creation order, so operands always come before
+# the nodes that use them. Node handles are the integer indices into the tape.
+
+import array
+import contextlib
+import weakref
+from traced import Traced, DeepTraced, Obj, NewInit, Call, Dispatch, UCall, \
+        UDispatch, Argument, Op1, Op2, GetAttr, SetAttr, GetItem, \
+        BuiltinOp1, BuiltinOp2, Iterator, Iteration, Generator, Generation, \
+        TRACE_OBSERVERS
+
+# Opcodes, in the order of OPCODE_NAMES
+CONST = 0       # leaf value
+ALIAS = 1       # wrapper of an upstream trace (e.g. Hashable of a Call)
+DEEP = 2
+OBJ = 3
+NEWINIT = 4
+ARGUMENT = 5
+CALL = 6
+DISPATCH = 7
+UCALL = 8
+UDISPATCH = 9
+GETATTR = 10
+SETATTR = 11
+GETITEM = 12
+OP1 = 13
+OP2 = 14
+ITERATOR = 15
+ITERATION = 16
+GENERATOR = 17
+GENERATION = 18
+
+OPCODE_NAMES = ('const', 'alias', 'deep', 'obj', 'new_init', 'argument',
+                'call', 'dispatch', 'ucall', 'udispatch', 'getattr', 'setattr',
+                'getitem', 'op1', 'op2', 'iterator', 'iteration', 'generator',
+                'generation')
+
+# Checked in order, most specific node classes first
+NODE_CLASS_OPCODES = ((NewInit, NEWINIT), (Obj, OBJ), (Call, CALL),
+                      (Dispatch, DISPATCH), (UCall, UCALL),
+                      (UDispatch, UDISPATCH), (Argument, ARGUMENT),
+                      (GetAttr, GETATTR), (SetAttr, SETATTR),
+                      (GetItem, GETITEM), (Op1, OP1), (Op2, OP2),
+                      (DeepTraced, DEEP), (Iterator, ITERATOR),
+                      (Iteration, ITERATION), (Generator, GENERATOR),
+                      (Generation, GENERATION))
+
+_class_opcodes = dict()
+
+def opcode_of(node):
+    """ The tape opcode of a traced node """
+    cls = node.__class__
+    opcode = _class_opcodes.get(cls, None)
+    if opcode is None:
+        opcode = CONST
+        for node_class, node_opcode in NODE_CLASS_OPCODES:
+            if issubclass(cls, node_class):
+                opcode = node_opcode
+                break
+        _class_opcodes[cls] = opcode
+    if opcode == CONST and node._trace is not None:
+        return ALIAS
+    return opcode
+
+
+class TapeRef:
+    """ Placeholder for the n-th traced element of a deep structure template """
+    __slots__ = ('n',)
+
+    def __init__(self, n):
+        self.n = n
+
+    def __repr__(self):
+        return f"TapeRef({self.n})"
+
+
+def deep_template(value, elements):
+    """ Copy of a deep structure, traced elements moved to elements """
+    match value:
+        case Traced():
+            elements.append(value)
+            return TapeRef(len(elements)-1)
+        case tuple():
+            return tuple(deep_template(e, elements) for e in value)
+        case list():
+            return [deep_template(e, elements) for e in value]
+        case slice():
+            return slice(deep_template(value.start, elements),
+                         deep_template(value.stop, elements),
+                         deep_template(value.step, elements))
+        case frozenset():
+            return frozenset(deep_template(e, elements) for e in value)
+        case dict():
+            return {deep_template(k, elements): deep_template(v, elements)
+                    for k, v in value.items()}
+        case _:
+            return value
+
+
+def fill_template(template, element_values):
+    """ Rebuild a deep structure from its template and element values """
+    match template:
+        case TapeRef(n=n):
+            return element_values[n]
+        case tuple():
+            return tuple(fill_template(e, element_values) for e in template)
+        case list():
+            return [fill_template(e, element_values) for e in template]
+        case slice():
+            return slice(fill_template(template.start, element_values),
+                         fill_template(template.stop, element_values),
+                         fill_template(template.step, element_values))
+        case frozenset():
+            return frozenset(fill_template(e, element_values) for e in template)
+        case dict():
+            return {fill_template(k, element_values): fill_template(v, element_values)
+                    for k, v in template.items()}
+        case _:
+            return template
+
+
+def node_upstream(node):
+    """ The traced nodes (and raw call arguments) a node is built from """
+    opcode = opcode_of(node)
+    upstream = list()
+    if opcode in (CALL, DISPATCH, UCALL, UDISPATCH):
+        upstream.append(node._callable)
+    if opcode in (CALL, DISPATCH, UCALL, UDISPATCH, NEWINIT):
+        upstream.extend(node._args)
+        upstream.extend(node._kwargs.values())
+    if opcode == NEWINIT:
+        upstream.extend(node._trace._attributes.values())
+    elif opcode == DEEP:
+        deep_template(node._traced_value, upstream)
+    elif opcode in (GETATTR, SETATTR, GETITEM, OP1, OP2):
+        upstream.append(node._op1)
+        if opcode in (GETITEM, OP2):
+            upstream.append(node._op2)
+    elif opcode == ITERATOR:
+        upstream.append(node._iterable)
+    elif opcode == ITERATION:
+        upstream.append(node._iterator)
+    elif opcode == GENERATION:
+        upstream.append(node._generator)
+    if node._trace is not None:
+        upstream.append(node._trace)
+    return upstream
+
+
+class Tape:
+    """ Columnar record of traced nodes, with integer node handles """
+    def __init__(self):
+        self.opcode = array.array('B')
+        # -1 stands for 'none' in the index columns
+        self.tag = array.array('q')
+        self.trace = array.array('q')
+        self.op1 = array.array('q')
+        self.op2 = array.array('q')
+        self.value = array.array('q')
+        # operands of node i are operands[operand_start[i]:operand_start[i+1]]
+        self.operand_start = array.array('q', (0,))
+        self.operands = array.array('q')
+        # side tables
+        self.values = list()
+        self.tags = list()
+        self.tag_ids = dict()
+        # sparse extra details: kwarg names, deep templates, counts, ...
+        self.info = dict()
+        # the recorded nodes are referenced weakly, their id is forgotten when
+        # they are freed, as it may be reused by a new node
+        self.id2index = dict()
+        self.node_refs = dict()
+        self_ref = weakref.ref(self)
+        def forget(node_ref):
+            tape = self_ref()
+            if tape is not None and tape.node_refs.get(node_ref.key) is node_ref:
+                del tape.node_refs[node_ref.key]
+                del tape.id2index[node_ref.key]
+        self.forget = forget
+
+    def __len__(self):
+        return len(self.opcode)
+
+    def index(self, node):
+        """ The tape index of a recorded node """
+        return self.id2index[id(node)]
+
+    def operands_of(self, idx):
+        return self.operands[self.operand_start[idx]:self.operand_start[idx+1]]
+
+    def tag_of(self, idx):
+        tag_id = self.tag[idx]
+        return self.tags[tag_id] if tag_id >= 0 else None
+
+    def value_of(self, idx):
+        return self.values[self.value[idx]]
+
+    def upstream_of(self, idx):
+        """ All tape indices node idx is built from """
+        upstream = [i for i in (self.trace[idx], self.op1[idx], self.op2[idx])
+                    if i >= 0]
+        upstream.extend(self.operands_of(idx))
+        return upstream
+
+    def live(self, root):
+        """ Mask of the indices root depends on, one reverse pass """
+        live = bytearray(root+1)
+        live[root] = 1
+        for idx in range(root, -1, -1):
+            if live[idx]:
+                for upstream_idx in self.upstream_of(idx):
+                    live[upstream_idx] = 1
+        return live
+
+    def tag_id(self, tag):
+        tag_id = self.tag_ids.get(tag, None)
+        if tag_id is None:
+            tag_id = len(self.tags)
+            self.tags.append(tag)
+            self.tag_ids[tag] = tag_id
+        return tag_id
+
+    def add(self, x):
+        """ Index of x, recording it (and its upstream) when not yet done """
+        if isinstance(x, Traced):
+            idx = self.id2index.get(id(x), None)
+            return idx if idx is not None else self.record(x)
+        else:
+            return self.append_entry(CONST, value=x)
+
+    def record(self, root):
+        """ Record a finished trace, upstream first, returns the root index """
+        stack = [(root, False)]
+        in_progress = set()
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self.id2index:
+                continue
+            if expanded:
+                in_progress.discard(id(node))
+                self.append(node)
+            else:
+                in_progress.add(id(node))
+                stack.append((node, True))
+                for upstream in node_upstream(node):
+                    if (isinstance(upstream, Traced) and
+                        id(upstream) not in self.id2index and
+                        id(upstream) not in in_progress):
+                        stack.append((upstream, False))
+        return self.id2index[id(root)]
+
+    def append_entry(self, opcode, tag=-1, trace=-1, op1=-1, op2=-1,
+                     operands=(), value=None, has_value=True, info=None):
+        idx = len(self.opcode)
+        self.opcode.append(opcode)
+        self.tag.append(tag)
+        self.trace.append(trace)
+        self.op1.append(op1)
+        self.op2.append(op2)
+        if has_value:
+            self.value.append(len(self.values))
+            self.values.append(value)
+        else:
+            self.value.append(-1)
+        self.operands.extend(operands)
+        self.operand_start.append(len(self.operands))
+        if info is not None:
+            self.info[idx] = info
+        return idx
+
+    def append(self, node):
+        """ Append node, its upstream nodes are recorded first if needed """
+        add = self.add
+        opcode = opcode_of(node)
+        entry = dict(has_value=False)
+        if opcode in (CONST, ITERATOR, GENERATOR):
+            entry = dict(value=node._value)
+            if opcode == ITERATOR:
+                entry['op1'] = add(node._iterable)
+        elif opcode == OBJ:
+            entry = dict(value=node._value.__class__)
+        elif opcode == DEEP:
+            elements = list()
+            template = deep_template(node._traced_value, elements)
+            entry['operands'] = [add(element) for element in elements]
+            entry['info'] = template
+        elif opcode in (CALL, DISPATCH, UCALL, UDISPATCH, NEWINIT):
+            operands = [add(arg) for arg in node._args]
+            operands.extend(add(arg) for arg in node._kwargs.values())
+            kwarg_names = tuple(node._kwargs.keys())
+            if opcode == NEWINIT:
+                attributes = node._trace._attributes
+                operands.extend(add(attr) for attr in attributes.values())
+                entry['info'] = (kwarg_names, tuple(attributes.keys()))
+            else:
+                entry['op1'] = add(node._callable)
+                entry['info'] = kwarg_names
+            entry['operands'] = operands
+        elif opcode in (ARGUMENT, GETATTR, SETATTR):
+            entry['tag'] = self.tag_id(node._tag)
+            if opcode != ARGUMENT:
+                entry['op1'] = add(node._op1)
+        elif opcode in (GETITEM, OP1, OP2):
+            entry['op1'] = add(node._op1)
+            if opcode != OP1:
+                entry['op2'] = add(node._op2)
+            if isinstance(node, (BuiltinOp1, BuiltinOp2)):
+                # the operator function does not refer back to the node
+                entry['info'] = node._function
+            elif opcode == OP1:
+                entry['info'] = node._op1o
+            elif opcode == OP2:
+                entry['info'] = node._op2o
+        elif opcode in (ITERATION, GENERATION):
+            upstream = node._iterator if opcode == ITERATION else node._generator
+            entry['op1'] = add(upstream)
+            entry['info'] = node._count
+            if node._trace is None:
+                entry.update(value=node._value, has_value=True)
+        if node._trace is not None:
+            entry['trace'] = add(node._trace)
+        idx = self.append_entry(opcode, **entry)
+        self.id2index[id(node)] = idx
+        self.node_refs[id(node)] = weakref.KeyedRef(node, self.forget, id(node))
+        return idx
+
+
+@contextlib.contextmanager
+def recording(tape=None):
+    """ Record all traced nodes created within the context to a tape """
+    tape = Tape() if tape is None else tape
+    TRACE_OBSERVERS.append(tape.append)
+    try:
+        yield tape
+    finally:
+        TRACE_OBSERVERS.remove(tape.append)
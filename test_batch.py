@@ -0,0 +1,103 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import unittest
+import math
+import numpy as np
+from traced import trace_modules, trace
+from batch import BatchEvaluator, batch_call
+from test_traced import TestTracer01
+
+
+def poly(x, y=2):
+    if x > 10:
+        return x * y
+    return x + y
+
+
+def cube(x):
+    return x * x * x
+
+
+def ident(x):
+    return x
+
+
+def pick(x):
+    y = ident(x)
+    if y == 4:
+        return y * 10
+    return y
+
+
+def stats(x, y):
+    return x + y, math.sqrt(x), str(x)
+
+
+class TestBatch01(TestTracer01):
+
+    def test_evaluator01(self):
+        a = trace(2)
+        b = trace(3.0)
+        t = (a + 3) * b - abs(-a) // 2
+        evaluator = BatchEvaluator([a, b], [np.arange(4), np.full(4, 2.0)])
+        column = evaluator(t)
+        self.assertEqual(column.rows(), [(x + 3) * 2.0 - abs(-x) // 2 for x in range(4)])
+        self.assertEqual((evaluator.n_vectorized, evaluator.n_per_row), (6, 0))
+
+    def test_batch01(self):
+        x = np.arange(20)
+        values = batch_call(poly, x)
+        self.assertEqual(values.tolist(), [poly(v)._value for v in range(20)])
+        values = batch_call(poly, x, y=np.full(20, 3))
+        self.assertEqual(values.tolist(), [poly(v, 3)._value for v in range(20)])
+
+    def test_per_row01(self):
+        x = np.array([1, 4, 9])
+        total, root, text = batch_call(stats, x, np.ones(3, dtype=int))
+        self.assertEqual(total.tolist(), [2, 5, 10])
+        self.assertEqual(root.tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(text.tolist(), ['1', '4', '9'])
+
+    def test_overflow01(self):
+        values = batch_call(cube, np.array([2**30, 2**22, 3]))
+        self.assertEqual(values.tolist(), [2**90, 2**66, 27])
+        values = batch_call(cube, np.array([-2**21, 2**20, 3]))
+        self.assertEqual(values.dtype.kind, 'i')
+        self.assertEqual(values.tolist(), [-2**63, 2**60, 27])
+        self.assertEqual(batch_call(cube, np.array([2**21])).tolist(), [2**63])
+        # bitwise operators are checked exactly
+        a = trace(2)
+        evaluator = BatchEvaluator([a], [np.array([1, 3])])
+        self.assertEqual(evaluator((a << 62) | 1).rows(), [2**62 + 1, 3*2**62 + 1])
+
+    def test_guard01(self):
+        # the branch on == of the hashable result of a traced call
+        self.assertEqual(batch_call(pick, np.array([4, 5, 6, 4])).tolist(), 
+                         [40, 5, 6, 40])
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', 'test_evaluator', __name__])
+    unittest.main()
@@ -24,9 +24,16 @@ SOFTWARE.
 
 
 import unittest
+import numpy as np
 from traced import trace_modules, trace
-from compiler import Compiler
+from compiler import Compiler, SourceCompiler, ElementwiseKernel, IterationMismatch
 from test_traced import TestTracer01
+import test_evaluator
+
+
+def count_up(low, high):
+    for i in range(int(low), int(high)):
+        yield trace(i)
 
 
 class TestCompiler01(TestTracer01):
@@ -58,10 +65,128 @@ class TestCompiler01(TestTracer01):
         value = f_value(())
         self.assertEqual(value, 1)
 
+    def test_op01(self):
+        a = trace(2)
+        b = (a+3)*a - a**2
+        compiler = Compiler()
+        f_value = compiler(b)
+        self.assertEqual(f_value(()), 6)
+
+    def test_op02(self):
+        # mixed types and reflected operators, compiled as evaluated
+        a, x = trace(1), trace(2.5)
+        t = trace((a+2.0, 2.0+a, 3.5-a, a*x, 7//x, a < 1.5))
+        self.assertEqual(Compiler()(t)(()), (3.0, 3.0, 2.5, 2.5, 2.0, True))
+        f_value = SourceCompiler().compile(t, inputs=(a, x))
+        self.assertEqual(f_value(1, 2.5), t._value)
+        self.assertEqual(f_value(2, 0.5), (4.0, 4.0, 1.5, 1.0, 14.0, False))
+
+    def test_recursion01(self):
+        r = test_evaluator.sum_to(50)
+        compiler = Compiler()
+        f_value = compiler(r)
+        self.assertEqual(f_value(()), 1275)
+
+    def test_frame01(self):
+        r = test_evaluator.sum_to(20)
+        compiler = Compiler()
+        f_value = compiler(r)
+        # one slot per argument of the 21 traced calls
+        self.assertEqual(compiler.n_slots, 21)
+        self.assertEqual(f_value(()), 210)
+        self.assertEqual(f_value(()), 210)
+
+    def test_source01(self):
+        a = trace(2)
+        add_10_2 = TestTracer01.AddX2(10)
+        d = trace({'a':trace(1), 'b':2})
+        traces = [add_10_2.add_to(5, z=2), (a+3)*a - a**2, 3-a, -abs(a) < a, 
+                  d['a'], test_evaluator.sum_to(10)]
+        for t in traces:
+            source_compiler = SourceCompiler()
+            f_value = source_compiler(t)
+            self.assertEqual(f_value(()), Compiler()(t)(()))
+        self.assertTrue(source_compiler.source.startswith('def f_trace('))
+
+    def test_fuse01(self):
+        x = trace(np.arange(10.0))
+        a = trace(np.full(10, 2.0))
+        y = x * 3
+        t = ((x * 2 + 1) * x - 3) / (y + a) + (-x) ** 2 - abs(y - 10)
+        compiler = Compiler()
+        f_value = compiler(t)
+        kernel = compiler.self2value[id(t)]
+        self.assertIsInstance(kernel, ElementwiseKernel)
+        # computed in chunks of 4, y has two users and is its own kernel
+        kernel.chunk_size = 4
+        kernel.min_chunked_size = 0
+        self.assertEqual(len(kernel.steps), 12)
+        value = f_value(())
+        self.assertTrue(np.allclose(value, t._value))
+        self.assertIsNotNone(kernel.chunked)
+        self.assertTrue(np.allclose(f_value(()), t._value))
+        self.assertFalse(np.shares_memory(value, f_value(())))
+        # lists are not arrays, the operators apply
+        l = trace([1, 2])
+        self.assertEqual(Compiler()(l + [3])(()), [1, 2, 3])
+
+    def test_fuse02(self):
+        x = trace(np.linspace(0, 1, 20))
+        t = np.sqrt(np.sin(x) * np.cos(x) + 2) - np.exp(-x) + np.dot(x, x)
+        compiler = Compiler()
+        f_value = compiler(t)
+        kernel = compiler.self2value[id(t)]
+        # the dot is not elementwise, it is a leaf
+        self.assertEqual(len(kernel.steps), 9)
+        self.assertTrue(np.allclose(f_value(()), t._value))
+        self.assertTrue(np.allclose(SourceCompiler()(t)(), t._value))
+
+    def test_loop01(self):
+        l = trace([1, 2, 3])
+        d = trace({'a': 1, 'b': 2})
+        y = trace(3)
+        t = trace(([e * y for e in l], {k: v + y for k, v in d.items()}))
+        source_compiler = SourceCompiler()
+        f_value = source_compiler.compile(t, inputs=(l, d, y))
+        self.assertEqual(f_value([1, 2, 3], {'a': 1, 'b': 2}, 3), t._value)
+        # the comprehensions are loops over the inputs
+        self.assertEqual(source_compiler.source.count('for '), 2)
+        self.assertEqual(f_value([4, 5], {'c': 1}, 2), ((8, 10), {'c': 3}))
+
+    def test_loop02(self):
+        low, high = trace(1), trace(4)
+        t = trace(list(count_up(low, high)))
+        self.assertEqual(t._value, (1, 2, 3))
+        f_value = SourceCompiler().compile(t, inputs=(low, high))
+        # the generator runs again
+        self.assertEqual(f_value(2, 6), (2, 3, 4, 5))
+
+    def test_loop03(self):
+        l = trace([1, 2, 3])
+        t = trace(0)
+        for v in l:
+            t = t + v
+        f_value = SourceCompiler().compile(t, inputs=(l,))
+        # the elements are not constants, their number is checked
+        self.assertEqual(f_value([4, 5, 6]), 15)
+        with self.assertRaises(IterationMismatch):
+            f_value([4, 5])
+
+    def test_loop04(self):
+        # short loops over constants stay unrolled, long ones are rerolled
+        y = trace(3)
+        for size, n_loops in ((4, 0), (SourceCompiler.min_trip_count, 1)):
+            l = trace(list(range(size)))
+            t = trace([e * y for e in l])
+            source_compiler = SourceCompiler()
+            f_value = source_compiler.compile(t, inputs=(y,))
+            self.assertEqual(source_compiler.source.count('for '), n_loops)
+            self.assertEqual(f_value(2), tuple(2 * e for e in range(size)))
+
 
 
 if __name__ == '__main__':
-    trace_modules(['test_traced', __name__])
+    trace_modules(['test_traced', 'test_evaluator', __name__])
     unittest.main()
 
 
@@ -23,8 +23,14 @@ SOFTWARE.
 """
 
 import unittest
+import gc
+import weakref
+import numpy as np
 from traced import trace, trace_modules
-from constraints import BuildUpstreamConstraints
+from constraints import BuildUpstreamConstraints, HasInit, Arg2Content, \
+        streaming_constraints
+from solver import Solver, TypeLattice
+from optimize import copy_node
 from test_traced import TestTracer01
 
 class TestEvaluator01(TestTracer01):
@@ -47,7 +53,83 @@ class TestEvaluator01(TestTracer01):
         bc(final_trace2)
         self.assertTrue(len(bc.__dict__) > 0)
 
-
+    def test_store01(self):
+        add_10 = self.AddX(10)
+        final_trace = add_10.add_to(5, z=2)
+        bc = BuildUpstreamConstraints()
+        bc(final_trace)
+        store = bc.store
+        n = len(store)
+        self.assertEqual(n, sum(map(len, bc.from_id_to_constraints.values())))
+        self.assertEqual(n, sum(map(len, store.to_id_to_constraints.values())))
+        # duplicates are not added
+        constraint = next(iter(store))
+        self.assertFalse(store.add(constraint.__class__(constraint.from_traced, 
+                                                        constraint.to_traced)))
+        self.assertEqual(len(store), n)
+        # each constraint is found from both of its nodes
+        for constraint in store:
+            self.assertIn(constraint, store.from_node(constraint.from_traced))
+            self.assertIn(constraint, store.to_node(constraint.to_traced))
+        has_inits = store.of_class(HasInit)
+        self.assertTrue(len(has_inits) > 0)
+        for has_init in has_inits:
+            self.assertEqual(store.to_node(has_init.to_traced, HasInit), [has_init])
+        self.assertEqual(len(store.of_class(Arg2Content)) + len(has_inits),
+                         len([c for c in store 
+                              if isinstance(c, (Arg2Content, HasInit))]))
+
+    def test_streaming01(self):
+        solver = Solver([TypeLattice()])
+        with streaming_constraints() as streamed, streaming_constraints(solver.add):
+            add_10_2 = TestTracer01.AddX2(10)
+            final_trace = add_10_2.add_to(5, z=2)
+        bc = BuildUpstreamConstraints()
+        bc(final_trace)
+        # the constraints of all the nodes, not only those upstream of the result
+        self.assertTrue(len(streamed.constraints) > len(bc.store))
+        index_of = streamed.id2index
+        for constraint in bc.store:
+            self.assertIn((constraint.__class__, index_of[id(constraint.from_traced)],
+                           index_of[id(constraint.to_traced)]), streamed.constraints)
+        self.assertEqual(len(solver.store), len(streamed.constraints))
+        solver.solve()
+        get_x = final_trace._trace._trace._op1._op1
+        self.assertEqual(repr(get_x)[-2:], '.x')
+        self.assertEqual(solver.fact(get_x, 'type'), frozenset((int,)))
+
+    def test_streaming02(self):
+        def traced_array(emit=None):
+            with streaming_constraints(emit) as streamed:
+                array = np.arange(3)
+                result = TestTracer01.AddX(10).add_to(array, z=2)
+            self.assertEqual(list(result._value), [12, 13, 14])
+            return streamed, weakref.ref(array)
+        # the handles do not keep the nodes alive
+        streamed, array_ref = traced_array()
+        gc.collect()
+        self.assertIsNone(array_ref())
+        self.assertTrue(len(streamed.constraints) > 0)
+        # an emit that keeps the constraints keeps the nodes
+        solver = Solver([TypeLattice()])
+        _, array_ref = traced_array(solver.add)
+        gc.collect()
+        self.assertIsNotNone(array_ref())
+        self.assertTrue(len(solver.store) > 0)
+
+    def test_streaming03(self):
+        with streaming_constraints() as streamed:
+            a = trace(1)
+            old = a + 2
+            old_id, old_index = id(old), streamed.id2index[id(old)]
+            del old
+            gc.collect()
+            # the handle of a freed node is dropped
+            self.assertNotIn(old_id, streamed.id2index)
+            # a new node, not seen by the observer (it may reuse the id)
+            new = copy_node(a + 3)
+            self.assertEqual(streamed.index_of(new), streamed.n_nodes - 1)
+            self.assertNotEqual(streamed.index_of(new), old_index)
 
 if __name__ == '__main__':
     trace_modules(['test_traced'])
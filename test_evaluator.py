@@ -25,10 +25,16 @@ SOFTWARE.
 
 import unittest
 from traced import trace_modules, trace
-from evaluator import Evaluator
+from evaluator import Evaluator, Env
 from test_traced import TestTracer01
 
 
+def sum_to(n):
+    if n == 0:
+        return n
+    return n + sum_to(n - 1)
+
+
 class TestEvaluator01(TestTracer01):
 
     def test_simple01(self):
@@ -55,6 +61,60 @@ class TestEvaluator01(TestTracer01):
         value = evaluator(r)
         self.assertEqual(value, 1)
 
+    def test_op01(self):
+        a = trace(2)
+        b = (a+3)*a < 3-a
+        evaluator = Evaluator()
+        self.assertEqual(evaluator(b), False)
+
+    def test_deep01(self):
+        a = trace(0)
+        for i in range(10000):
+            a = a + 1
+        evaluator = Evaluator()
+        self.assertEqual(evaluator(a), 10000)
+
+    def test_memo01(self):
+        class CountingEvaluator(Evaluator):
+            count = 0
+            def op2(self, traced, op1, op2):
+                self.count += 1
+                return super().op2(traced, op1, op2)
+        a = trace(1)
+        for i in range(30):
+            a = a + a
+        evaluator = CountingEvaluator()
+        self.assertEqual(evaluator(a), 2**30)
+        self.assertEqual(evaluator.count, 30)
+
+    def test_call01(self):
+        add_10 = self.AddX(10)
+        final_trace = add_10.add_to(5, z=2)
+        evaluator = Evaluator()
+        evaluator(final_trace)
+        # the call result is evaluated through the traced method body
+        self.assertIn(id(final_trace._trace._trace), evaluator.self2value)
+
+    def test_env01(self):
+        env = Env({'a': 1, 'b': 2}, Env({'c': 3}))
+        self.assertEqual(env['c'], 3)
+        self.assertEqual(env.locate('b'), (0, 1))
+        self.assertEqual(env.locate('c'), (1, 0))
+        self.assertIsNone(env.locate('d'))
+        with self.assertRaises(KeyError):
+            env['d']
+        # enclosing bindings are cached in the frame they are looked up from
+        self.assertEqual(env.found, {'c': (1, env.parent)})
+        self.assertIn('c', env)
+        self.assertNotIn('d', env)
+        self.assertIs(env.frame_of('c'), env.parent)
+
+    def test_recursion01(self):
+        r = sum_to(100)
+        evaluator = Evaluator()
+        self.assertEqual(evaluator(r), 5050)
+        self.assertEqual(len(evaluator.env), 1)
+
 
 
 if __name__ == '__main__':
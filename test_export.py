@@ -0,0 +1,76 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import unittest
+import numpy as np
+from traced import trace_modules, trace
+from tape import opcode_of, OPCODE_NAMES
+from constraints import BuildUpstreamConstraints
+from export import export_trace, CSRGraph
+from test_traced import TestTracer01
+
+
+class TestExport01(TestTracer01):
+
+    def test_csr01(self):
+        graph = CSRGraph(4, [2, 0, 2, 1], [1, 1, 3, 3])
+        self.assertEqual(list(graph.indptr), [0, 1, 2, 4, 4])
+        self.assertEqual(list(graph.targets(2)), [1, 3])
+        self.assertEqual(list(graph.reachable([0])), [True, True, False, True])
+        self.assertEqual(list(graph.transpose().reachable([3])), [True, True, True, True])
+        sources, targets = graph.union(CSRGraph(4, [3], [0])).edges()
+        self.assertEqual(list(zip(sources, targets)), 
+                         [(0, 1), (1, 3), (2, 1), (2, 3), (3, 0)])
+
+    def test_export01(self):
+        add_10_2 = TestTracer01.AddX2(10)
+        final_trace = add_10_2.add_to(5, z=2)
+        bc = BuildUpstreamConstraints()
+        bc(final_trace)
+        export = export_trace(final_trace, bc.from_id_to_constraints)
+        root = export.index(final_trace)
+        self.assertEqual(export.index2id[root], id(final_trace))
+        # the result is an alias of the dispatch
+        self.assertEqual(OPCODE_NAMES[export.kinds[root]], 'alias')
+        self.assertEqual(list(export.graphs['trace'].targets(root)), 
+                         [export.index(final_trace._trace)])
+        for constraint in bc.store:
+            from_idx = export.index(constraint.from_traced)
+            self.assertEqual(export.kinds[from_idx], opcode_of(constraint.from_traced))
+            self.assertIn(export.index(constraint.to_traced), 
+                          export.graphs[constraint.__class__.__name__].targets(from_idx))
+        self.assertEqual(sum(len(export.graphs[name]) for name in 
+                             ('Arg2Content', 'HasAttr', 'HasInit', 'HasCallableMethod')),
+                         len(bc.store))
+        # trace edges go upstream, to lower indices
+        sources, targets = export.upstream().edges()
+        self.assertTrue(np.all(targets < sources))
+        self.assertEqual(list(export.slice([final_trace])), 
+                         [bool(live) for live in export.tape.live(root)])
+        self.assertEqual(export.slice([final_trace._trace]).sum(), 
+                         export.slice([root]).sum() - 1)
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', __name__])
+    unittest.main()
@@ -0,0 +1,191 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+import unittest
+import sys
+import types
+from traced import trace_modules, from_traced, get_field, TRACED_CLASSES
+from jit import jit, tier_stats
+from test_traced import TestTracer01
+import test_evaluator
+
+
+def poly(x, y=2):
+    if x > 10:
+        return x * y
+    return x + y
+
+
+def ident(x):
+    return x
+
+def pick(x):
+    y = ident(x)
+    # the untraced == of a hashable result, no MK_CVT conversion
+    if y == 4:
+        return y * 10
+    return y
+
+def total(l):
+    s = 0
+    for v in l:
+        s += v
+    return s
+
+def first_key(d):
+    for k in d:
+        return k
+
+
+class TestJit01(TestTracer01):
+
+    def test_jit01(self):
+        f = jit(poly)
+        self.assertEqual([f(1), f(2), f(3, y=5)], [3, 4, 8])
+        self.assertEqual(f.cache_info()['misses'], 1)
+        self.assertEqual(f.cache_info()['hits'], 2)
+        # float inputs are a new specialization
+        self.assertEqual(f(1.5), 3.5)
+        self.assertEqual(f.cache_info()['size'], 2)
+
+    def test_guard01(self):
+        f = jit(poly)
+        self.assertEqual(f(1), 3)
+        # x > 10 no longer gives the traced branch, traced again
+        self.assertEqual(f(20), 40)
+        self.assertEqual(f.cache_info()['guard_failures'], 1)
+        self.assertEqual(f(21), 42)
+        self.assertEqual(f(4), 6)
+        self.assertEqual(f.cache_info()['misses'], 2)
+        self.assertIn('raise', f.last_source)
+
+    def test_guard02(self):
+        f = jit(pick)
+        self.assertEqual([f(x) for x in [4, 5, 6, 4]], [40, 5, 6, 40])
+        self.assertEqual(f.cache_info()['guard_failures'], 2)
+        self.assertIn('raise', f.last_source)
+
+    def test_iteration01(self):
+        f = jit(total)
+        self.assertEqual(f([1, 2, 3]), 6)
+        # the elements are read from the input
+        self.assertEqual(f([4, 5, 6]), 15)
+        self.assertEqual(f.cache_info()['hits'], 1)
+        # the number of elements is guarded
+        self.assertEqual([f([1]), f([1, 2, 3, 4]), f([7, 8, 9])], [1, 10, 24])
+        self.assertEqual((f.misses, f.hits), (3, 2))
+        self.assertTrue(f.guard_failures > 0)
+        g = jit(first_key)
+        self.assertEqual([g({'a': 1}), g({'b': 1, 'c': 2}), g({})], ['a', 'b', None])
+
+    def test_recursion01(self):
+        f = jit(test_evaluator.sum_to)
+        self.assertEqual(f(5), 15)
+        self.assertEqual(f(5), 15)
+        self.assertEqual(f(6), 21)
+        self.assertEqual(f.cache_info()['hits'], 1)
+
+    def test_evict01(self):
+        f = jit(maxsize=1)(poly)
+        self.assertEqual(f(1), 3)
+        self.assertEqual(f(1.0), 3.0)
+        self.assertEqual(f.cache_info()['evictions'], 1)
+        self.assertEqual(f.cache_info()['size'], 1)
+
+    def test_tiered01(self):
+        module = types.ModuleType('tiered_module_'+self.__class__.__name__)
+        exec("def poly(x, y=2):\n"
+             "    if x > 10:\n"
+             "        return x * y\n"
+             "    return x + y\n", module.__dict__)
+        sys.modules[module.__name__] = module
+        trace_modules([module.__name__], tiered=2)
+        self.assertEqual([module.poly(x) for x in range(5)], [2, 3, 4, 5, 6])
+        stats = tier_stats()[module.__name__+'.poly']
+        self.assertEqual((stats['misses'], stats['hits']), (3, 2))
+        self.assertEqual(stats['compilations'], 1)
+        # guard failure, traced and compiled again at once
+        self.assertEqual(module.poly(20), 40)
+        self.assertEqual(module.poly._tiered.compilations, 2)
+
+    def test_tiered02(self):
+        module = types.ModuleType('tiered_pick_'+self.__class__.__name__)
+        exec("def ident(x):\n"
+             "    return x\n"
+             "def pick(x):\n"
+             "    y = ident(x)\n"
+             "    if y == 4:\n"
+             "        return y * 10\n"
+             "    return y\n", module.__dict__)
+        sys.modules[module.__name__] = module
+        trace_modules([module.__name__], tiered=2)
+        # compiled after the warmup of the x == 4 branch
+        self.assertEqual([module.pick(x) for x in [4, 4, 4, 5, 6, 4]], 
+                         [40, 40, 40, 5, 6, 40])
+        self.assertTrue(module.pick._tiered.guard_failures > 0)
+
+    def test_tiered03(self):
+        base = types.ModuleType('tiered_base_'+self.__class__.__name__)
+        exec("class Base:\n"
+             "    def __init__(self, x):\n"
+             "        self.x = x\n", base.__dict__)
+        sys.modules[base.__name__] = base
+        module = types.ModuleType('tiered_total_'+self.__class__.__name__)
+        exec(f"from {base.__name__} import Base\n"
+             "def total(l):\n"
+             "    s = 0\n"
+             "    for v in l:\n"
+             "        s += v\n"
+             "    return s\n"
+             "class Total(Base):\n"
+             "    def __init__(self, l):\n"
+             "        self.x = total(l)\n", module.__dict__)
+        sys.modules[module.__name__] = module
+        self.addCleanup(TRACED_CLASSES.difference_update, 
+                        (base.Base, module.Total))
+        trace_modules([module.__name__], tiered=2)
+        # Total is traced once Base is, still tiered
+        trace_modules([base.__name__])
+        self.assertIsNotNone(get_field(module.Total, '_tiered'))
+        lists = [[1, 2], [1, 2], [1, 2], [3, 4], [5, 6], [7]]
+        self.assertEqual([module.total(l) for l in lists], [3, 3, 3, 7, 11, 7])
+        self.assertEqual([module.Total(l).x for l in lists], [3, 3, 3, 7, 11, 7])
+        self.assertEqual(module.total._tiered.hits, 2)
+        self.assertEqual(get_field(module.Total, '_tiered').hits, 2)
+
+    def test_class01(self):
+        f = jit(TestTracer01.AddX, warmup=1)
+        objs = [f(x) for x in range(4)]
+        self.assertEqual([obj.x for obj in objs], [0, 1, 2, 3])
+        self.assertIsInstance(objs[-1], f.func)
+        self.assertEqual(objs[-1].add_to(5), 8)
+        self.assertEqual((f.misses, f.hits), (2, 2))
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', 'test_evaluator', __name__])
+    unittest.main()
+
+
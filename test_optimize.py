@@ -0,0 +1,142 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+import unittest
+import functools
+from traced import trace_modules, trace, Hashable, Obj, NewInit, Argument, Arg
+from evaluator import Evaluator
+from compiler import Compiler, SourceCompiler
+from optimize import optimize, count_nodes
+from test_traced import TestTracer01
+import test_evaluator
+
+
+class TestOptimize01(TestTracer01):
+
+    def test_fold01(self):
+        a = trace(2)
+        b = (a+3)*a - a**2
+        folded, report = optimize(b)
+        self.assertIs(type(folded), Hashable)
+        self.assertEqual(Evaluator()(folded), 6)
+        self.assertEqual((report['before'], report['after']), (count_nodes(b), 1))
+        # inputs are not constants
+        kept, report = optimize(b, [a])
+        self.assertEqual(report['after'], report['before'])
+        self.assertEqual(SourceCompiler().compile(kept, [a])(5), 15)
+
+    def test_fold02(self):
+        d = trace({'a':trace(1), 'b':2})
+        x = trace(7)
+        r = d['a'] + x
+        folded, report = optimize(r, [x])
+        self.assertEqual(report['after'], 3)
+        self.assertEqual(Compiler()(folded)(()), 8)
+        self.assertEqual(SourceCompiler().compile(folded, [x])(1), 2)
+
+    def test_fold03(self):
+        add_10_2 = TestTracer01.AddX2(10)
+        final_trace = add_10_2.add_to(5, z=2)
+        folded, report = optimize(final_trace)
+        self.assertEqual(report['after'], 1)
+        self.assertEqual(Evaluator()(folded), 17)
+        # the argument y of the dispatch is an input
+        y = final_trace._trace._args[1]
+        optimized, report = optimize(final_trace, [y])
+        self.assertLess(report['after'], report['before'])
+        self.assertGreater(report['pruned'], 0)
+        self.assertEqual(Evaluator()(optimized), 17)
+        self.assertEqual(Compiler()(optimized)(()), 17)
+        self.assertEqual(SourceCompiler().compile(optimized, [y])(100), 112)
+
+    def test_recursion01(self):
+        r = test_evaluator.sum_to(30)
+        folded, report = optimize(r)
+        self.assertEqual((report['before'], report['after']), (count_nodes(r), 1))
+        n = r._trace._args[0]
+        optimized, report = optimize(r._trace._trace, [n])
+        self.assertEqual(SourceCompiler().compile(optimized, [n])(30), 465)
+
+    def test_prune01(self):
+        class Plain:
+            pass
+        x = trace(7)
+        obj = Obj(Plain.__new__(Plain))
+        obj.a = trace(1) + x
+        obj.b = trace(2) * x
+        new_init = NewInit(obj, (Argument(Arg(1, 'self'), obj),), {})
+        r = new_init.a * 3
+        optimized, report = optimize(r, [x])
+        self.assertEqual(report['pruned'], 1)
+        self.assertEqual(Evaluator()(optimized), 24)
+        self.assertEqual(list(optimized._op1._op1._trace._attributes), ['a'])
+        # the object is the result, all its attributes are kept
+        optimized, report = optimize(new_init, [x])
+        self.assertEqual(report['pruned'], 0)
+
+    def test_cse01(self):
+        d = trace({'a': 1, 'b': 2})
+        r = d['a'] + d['a']*d['b']
+        optimized, report = optimize(r, [d])
+        # the constant 'a', and its get item, are merged
+        self.assertEqual(report['merged'], 2)
+        self.assertEqual(report['after'], report['before']-2)
+        self.assertEqual(SourceCompiler().compile(optimized, [d])({'a': 2, 'b': 3}), 8)
+
+    def test_cse02(self):
+        calls = list()
+        # an untraced callable with side effects
+        impure = functools.partial(lambda calls, v: calls.append(v) or v, calls)
+        x = trace(-3)
+        r = trace(abs)(x) + trace(abs)(x) + trace(impure)(x) + trace(impure)(x)
+        optimized, report = optimize(r, [x])
+        # the constant leaves of the callables, and the calls of abs only
+        self.assertEqual(report['merged'], 3)
+        calls.clear()
+        self.assertEqual(SourceCompiler().compile(optimized, [x])(-4), 0)
+        self.assertEqual(calls, [-4, -4])
+        # pure calls of constants are folded
+        folded, report = optimize(trace(abs)(trace(-2)) + x, [x])
+        self.assertEqual(report['folded'], 1)
+
+    def test_cse03(self):
+        x = trace((5,))
+        r = x + trace((True,)) + trace((1,)) + trace((-0.0,)) + trace((0.0,))
+        optimized, report = optimize(r, [x])
+        # equal constants of different types, or float reprs, are not merged
+        self.assertEqual(report['merged'], 0)
+        self.assertEqual(repr(Evaluator()(optimized)), '(5, True, 1, -0.0, 0.0)')
+        compiled = SourceCompiler().compile(optimized, [x])
+        self.assertEqual(repr(compiled((2,))), '(2, True, 1, -0.0, 0.0)')
+        fs = trace(frozenset({True})) | trace(frozenset({1}))
+        optimized, report = optimize(trace((fs,)) + trace((trace(frozenset({1})),)))
+        self.assertEqual(repr(Evaluator()(optimized)), '(frozenset({True}), frozenset({1}))')
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', 'test_evaluator', __name__])
+    unittest.main()
+
+
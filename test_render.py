@@ -0,0 +1,89 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import io
+import unittest
+from traced import trace_modules, trace
+from constraints import BuildUpstreamConstraints
+from render import DotWriter
+from test_traced import TestTracer01
+
+
+def count_to(n):
+    for i in range(int(n)):
+        yield trace(i)
+
+def counted(n):
+    return list(count_to(n))
+
+
+class TestRender01(TestTracer01):
+
+    def dot(self, root, **options):
+        file = io.StringIO()
+        writer = DotWriter(file, **options)(root)
+        source = file.getvalue()
+        self.assertTrue(source.startswith('digraph Graph {\n'))
+        self.assertTrue(source.endswith('}\n'))
+        lines = source.splitlines()
+        self.assertEqual(writer.n_nodes, len([l for l in lines if '[' in l and '->' not in l]) - 2)
+        self.assertEqual(writer.n_edges, len([l for l in lines if '->' in l]))
+        return writer, source
+
+    def test_dot01(self):
+        final_trace = counted(20)
+        writer, source = self.dot(final_trace, max_run=4)
+        # the first and last generations are drawn
+        self.assertEqual(writer.n_hidden, 18)
+        self.assertIn('label="... 18 Generations"', source)
+        self.assertIn('label="deep:1..18"', source)
+        self.assertIn('label="Generation 19"', source)
+        self.assertNotIn('label="Generation 1"', source)
+        writer, source = self.dot(final_trace, max_run=None)
+        self.assertEqual(writer.n_hidden, 0)
+        self.assertIn('label="Generation 1"', source)
+
+    def test_lod01(self):
+        add_10_2 = TestTracer01.AddX2(10)
+        final_trace = add_10_2.add_to(5, z=2)
+        full, _ = self.dot(final_trace)
+        self.assertEqual(full.n_collapsed, 0)
+        writer, source = self.dot(final_trace, max_depth=1)
+        self.assertEqual((writer.n_nodes, writer.n_collapsed), (2, 1))
+        self.assertIn('style=dashed', source)
+        writer, source = self.dot(final_trace, max_nodes=5)
+        self.assertEqual(writer.n_nodes - writer.n_collapsed, 5)
+        # the body of the dispatch is not drawn
+        writer, source = self.dot(final_trace, call_depth=0)
+        self.assertIn('peripheries=2', source)
+        self.assertTrue(writer.n_nodes < full.n_nodes)
+        bc = BuildUpstreamConstraints()
+        bc(final_trace)
+        writer, source = self.dot(final_trace, constraints=bc.from_id_to_constraints)
+        self.assertEqual(writer.n_edges - full.n_edges, source.count('color=blue'))
+        self.assertEqual(source.count('color=blue'), len(bc.store))
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', __name__])
+    unittest.main()
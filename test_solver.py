@@ -0,0 +1,94 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import unittest
+import numpy as np
+from traced import trace_modules, trace
+from constraints import Arg2Content, HasItem
+from solver import Solver, TypeLattice, UnitLattice, ShapeLattice, FlatLattice, \
+        TOP, solve
+from test_traced import TestTracer01
+
+
+class Reached(FlatLattice):
+    """ Nodes upstream of a HasItem of a reached node """
+    name = 'reached'
+
+    def propagate(self, solver, constraint):
+        if (isinstance(constraint, HasItem) and 
+            solver.fact(constraint.from_traced, self.name)):
+            yield constraint.to_traced, True
+
+
+class TestSolver01(TestTracer01):
+
+    def test_solve01(self):
+        add_10 = self.AddX(10)
+        final_trace = add_10.add_to(5, z=2)
+        get_x = final_trace._trace._op1._op1
+        self.assertEqual(repr(get_x)[-2:], '.x')
+        # the self argument's content is the NewInit of the object
+        set_x = get_x._op1._trace._trace._attributes['x']
+        # the unit of the attribute read is the unit of its write
+        solver = solve(final_trace, [TypeLattice(), 
+                                     UnitLattice(lambda t: 'm' if t is get_x else None)])
+        self.assertTrue(solver.same_class(get_x, set_x))
+        self.assertEqual(solver.fact(set_x, 'unit'), 'm')
+        self.assertEqual(solver.fact(set_x, 'type'), frozenset((int,)))
+        self.assertIsNone(solver.fact(final_trace, 'unit'))
+
+    def test_incremental01(self):
+        a, b, c, d = trace(1), trace(2.0), trace(np.ones((2, 3))), trace(np.ones((2, 4)))
+        units = {id(a): 'm', id(b): 's'}
+        solver = Solver([TypeLattice(), UnitLattice(lambda t: units.get(id(t))),
+                         ShapeLattice()])
+        solver.add_constraints([Arg2Content(c, d)]).solve()
+        self.assertEqual(solver.fact(c, 'shape'), (2, None))
+        self.assertEqual(solver.fact(a, 'type'), frozenset((int,)))
+        n_visits = solver.n_visits
+        solver.add_constraints({id(a): [Arg2Content(a, c), Arg2Content(a, c)]}).solve()
+        # the new constraint is visited once
+        self.assertEqual(solver.n_visits, n_visits + 1)
+        self.assertEqual(solver.fact(d, 'type'), frozenset((int, np.ndarray)))
+        self.assertEqual(solver.fact(d, 'unit'), 'm')
+        solver.add(Arg2Content(b, d))
+        solver.solve()
+        self.assertIs(solver.fact(a, 'unit'), TOP)
+        # a lattice propagating along the other constraints
+        e = trace(3)
+        units = {id(e): 'm'}
+        solver = Solver([UnitLattice(lambda t: units.get(id(t))), Reached()])
+        solver.add_constraints([HasItem(e, a), Arg2Content(c, d)]).solve()
+        self.assertIsNone(solver.fact(a, 'reached'))
+        self.assertIsNone(solver.fact(d, 'unit'))
+        solver.update(e, solver.lattices[1], True)
+        solver.add(Arg2Content(a, c))
+        solver.solve()
+        self.assertTrue(solver.fact(d, 'reached'))
+        # no unit flows along HasItem
+        self.assertIsNone(solver.fact(d, 'unit'))
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', __name__])
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+MIT License
+
+Copyright (c) 2025 James Litsios
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import unittest
+import gc
+import weakref
+from traced import trace_modules, trace
+from tape import Tape, recording, CONST, DISPATCH
+from evaluator import TapeEvaluator
+from compiler import TapeCompiler
+from constraints import TapeConstraints, HasCallableMethod
+from test_traced import TestTracer01
+
+
+class TestTape01(TestTracer01):
+
+    def test_record01(self):
+        add_10 = TestTracer01.AddX(10)
+        final_trace = add_10.add_to(5, z=2)
+        tape = Tape()
+        root = tape.record(final_trace)
+        self.assertEqual(root, len(tape)-1)
+        self.assertEqual(TapeEvaluator(tape)(root), 17)
+        self.assertEqual(TapeCompiler(tape)(root)(), 17)
+
+    def test_record02(self):
+        with recording() as tape:
+            d = trace({'a':trace(1), 'b':2})
+            r = d['a'] 
+        root = tape.index(r)
+        self.assertEqual(TapeEvaluator(tape)(root), 1)
+        leaf = tape.index(d._traced_value['a'])
+        self.assertEqual(tape.opcode[leaf], CONST)
+        self.assertEqual(TapeEvaluator(tape)(root, {leaf: 5}), 5)
+        self.assertEqual(TapeCompiler(tape)(root, (leaf,))(7), 7)
+
+    def test_record03(self):
+        # the ids of the nodes of earlier traces are not reused
+        tape = Tape()
+        roots = [tape.record(trace(i)*2) for i in range(20)]
+        self.assertEqual([TapeEvaluator(tape)(root) for root in roots],
+                         list(range(0, 40, 2)))
+        # the nodes are not kept alive by the tape, their ids are forgotten
+        gc.collect()
+        self.assertEqual(tape.id2index, {})
+        self.assertEqual(TapeEvaluator(tape)(roots[-1]), 38)
+        with recording() as tape:
+            x = trace(3)
+            r = x * 2
+            x_ref = weakref.ref(x)
+            del x
+        gc.collect()
+        self.assertIsNotNone(x_ref())
+        del r
+        gc.collect()
+        self.assertIsNone(x_ref())
+        self.assertEqual(tape.id2index, {})
+
+    def test_constraints01(self):
+        add_10 = TestTracer01.AddX(10)
+        final_trace = add_10.add_to(5, z=2)
+        tape = Tape()
+        root = tape.record(final_trace)
+        dispatch = tape.trace[root]
+        self.assertEqual(tape.opcode[dispatch], DISPATCH)
+        constraints = TapeConstraints(tape)(root)
+        self.assertIn((HasCallableMethod, tape.op1[dispatch]), 
+                      constraints[dispatch])
+
+
+if __name__ == '__main__':
+    trace_modules(['test_traced', __name__])
+    unittest.main()
@@ -25,16 +25,27 @@ SOFTWARE.
 import unittest
 from traced import trace_modules, from_traced, trace, \
         Traced, Hashable, DeepTraced, DeepHashable, Iteration, \
+        Argument, Arg, trace_fields, get_field, BuiltinOp2, \
+        ArrayUFunc, ArrayFunction, \
+        is_traced_callable, is_traced_value, CALL_ROUTES, CLASS_VALUE_ROUTES, \
+        OBJECT_VALUE_ROUTES, TYPE_KINDS, interning, \
         TRACED_CLASSES, \
         MODULES_WITH_UNTRACED_PARENTS, \
         TRACED_MODULE_NAMES
+import sys
+import gc
+import weakref
 import types
+import collections.abc
 import numpy as np
 
 
 def plus2(a):
     return a+2
 
+def scaled_sum(a, *rest, scale=1, **named):
+    return (a + sum(rest) + sum(named.values()))*scale
+
 class TestTracer01(unittest.TestCase):
 
     def test_module01(self):
@@ -154,6 +165,152 @@ class TestTracer01(unittest.TestCase):
         self.assertEqual(d3[('a','x')]._trace._traced_value[0]._trace.__class__, Iteration)
         self.assertEqual(int(d3[('a','x')][1]), 10)        
 
+    def test_op01(self):
+        a = trace(2)
+        b = (a+3)*a - 1
+        self.assertEqual(b.__class__.__bases__, (BuiltinOp2,))
+        self.assertEqual(b._value, 9)
+        self.assertEqual((3-a)._value, 1)
+        self.assertEqual(repr(3+a), '2.__radd__(3)')
+        self.assertEqual(repr(-(a+3)), '-(2+3)')
+        self.assertEqual(repr(abs(a)), 'abs(2)')
+        self.assertEqual(repr(a**trace(3)**a), '2**(3**2)')
+
+    def test_op02(self):
+        # operator nodes evaluate as plain Python does, mixed types included
+        # (int.__add__(1, 2.0) alone is NotImplemented)
+        a = trace(1)
+        self.assertEqual((a+2.0)._value, 3.0)
+        self.assertEqual((2.0+a)._value, 3.0)
+        self.assertEqual(repr(2.0+a), '1.__radd__(2.0)')
+        self.assertEqual((3.5-a)._value, 2.5)
+        self.assertEqual((7//trace(2.5))._value, 2.0)
+        self.assertIs((a < 1.5)._value, True)
+        self.assertEqual((2.0**a)._value, 2.0)
+
+    def test_slots01(self):
+        a = trace({'a':1, 'b':trace(2)})
+        arg = Argument(Arg('POSITIONAL_OR_KEYWORD', 'd'), a)
+        with self.assertRaises(AttributeError):
+            object.__getattribute__(arg, '__dict__')
+        # trace chain lookup
+        self.assertIs(arg._traced_value, a._traced_value)
+        self.assertEqual([name for name, _ in trace_fields(arg)],
+                         ['_tag', '_value', '_trace'])
+
+    def test_slots02(self):
+        l1 = trace(iter([1,2]))
+        self.assertEqual(int(next(l1)), 1)
+        self.assertEqual(next(l1)._count, 1)
+
+    def test_bind01(self):
+        b = trace(2)
+        self.assertEqual(scaled_sum(1)._value, 1)
+        self.assertEqual(scaled_sum(1, b, 3, scale=2, x=b)._value, 16)
+        call = scaled_sum(1, b, x=4)._trace
+        self.assertEqual([arg._tag.name for arg in call._args], ['a', 'rest'])
+        self.assertEqual(list(call._kwargs.keys()), ['scale', 'named'])
+        self.assertIs(call._args[1]._traced_value[0], b)
+        with self.assertRaises(TypeError):
+            scaled_sum(scale=2)
+
+    def test_route01(self):
+        add_10 = TestTracer01.AddX(10)
+        self.assertTrue(is_traced_value(from_traced(add_10)))
+        self.assertFalse(is_traced_value(10))
+        module = types.ModuleType('route_module_'+self.__class__.__name__)
+        exec("def f(x):\n    return x", module.__dict__)
+        f = module.f
+        self.assertFalse(is_traced_callable(f))
+        self.assertIn(id(f), CALL_ROUTES)
+        # the routes do not keep functions alive
+        g = types.FunctionType(f.__code__, module.__dict__)
+        self.assertFalse(is_traced_callable(g))
+        g_ref = weakref.ref(g)
+        del g
+        self.assertIsNone(g_ref())
+        # unhashable callables are routed, without caching
+        namespace = {'__name__': 'untraced_'+module.__name__}
+        exec("class Unhashable:\n    __hash__ = None\n"
+             "    def __call__(self, x):\n        return x", namespace)
+        u = namespace['Unhashable']()
+        self.assertFalse(is_traced_callable(u))
+        self.assertEqual(trace(u)(trace(3))._value, 3)
+        # nor classes, of values or of objects, of any metaclass
+        exec("class Meta(type):\n    __hash__ = None\n"
+             "class Plain(metaclass=Meta):\n    pass\n", namespace)
+        plain = namespace.pop('Plain')
+        self.assertFalse(is_traced_value(plain))
+        self.assertFalse(is_traced_value(plain()))
+        self.assertIn(id(plain), CLASS_VALUE_ROUTES)
+        self.assertIn(id(plain), OBJECT_VALUE_ROUTES)
+        plain_id, plain_ref = id(plain), weakref.ref(plain)
+        del plain
+        gc.collect()
+        self.assertIsNone(plain_ref())
+        self.assertNotIn(plain_id, CLASS_VALUE_ROUTES)
+        self.assertNotIn(plain_id, OBJECT_VALUE_ROUTES)
+        # tracing more modules invalidates the routes
+        sys.modules[module.__name__] = module
+        trace_modules([module.__name__])
+        self.assertTrue(is_traced_callable(f))
+
+    def test_kind01(self):
+        class Unhashable:
+            __hash__ = None
+        class SubTuple(tuple):
+            pass
+        self.assertIs(type(trace(Unhashable())), Traced)
+        self.assertIsInstance(trace(SubTuple((trace(1),))), DeepTraced)
+        # registering with an ABC changes the kind of cached types
+        self.assertIs(collections.abc.Hashable.register(Unhashable), Unhashable)
+        self.assertIs(type(trace(Unhashable())), Hashable)
+        self.assertIn(Unhashable, TYPE_KINDS)
+
+    def test_resolve01(self):
+        base = trace((trace(1), 2))
+        t = base
+        for _ in range(1000):
+            t = Hashable(t._value, t)
+        self.assertIs(t._traced_value, base._traced_value)
+        self.assertIn('_traced_value', get_field(t._trace, '_resolved'))
+        # resolved through the parent memo, not the whole chain
+        t2 = Hashable(t._value, t)
+        self.assertIs(t2._traced_value, base._traced_value)
+        self.assertEqual(get_field(t2, '_resolved'),
+                         {'_traced_value': base._traced_value})
+
+    def test_intern01(self):
+        with interning():
+            add_10 = TestTracer01.AddX(10)
+            r1 = add_10.add_to(5, z=2)
+            r2 = add_10.add_to(5, z=2)
+            self.assertIs(trace(2), trace(2))
+            self.assertIsNot(trace(1), trace(1.0))
+            self.assertIsNot(trace(0.0), trace(-0.0))
+            self.assertIsNot(trace((True,)), trace((1,)))
+            self.assertEqual(repr(trace((-0.0,))._value), '(-0.0,)')
+            self.assertEqual(repr(trace(((0.0,), 1))._value), '((0.0,), 1)')
+            self.assertIs(trace((-0.0,)), trace((-0.0,)))
+            trace(frozenset({1}))
+            self.assertIs(next(iter(trace(frozenset({True}))._value)), True)
+            self.assertIs(r1._trace._args[1]._trace, r2._trace._args[1]._trace)
+            self.assertIs(r1._trace._callable._tag, r2._trace._callable._tag)
+        self.assertEqual(r1._value, 17)
+        self.assertIsNot(trace(2), trace(2))
+
+    def test_numpy01(self):
+        a = trace(np.arange(3.0))
+        b = np.sin(a) + np.ones(3) * trace(2)
+        self.assertIsInstance(b._op1, ArrayUFunc)
+        self.assertIsInstance(b._op2, ArrayUFunc)
+        self.assertTrue(np.allclose(b._value, np.sin(np.arange(3.0)) + 2))
+        c = np.dot(a, a)
+        self.assertIsInstance(c._trace, ArrayFunction)
+        self.assertEqual(c._value, 5.0)
+        self.assertEqual(np.add.reduce(a)._trace._method, 'reduce')
+        self.assertEqual(repr(np.concatenate([a, a]))[:18], 'numpy.concatenate(')
+
 
 if __name__ == '__main__':
     trace_modules([__name__])
@@ -30,18 +30,44 @@ __next__ return a Next traced that refers back to creation, and possibly to coun
 TODO: make Hashable anything that is hashable.
 """
 
+import abc
 import inspect
 import functools
 import types
-import functools
+import operator
 import collections.abc
+import contextlib
+import weakref
 from utility import build_expression_support, CALL_PRECEDENCE, LIMIT_PRECEDENCE, \
        GET_ITEM_PRECEDENCE
 
 NO_ATTRIBUTE = object()
+UNRESOLVED = object()
+# standard __setattr__ is intercepted, hot paths set node fields with this
+set_field = object.__setattr__
+
+# callables notified of each new traced node (e.g. tape recording)
+TRACE_OBSERVERS = list()
+# callables notified of each eagerly applied conversion (e.g. __bool__),
+# with the converted node, the conversion method name and its result
+CONVERSION_OBSERVERS = list()
+
+# constant node tables of the active interning() contexts, innermost last
+INTERNING = list()
+# shared tags while interning, dropped when no longer referenced
+INTERNED_TAGS = weakref.WeakValueDictionary()
 
 class Traced:
     """ Base generic tracing class  """
+    # Nodes use slots rather than a per instance __dict__, traces can be large.
+    # weak references let the tapes and observers map nodes by id, without
+    # keeping them alive
+    __slots__ = ('_value', '_trace', '_gen_counter', '_resolved', '__weakref__')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        init_trace_fields(cls)
+
     def __init__(self, value, trace=None):
         """ Takes raw Python data and stores it in _value """
         # not (yet) reentrant, make sure raw data is not traced
@@ -50,6 +76,10 @@ class Traced:
         if trace is not None:
             assert(isinstance(trace, Traced))
         self._s('_trace', trace)
+        if TRACE_OBSERVERS:
+            # subclasses set their fields before calling this __init__
+            for observer in TRACE_OBSERVERS:
+                observer(self)
 
     def _s(self, name, x):
         """ Standard __setattr__ is intercepted, so we use our own one. """
@@ -70,14 +100,12 @@ class Traced:
 
     def __getattr__(self, name):
         """ Get attribute along trace if there, otherwise we assume _value has it"""
-        t = self
-        while t is not None and not name in t.__dict__: 
-            t = t.__dict__.get('_trace')
-        if t is not None:
-            return getattr(t, name)
-        else:
-            assert(hasattr(self._value, name))
-            return GetAttr(Attribute(name), self)
+        if name in TRACE_FIELD_NAMES:
+            value = resolve_trace_field(self, name)
+            if value is not NO_ATTRIBUTE:
+                return value
+        assert(hasattr(self._value, name))
+        return GetAttr(Attribute(name), self)
 
     def __setattr__(self, name, value):
         """ setting attributes only allowed on objects created by traced classes. """
@@ -97,14 +125,13 @@ class Traced:
             obj = self._value.__new__(self._value)
             obj_t = Obj(obj)
             return obj_t._init(*args, **kwargs)
-        elif hasattr(callable_, '__module__') and \
-                callable_.__module__ in TRACED_MODULE_NAMES: 
+        elif is_traced_callable(callable_):
             # we trace the call as we know it within a traced module.
             # all args need be trace, so for that we get some help.
             sighelper = signature_helper(callable_)
             call_args, call_kwargs, has_traced = \
                 sighelper.bind_traced_function(args, kwargs)
-            return_trace = to_traced(sighelper.func(*call_args, **call_kwargs))
+            return_trace = to_traced(sighelper.call_traced_function(call_args, call_kwargs))
             return decorate_traced(Call(self, call_args, call_kwargs, return_trace._value, return_trace))
         else:
             # otherwise we call but having carefully removed all tracing from args
@@ -122,10 +149,8 @@ class Traced:
             return Iterator(self, iter_)
 
     def __next__(self):
-        if not hasattr(self, '_gen_counter'):
-            self._s('_gen_counter', 0)
-        counter = self._gen_counter
-        self._gen_counter += 1
+        counter = get_field(self, '_gen_counter', 0)
+        self._s('_gen_counter', counter + 1)
         next_ = next(self._value)
         if isinstance(next_, Traced):
             return Generation(self, counter, next_._value, next_)
@@ -137,153 +162,168 @@ class Traced:
         return GetItem(self, to_traced(other))
 
     @classmethod
-    def MK_OP1(cls, method1, op1):
+    def MK_OP1(cls, op_name, op1):
         # define how standard unary operators are called
-        op_name = method1.__reduce__()[1][1]
-        return GetAttr(Attribute(op_name), to_traced(op1))()
+        op1 = to_traced(op1)
+        op_class = BUILTIN_OP1_CLASSES.get(op_name, None)
+        if op_class is not None and not is_traced_value(op1._value):
+            # fast path, a direct operator node without GetAttr and dispatch
+            return op_class(op1)
+        return GetAttr(Attribute(op_name), op1)()
 
     @classmethod
-    def MK_OP2(cls, method2, op1, op2):
+    def MK_OP2(cls, op_name, op1, op2):
         # define how standard binary operators are called
-        op_name = method2.__reduce__()[1][1]
-        return GetAttr(Attribute(op_name), to_traced(op1))(to_traced(op2))
+        op1, op2 = to_traced(op1), to_traced(op2)
+        op_class = BUILTIN_OP2_CLASSES.get(op_name, None)
+        if (op_class is not None and 
+            not is_traced_value(op1._value) and 
+            not is_traced_value(op2._value)):
+            # fast path, a direct operator node without GetAttr and dispatch
+            return op_class(op1, op2)
+        return GetAttr(Attribute(op_name), op1)(op2)
 
     @classmethod
     def MK_CVT(cls, method1, op1):
         # for now conversions are immediately applied to allow direct integration
         # such as call math functions. TODO revisit this!
-        return method1() 
+        value = method1() 
+        if CONVERSION_OBSERVERS:
+            # e.g. guards of compiled traces, the trace depends on this value
+            for observer in CONVERSION_OBSERVERS:
+                observer(op1, method1.__name__, value)
+        return value
 
 
     def __add__(self, other):
-        return self.__class__.MK_OP2(self._value.__add__, self, other)
+        return self.__class__.MK_OP2('__add__', self, other)
     def __radd__(self, other):
-        return self.__class__.MK_OP2(self._value.__radd__, self, other)
+        return self.__class__.MK_OP2('__radd__', self, other)
 
 
     def __sub__(self, other):
-        return self.__class__.MK_OP2(self._value.__sub__, self, other)
+        return self.__class__.MK_OP2('__sub__', self, other)
     def __rsub__(self, other):
-        return self.__class__.MK_OP2(self._value.__rsub__, self, other)
+        return self.__class__.MK_OP2('__rsub__', self, other)
 
 
     def __mul__(self, other):
-        return self.__class__.MK_OP2(self._value.__mul__, self, other)
+        return self.__class__.MK_OP2('__mul__', self, other)
     def __rmul__(self, other):
-        return self.__class__.MK_OP2(self._value.__rmul__, self, other)
+        return self.__class__.MK_OP2('__rmul__', self, other)
 
 
     def __truediv__(self, other):
-        return self.__class__.MK_OP2(self._value.__truediv__, self, other)
+        return self.__class__.MK_OP2('__truediv__', self, other)
     def __rtruediv__(self, other):
-        return self.__class__.MK_OP2(self._value.__rtruediv__, self, other)
+        return self.__class__.MK_OP2('__rtruediv__', self, other)
 
 
     def __floordiv__(self, other):
-        return self.__class__.MK_OP2(self._value.__floordiv__, self, other)
+        return self.__class__.MK_OP2('__floordiv__', self, other)
     def __rfloordiv__(self, other):
-        return self.__class__.MK_OP2(self._value.__rfloordiv__, self, other)
+        return self.__class__.MK_OP2('__rfloordiv__', self, other)
 
 
     def __mod__(self, other):
-        return self.__class__.MK_OP2(self._value.__mod__, self, other)
+        return self.__class__.MK_OP2('__mod__', self, other)
     def __rmod__(self, other):
-        return self.__class__.MK_OP2(self._value.__rmod__, self, other)
+        return self.__class__.MK_OP2('__rmod__', self, other)
 
 
     def __pow__(self, other):
-        return self.__class__.MK_OP2(self._value.__pow__, self, other)
+        return self.__class__.MK_OP2('__pow__', self, other)
     def __rpow__(self, other):
-        return self.__class__.MK_OP2(self._value.__rpow__, self, other)
+        return self.__class__.MK_OP2('__rpow__', self, other)
 
 
     def __lshift__(self, other):
-        return self.__class__.MK_OP2(self._value.__lshirt__, self, other)
+        return self.__class__.MK_OP2('__lshift__', self, other)
     def __rlshift__(self, other):
-        return self.__class__.MK_OP2(self._value.__rlshift__, self, other)
+        return self.__class__.MK_OP2('__rlshift__', self, other)
 
 
     def __rshift__(self, other):
-        return self.__class__.MK_OP2(self._value.__rshift__, self, other)
+        return self.__class__.MK_OP2('__rshift__', self, other)
     def __rrshift__(self, other):
-        return self.__class__.MK_OP2(self._value.__rrshift__, self, other)
+        return self.__class__.MK_OP2('__rrshift__', self, other)
 
 
     def __and__(self, other):
-        return self.__class__.MK_OP2(self._value.__and__, self, other)
+        return self.__class__.MK_OP2('__and__', self, other)
     def __rand__(self, other):
-        return self.__class__.MK_OP2(self._value.__rand__, self, other)
+        return self.__class__.MK_OP2('__rand__', self, other)
 
 
     def __xor__(self, other):
-        return self.__class__.MK_OP2(self._value.__xor__, self, other)
+        return self.__class__.MK_OP2('__xor__', self, other)
     def __rxor__(self, other):
-        return self.__class__.MK_OP2(self._value.__rxor__, self, other)
+        return self.__class__.MK_OP2('__rxor__', self, other)
 
 
     def __or__(self, other):
-        return self.__class__.MK_OP2(self._value.__or__, self, other)
+        return self.__class__.MK_OP2('__or__', self, other)
     def __ror__(self, other):
-        return self.__class__.MK_OP2(self._value.__ror__, self, other)
+        return self.__class__.MK_OP2('__ror__', self, other)
 
 
     def __matmul__(self, other):
-        return self.__class__.MK_OP2(self._value.__matmul__, self, other)
+        return self.__class__.MK_OP2('__matmul__', self, other)
     def __rmatmul__(self, other):
-        return self.__class__.MK_OP2(self._value.__rmatmul__, self, other)
+        return self.__class__.MK_OP2('__rmatmul__', self, other)
 
     def __divmod__(self, other):
-        return self.__class__.MK_OP2(self._value.__divmod__, self, other)
+        return self.__class__.MK_OP2('__divmod__', self, other)
 
 
     def __lt__(self, other):
-        return self.__class__.MK_OP2(self._value.__lt__, self, other)
+        return self.__class__.MK_OP2('__lt__', self, other)
 
 
     def __le__(self, other):
-        return self.__class__.MK_OP2(self._value.__le__, self, other)
+        return self.__class__.MK_OP2('__le__', self, other)
 
 
     def __eq__(self, other):
-        return self.__class__.MK_OP2(self._value.__eq__, self, other)
+        return self.__class__.MK_OP2('__eq__', self, other)
 
 
     def __ne__(self, other):
-        return self.__class__.MK_OP2(self._value.__ne__, self, other)
+        return self.__class__.MK_OP2('__ne__', self, other)
 
 
     def __gt__(self, other):
-        return self.__class__.MK_OP2(self._value.__gt__, self, other)
+        return self.__class__.MK_OP2('__gt__', self, other)
 
 
     def __ge__(self, other):
-        return self.__class__.MK_OP2(self._value.__ge__, self, other)
+        return self.__class__.MK_OP2('__ge__', self, other)
 
 
     def __contains__(self, other):
-        return self.__class__.MK_OP2(self._value.__contains__, self, other)
+        return self.__class__.MK_OP2('__contains__', self, other)
 
 
     def __neg__(self):
-        return self.__class__.MK_OP1(self._value.__neq__, self)
+        return self.__class__.MK_OP1('__neg__', self)
 
 
     def __pos__(self):
-        return self.__class__.MK_OP1(self._value.__pos__, self)
+        return self.__class__.MK_OP1('__pos__', self)
 
 
     def __invert__(self):
-        return self.__class__.MK_OP1(self._value.__invert__, self)
+        return self.__class__.MK_OP1('__invert__', self)
 
 
     def __abs__(self):
-        return self.__class__.MK_OP1(self._value.__abs__, self)
+        return self.__class__.MK_OP1('__abs__', self)
 
 
     def __len__(self):
         if not hasattr(self._value, '__len__'):
             raise TypeError()
-        return self.__class__.MK_OP1(self._value.__len__, self)
+        return self.__class__.MK_OP1('__len__', self)
 
 
     def __str__(self):
@@ -305,15 +345,112 @@ class Traced:
     def __complex__(self):
         return self.__class__.MK_CVT(self._value.__complex__, self)
 
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """ numpy ufuncs (and their methods, e.g. reduce) of traced values """
+        if 'out' in kwargs:
+            # results written in place are not traced
+            return NotImplemented
+        return decorate_traced(ArrayUFunc(ufunc, method, inputs, kwargs))
+
+    def __array_function__(self, func, types, args, kwargs):
+        """ numpy functions (e.g. dot, concatenate) of traced values """
+        return decorate_traced(ArrayFunction(func, args, kwargs))
+
+
+# all field names of all Traced classes
+TRACE_FIELD_NAMES = set()
+# fields changed after the node is built, never memoized
+MUTABLE_TRACE_FIELDS = frozenset(('_gen_counter', '_iter_counter', '_gen_stopped',
+                                  '_iter_stopped'))
+
+def init_trace_fields(cls):
+    """ Collect the slot names of a Traced class, most derived class first """
+    fields = list()
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get('__slots__', ()):
+            if (name not in ('__weakref__', '__dict__', '_resolved', '_tiered') and 
+                name not in fields):
+                fields.append(name)
+    cls._trace_fields = tuple(fields)
+    cls._trace_field_set = frozenset(fields)
+    TRACE_FIELD_NAMES.update(fields)
+
+init_trace_fields(Traced)
+
+def get_field(traced, name, default=None):
+    """ Slot value of a traced node, default when the slot is not set """
+    try:
+        return object.__getattribute__(traced, name)
+    except AttributeError:
+        return default
+
+def resolve_trace_field(traced, name):
+    """ Value of field name on the first node of the trace chain that has it.
+    Results are memoized on the nodes walked through (in _resolved), so
+    repeated lookups, also from nodes added later to the chain, are O(1). """
+    resolved = get_field(traced, '_resolved')
+    if resolved is not None:
+        value = resolved.get(name, UNRESOLVED)
+        if value is not UNRESOLVED:
+            return value
+    walked = list()
+    value = NO_ATTRIBUTE
+    t = traced
+    while t is not None:
+        if name in t._trace_field_set:
+            value = get_field(t, name, NO_ATTRIBUTE)
+            if value is not NO_ATTRIBUTE:
+                break
+        resolved = get_field(t, '_resolved')
+        if resolved is not None and name in resolved:
+            value = resolved[name]
+            break
+        walked.append(t)
+        t = get_field(t, '_trace')
+    if name not in MUTABLE_TRACE_FIELDS:
+        for t in walked:
+            resolved = get_field(t, '_resolved')
+            if resolved is None:
+                resolved = dict()
+                object.__setattr__(t, '_resolved', resolved)
+            resolved[name] = value
+    return value
+
+def trace_fields(traced):
+    """ The (name, value) of the fields set on a traced node """
+    for name in traced._trace_fields:
+        value = get_field(traced, name, NO_ATTRIBUTE)
+        if value is not NO_ATTRIBUTE:
+            yield name, value
+
+def observed_hash(traced):
+    """ Hash of the value of a hashable node, observed as a conversion (e.g.
+    by guards), as what follows may depend on it (e.g. a dict lookup) """
+    value = traced._value.__hash__()
+    if CONVERSION_OBSERVERS:
+        for observer in CONVERSION_OBSERVERS:
+            observer(traced, '__hash__', value)
+    return value
+
+def observed_eq(traced, other):
+    """ Untraced __eq__ of a hashable node, observed as the __bool__ of the
+    traced comparison, as what follows may depend on it (e.g. a branch) """
+    other_value = other._value if isinstance(other, Traced) else other
+    value = traced._value.__eq__(other_value)
+    if CONVERSION_OBSERVERS and value is not NotImplemented:
+        eq = BUILTIN_OP2_CLASSES['__eq__'](traced, to_traced(other))
+        for observer in CONVERSION_OBSERVERS:
+            observer(eq, '__bool__', bool(value))
+    return value
+
 class Hashable(Traced):
+    __slots__ = ()
+
     def __hash__(self):
-        return self._value.__hash__()
+        return observed_hash(self)
 
     def __eq__(self, other):
-        if isinstance(other, Traced):
-            return self._value.__eq__(other._value)
-        else:
-            return self._value.__eq__(other)
+        return observed_eq(self, other)
 
 class NeedsTracing:
     """ Stateful helper to track if tuple needs to be 'deep traced' """
@@ -346,6 +483,9 @@ def rebuild_deep(value, to_deep=to_deep, process_traced=None):
                     return process_traced(value)
                 else:
                     return value
+            case tuple() | list() | frozenset() | dict() if not value:
+                # empty, nothing to trace
+                return value
             case tuple():
                 ntt = NeedsTracing()
                 el_traced, el_untraced = zip(*[ntt.split(rebuild_deep_(e)) for e in value])
@@ -376,23 +516,95 @@ def rebuild_deep(value, to_deep=to_deep, process_traced=None):
                 return value
     return rebuild_deep_(value)
 
+class TypeKind:
+    """ How values of a type are traced, see type_kind """
+    __slots__ = ('is_traced', 'is_deep', 'wrap', 'decorate')
+
+    def __init__(self, cls):
+        is_generator = issubclass(cls, collections.abc.Generator)
+        is_iterator = issubclass(cls, collections.abc.Iterator)
+        is_hashable = issubclass(cls, collections.abc.Hashable)
+        self.is_traced = issubclass(cls, Traced)
+        self.is_deep = issubclass(cls, (tuple, list, slice, frozenset, dict))
+        # wrapper of untraced values (basic_to_traced)
+        self.wrap = (Generator if is_generator else 
+                     Hashable if is_hashable else Traced)
+        # wrapper of call results (decorate_traced)
+        self.decorate = (Generator if is_generator else
+                         Iterator if is_iterator else
+                         Hashable if is_hashable else None)
+
+
+TYPE_KINDS = dict()
+
+def type_kind(cls):
+    """ The (cached) tracing kind of a type, one dict lookup. The cache is
+    dropped when an ABC registers a new class (see abc_register). """
+    kind = TYPE_KINDS.get(cls, None)
+    if kind is None:
+        kind = TYPE_KINDS[cls] = TypeKind(cls)
+    return kind
+
+ABC_REGISTER = abc.ABCMeta.register
+
+@functools.wraps(ABC_REGISTER)
+def abc_register(cls, subclass):
+    """ ABCMeta.register, which drops the cached type kinds, as registering
+    may change the ABC checks """
+    TYPE_KINDS.clear()
+    return ABC_REGISTER(cls, subclass)
+
+abc.ABCMeta.register = abc_register
+
 def decorate_traced(traced):
-    if isinstance(traced._value, collections.abc.Generator):
-        return Generator(traced._value, traced) if not isinstance(traced, Generator) else traced
-    elif isinstance(traced._value, collections.abc.Iterator):
-        return Iterator(traced._value, traced) if not isinstance(traced, Iterator) else traced
-    elif isinstance(traced._value, collections.abc.Hashable):
-        return Hashable(traced._value, traced) if not isinstance(traced, Hashable) else traced
-    else:
+    decorate = type_kind(type(traced._value)).decorate
+    if decorate is None or isinstance(traced, decorate):
         return traced
+    elif decorate is Iterator:
+        return Iterator(traced, traced._value, traced)
+    else:
+        return decorate(traced._value, traced)
  
 def basic_to_traced(value):
-    if isinstance(value, collections.abc.Generator):
-        return Generator(value)
-    elif isinstance(value, collections.abc.Hashable):
+    wrap = type_kind(type(value)).wrap
+    if INTERNING and wrap is Hashable:
+        return intern_constant(value)
+    return wrap(value)
+
+def constant_key(value):
+    """ Key of equal constants: the type is part of it as 1 == 1.0 == True,
+    floats use their repr as 0.0 == -0.0 and nan != nan, tuples and frozensets
+    use the keys of their elements as (1,) == (True,) """
+    if isinstance(value, (float, complex)):
+        return (type(value), repr(value))
+    if isinstance(value, tuple):
+        return (type(value), tuple(constant_key(e) for e in value))
+    if isinstance(value, frozenset):
+        return (type(value), frozenset(constant_key(e) for e in value))
+    return (type(value), value)
+
+def intern_constant(value):
+    """ The shared constant Hashable node of value, in the interning context """
+    key = constant_key(value)
+    constants = INTERNING[-1]
+    try:
+        node = constants.get(key, None)
+    except TypeError:
+        # e.g. hashable class with unhashable content
         return Hashable(value)
-    else:
-        return Traced(value)
+    if node is None:
+        node = constants[key] = Hashable(value)
+    return node
+
+@contextlib.contextmanager
+def interning():
+    """ Share equal tags and constant leaf nodes traced within the context """
+    constants = dict()
+    INTERNING.append(constants)
+    try:
+        yield constants
+    finally:
+        INTERNING[:] = [c for c in INTERNING if c is not constants]
 
 
 def to_deep_trace(value):
@@ -405,13 +617,16 @@ def to_deep_trace(value):
 
 def to_traced(value):
     """ 'wraps' given value for tracing if needed. Tuples and ... are deep checked. """
-    if isinstance(value, Traced):
+    kind = type_kind(type(value))
+    if kind.is_traced:
         # Already traced
          return value
-    elif isinstance(value, (tuple, list, slice, frozenset, dict)):
+    elif kind.is_deep:
         return to_deep_trace(value)
+    elif INTERNING and kind.wrap is Hashable:
+        return intern_constant(value)
     else:
-        return basic_to_traced(value)
+        return kind.wrap(value)
 
 
 """ to_trace alias (TODO cleanup) """
@@ -430,6 +645,8 @@ htrace = trace
 
 class DeepTraced(Traced):
     """ Traced tuples, slices and 'proxy' dicts when they contain traced data """
+    __slots__ = ('_traced_value',)
+
     def __init__(self, traced_value, untraced_value, trace=None):
         self._s('_traced_value', traced_value)
         super().__init__(untraced_value, trace)
@@ -439,16 +656,18 @@ class DeepTraced(Traced):
 
 class DeepHashable(DeepTraced):
     """ Traced hashable tuples, slices and 'proxy' dicts when they contain traced data """
+    __slots__ = ()
+
     def __hash__(self):
-        return self._value.__hash__()
+        return observed_hash(self)
 
     def __eq__(self, other):
-        if isinstance(other, Traced):
-            return self._value.__eq__(other._value)
-        else:
-            return self._value.__eq__(other)
+        return observed_eq(self, other)
 
 class Iterator(Traced):
+    # _iter_stopped is set when the last next raised StopIteration
+    __slots__ = ('_iterable', '_iter_counter', '_iter_stopped')
+
     def __init__(self, iterable, value, trace=None):
         self._s('_iterable', iterable)
         self._s('_iter_counter', 0)
@@ -460,19 +679,28 @@ class Iterator(Traced):
     def __next__(self):
         counter = self._iter_counter
         self._s('_iter_counter', counter + 1)
-        next_ = next(self._value)
+        try:
+            next_ = next(self._value)
+        except StopIteration:
+            self._s('_iter_stopped', True)
+            raise
         if isinstance(next_, Traced):
             return decorate_traced(Iteration(self, counter, next_._value, next_))
         else:
             return decorate_traced(Iteration(self, counter, next_))
 
 class Iteration(Traced):
+    __slots__ = ('_iterator', '_count')
+
     def __init__(self, iterator, count, value, trace=None):
         self._s('_iterator', iterator)
         self._s('_count', count)
         super().__init__(value, trace)
 
 class Generator(Traced):
+    # _gen_stopped is set when the last next raised StopIteration
+    __slots__ = ('_gen_stopped',)
+
     def __init__(self, value, trace=None):
         self._s('_gen_counter', 0)
         super().__init__(value, trace)
@@ -483,13 +711,19 @@ class Generator(Traced):
     def __next__(self):
         counter = self._gen_counter
         self._s('_gen_counter', counter + 1)
-        next_ = next(self._value)
+        try:
+            next_ = next(self._value)
+        except StopIteration:
+            self._s('_gen_stopped', True)
+            raise
         if isinstance(next_, Traced):
             return decorate_traced(Generation(self, counter, next_._value, next_))
         else:
             return decorate_traced(Generation(self, counter, next_))
 
 class Generation(Traced):
+    __slots__ = ('_generator', '_count')
+
     def __init__(self, generator, count, value, trace=None):
         self._s('_generator', generator)
         self._s('_count', count)
@@ -497,6 +731,8 @@ class Generation(Traced):
 
 class Obj(Traced):
     """ Traced object, built by traced classes """
+    __slots__ = ('_attributes',)
+
     def __init__(self, value, trace=None):
         # value is fresh from __new__
         # __init__ of value happens after this init so that __setattr__ get tracked. 
@@ -518,7 +754,7 @@ class Obj(Traced):
         # A key, and controversial, concept is that the traced object __init__ self is traced!
         call_args, call_kwargs, has_traced = \
             sighelper.bind_traced_function((self,) + args, kwargs)
-        _ = sighelper.func(*call_args, **call_kwargs)
+        _ = sighelper.call_traced_function(call_args, call_kwargs)
         return NewInit(self, call_args, call_kwargs)
  
     def __setattr__(self, name, value):
@@ -529,14 +765,42 @@ class Obj(Traced):
 
 class Function(Traced):
     """ Traced top level functions of a traced module """
+    # _tiered: the tiered execution (jit.JitFunction) of the function, or None
+    __slots__ = ('_tiered',)
+
+    def __init__(self, value, trace=None):
+        self._s('_tiered', None)
+        super().__init__(value, trace)
+
     def __repr__(self): return self._value.__name__
 
+    def __call__(self, *args, **kwargs):
+        if self._tiered is not None:
+            return self._tiered(*args, **kwargs)
+        return Traced.__call__(self, *args, **kwargs)
+
 class Class(Traced):
     """ Traced class of a traced module """
+    __slots__ = ('_tiered',)
+
+    def __init__(self, value, trace=None):
+        self._s('_tiered', None)
+        super().__init__(value, trace)
+
     def __repr__(self): return self._value.__name__
 
+    def __call__(self, *args, **kwargs):
+        if self._tiered is not None:
+            return self._tiered(*args, **kwargs)
+        return Traced.__call__(self, *args, **kwargs)
+
+# leaves that hold a constant value
+CONSTANT_CLASSES = (Traced, Hashable, Function, Class)
+
 class ArgumentsBase(Traced):
     """ The traced arguments of traced calls and dispatches """
+    __slots__ = ('_args', '_kwargs')
+
     def __init__(self, args, kwargs, value, trace=None):
         self._s('_args', args)
         self._s('_kwargs', kwargs)
@@ -553,6 +817,8 @@ class ArgumentsBase(Traced):
 
 class CallBase(ArgumentsBase):
     """ The traced callable of traced calls and dispatches """
+    __slots__ = ('_callable',)
+
     def __init__(self, callable_, args, kwargs, value, trace=None):
         self._s('_callable', callable_)
         super().__init__(args, kwargs, value, trace)
@@ -616,10 +882,12 @@ class CallBase(ArgumentsBase):
 
 class Call(CallBase):
     """ Traced call """
-    pass
+    __slots__ = ()
 
 class Dispatch(CallBase):
     """ Traced dispatch """
+    __slots__ = ()
+
     def __repr__(self):
         return self._dispatch_precedence_repr(LIMIT_PRECEDENCE, 1)
 
@@ -628,18 +896,59 @@ class Dispatch(CallBase):
 
 class UCall(CallBase):
     """ Trace into an untraced call """
-    pass
+    __slots__ = ()
 
 class UDispatch(CallBase):
     """ Trace into an untraced dispatch """
+    __slots__ = ()
+
     def __repr__(self):
         return self._dispatch_precedence_repr(LIMIT_PRECEDENCE)
 
     def _precedence_repr(self, precedence):
         return self._dispatch_precedence_repr(precedence)
 
+class ArrayFunction(UCall):
+    """ Trace of a numpy function, called with the untraced arguments """
+    __slots__ = ()
+
+    def __init__(self, func, args, kwargs, callable_=None):
+        args = tuple(map(to_traced, args))
+        kwargs = {name: to_traced(value) for name, value in kwargs.items()}
+        if callable_ is None:
+            callable_ = func
+        value = callable_(*map(from_traced, args), 
+                          **{name: from_traced(value) for name, value in kwargs.items()})
+        super().__init__(to_traced(callable_), args, kwargs, value)
+
+    def _name(self):
+        return f"{self._callable._value.__module__}.{self._callable._value.__name__}"
+
+    def __repr__(self):
+        return self._name() + self._arguments_repr()
+
+    def _precedence_repr(self, precedence):
+        return self.__repr__()
+
+class ArrayUFunc(ArrayFunction):
+    """ Trace of a numpy ufunc, or of one of its methods (e.g. reduce) """
+    __slots__ = ('_ufunc', '_method')
+
+    def __init__(self, ufunc, method, args, kwargs):
+        self._s('_ufunc', ufunc)
+        self._s('_method', method)
+        callable_ = ufunc if method == '__call__' else getattr(ufunc, method)
+        super().__init__(ufunc, args, kwargs, callable_)
+
+    def _name(self):
+        if self._method == '__call__':
+            return f"numpy.{self._ufunc.__name__}"
+        return f"numpy.{self._ufunc.__name__}.{self._method}"
+
 class NewInit(ArgumentsBase):
     """ Traced object creation/init """
+    __slots__ = ()
+
     # The traced class creates this on instanciating a traced object
     def __init__(self, obj, args, kwargs):
         super().__init__(args, kwargs, obj._value, obj)
@@ -654,6 +963,8 @@ class NewInit(ArgumentsBase):
 
 class Op1(Traced):
     """ Base for context specific unary operator tracing """
+    __slots__ = ('_op1',)
+
     def __init__(self, op1, trace=None):
         self._s('_op1', op1)
         super().__init__(self._op1o(op1._value), trace)
@@ -677,6 +988,8 @@ class Op1(Traced):
 
 class Op2(Traced):
     """ Base for context specific binary operator tracing """
+    __slots__ = ('_op1', '_op2')
+
     def __init__(self, op1, op2, trace=None):
         self._s('_op1', op1)
         self._s('_op2', op2)
@@ -701,6 +1014,8 @@ class Op2(Traced):
 
 
 class GetItem(Op2):
+    __slots__ = ()
+
     def __init__(self, op1, op2):
         trace = None
         if isinstance(op1, DeepTraced):
@@ -724,15 +1039,28 @@ class GetItem(Op2):
 
 
 class Tag:
-    pass
+    __slots__ = ('__weakref__',)
+
+    def __new__(cls, *args, **kwargs):
+        """ Equal tags are shared while interning """
+        if INTERNING:
+            key = (cls, args, tuple(sorted(kwargs.items())))
+            tag = INTERNED_TAGS.get(key, None)
+            if tag is None:
+                tag = super().__new__(cls)
+                INTERNED_TAGS[key] = tag
+            return tag
+        return super().__new__(cls)
 
 class Lexical(Tag):
-    pass
+    __slots__ = ()
 
 class Dynamic(Tag):
-    pass
+    __slots__ = ()
 
 class Arg(Lexical):
+    __slots__ = ('param_kind', 'name')
+
     def __init__(self, param_kind, name):
         self.param_kind = param_kind
         self.name = name
@@ -753,6 +1081,8 @@ class Arg(Lexical):
 
 
 class Attribute(Dynamic):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -769,6 +1099,8 @@ class Attribute(Dynamic):
         return hash(self.name)
 
 class GetAttr(Op1):
+    __slots__ = ('_tag',)
+
     def __init__(self, tag, op1):
         self._s('_tag', tag)
         if isinstance(op1, Obj):
@@ -792,14 +1124,12 @@ class GetAttr(Op1):
         # check that we understand the method type, and that module is traced
         dispatch_self = self._op1
         self_value = dispatch_self._value
-        if  ((isinstance(self_value, type) and 
-              self_value.__module__ in TRACED_MODULE_NAMES) or 
-             self_value.__class__.__module__ in TRACED_MODULE_NAMES):
+        if is_traced_value(self_value):
             # traced dispatch with help as all args need to be traced have have proper self 
             sighelper = signature_helper(self._value)
             call_args, call_kwargs, has_traced = \
                 sighelper.bind_traced_function((self._op1,) + args, kwargs)
-            return_trace = to_traced(sighelper.func(*call_args, **call_kwargs))
+            return_trace = to_traced(sighelper.call_traced_function(call_args, call_kwargs))
             return decorate_traced(Dispatch(self, call_args, call_kwargs, return_trace._value, return_trace))
         else:
             # non-traced dispatch, remove all tracing from args
@@ -812,6 +1142,8 @@ class GetAttr(Op1):
 
 
 class SetAttr(Op1):
+    __slots__ = ('_tag',)
+
     def __init__(self, tag, op1):
         self._s('_tag', tag)
         super().__init__(op1, op1)
@@ -828,8 +1160,90 @@ class SetAttr(Op1):
         return v1
 
 
+class BuiltinOp1(Op1):
+    """ Standard Python unary operator applied to untraced values """
+    __slots__ = ()
+    # set per operator, see make_builtin_op_classes
+    _name = None
+    _symbol = None
+    _symbol_precedence = CALL_PRECEDENCE
+    _function = None
+
+    def __repr__(self):
+        if self._symbol is None:
+            return self._op1._precedence_repr(CALL_PRECEDENCE)+'.'+self._name+'()'
+        elif self._symbol.isidentifier():
+            return self._symbol+'('+self._op1.__repr__()+')'
+        else:
+            return self._symbol+self._op1._precedence_repr(self._symbol_precedence)
+
+    def __init__(self, op1):
+        # hot path, see BuiltinOp2.__init__
+        set_field(self, '_op1', op1)
+        set_field(self, '_value', self._function(op1._value))
+        set_field(self, '_trace', None)
+        if TRACE_OBSERVERS:
+            for observer in TRACE_OBSERVERS:
+                observer(self)
+
+    def _precedence(self):
+        return self._symbol_precedence
+
+    def _op1o(self, v1):
+        return self._function(v1)
+
+
+class BuiltinOp2(Op2):
+    """ Standard Python binary operator applied to untraced values. Evaluated
+    with the operator module function (e.g. operator.add), not the dunder
+    method of the left value: mixed types and reflection resolve as in plain
+    Python, trace(1) + 2.0 is 3.0 rather than int.__add__'s NotImplemented. """
+    __slots__ = ()
+    # set per operator, see make_builtin_op_classes
+    _name = None
+    _symbol = None
+    _symbol_precedence = CALL_PRECEDENCE
+    _function = None
+
+    def __repr__(self):
+        symbol, precedence = self._symbol, self._symbol_precedence
+        if symbol is None:
+            # e.g. reflected operators, represented as their dispatch
+            return (self._op1._precedence_repr(CALL_PRECEDENCE)+'.'+self._name+
+                    '('+self._op2.__repr__()+')')
+        elif symbol.isidentifier():
+            return symbol+'('+self._op1.__repr__()+', '+self._op2.__repr__()+')'
+        elif symbol != '**':
+            return ''.join((self._op1._precedence_repr(precedence-1),
+                            symbol, 
+                            self._op2._precedence_repr(precedence)))
+        else:
+            return ''.join((self._op1._precedence_repr(precedence),
+                            symbol, 
+                            self._op2._precedence_repr(precedence-1)))
+
+    def __init__(self, op1, op2):
+        # the hot path of operator tracing, fields are set directly rather
+        # than through the Op2 and Traced __init__ chain
+        set_field(self, '_op1', op1)
+        set_field(self, '_op2', op2)
+        set_field(self, '_value', self._function(op1._value, op2._value))
+        set_field(self, '_trace', None)
+        if TRACE_OBSERVERS:
+            for observer in TRACE_OBSERVERS:
+                observer(self)
+
+    def _precedence(self):
+        return self._symbol_precedence
+
+    def _op2o(self, v1, v2):
+        return self._function(v1, v2)
+
+
 class Argument(Traced):
     """ Used to 'tag' and track the arguments to traced calls and dispatches """
+    __slots__ = ('_tag',)
+
     def __init__(self, tag, trace):
         self._s('_tag', tag)
         super().__init__(trace._value, trace)
@@ -863,6 +1277,56 @@ def signature_helper(func_or_method):
         sighelper = func._signature_tracing_helper
     return sighelper
 
+def make_binder(signature, name):
+    """ Generate a function binding call arguments as the signature does.
+    The binder returns the bound values in parameter order, with defaults
+    applied, *args as a tuple and **kwargs as a dict. """
+    params = list()
+    namespace = dict()
+    positional_only = False
+    keyword_only = False
+    for param in signature.parameters.values():
+        match param.kind:
+            case inspect.Parameter.POSITIONAL_ONLY:
+                positional_only = True
+            case inspect.Parameter.POSITIONAL_OR_KEYWORD:
+                if positional_only:
+                    params.append('/')
+                    positional_only = False
+            case inspect.Parameter.VAR_POSITIONAL:
+                if positional_only:
+                    params.append('/')
+                    positional_only = False
+                keyword_only = True
+                params.append('*'+param.name)
+                continue
+            case inspect.Parameter.KEYWORD_ONLY:
+                if positional_only:
+                    params.append('/')
+                    positional_only = False
+                if not keyword_only:
+                    params.append('*')
+                    keyword_only = True
+            case inspect.Parameter.VAR_KEYWORD:
+                if positional_only:
+                    params.append('/')
+                    positional_only = False
+                params.append('**'+param.name)
+                continue
+        if param.default is inspect.Parameter.empty:
+            params.append(param.name)
+        else:
+            default_name = '_default_'+param.name
+            namespace[default_name] = param.default
+            params.append(param.name+'='+default_name)
+    if positional_only:
+        params.append('/')
+    names = [param.name for param in signature.parameters.values()]
+    source = (f"def {name}({', '.join(params)}):\n"
+              f"    return ({''.join(n+', ' for n in names)})\n")
+    exec(source, namespace)
+    return namespace[name]
+
 class SignatureHelper:
     """ Holds a callable's inspect details to accelerate calls and dispatchs """
     def __init__(self, func, is_object_method):
@@ -871,13 +1335,15 @@ class SignatureHelper:
         self.is_object_method = is_object_method
         self.signature = inspect.signature(func)
         self.argument_tags = list()
+        self.var_positional_index = None
+        self.var_keyword_index = None
 
         count_positionals = 0
         has_var_positional = False
         count_keywords = 0
         has_var_keyword = False
 
-        for param in self.signature.parameters.values():
+        for idx, param in enumerate(self.signature.parameters.values()):
             tag = Arg(param.kind, param.name)
             self.argument_tags.append(tag)
             match tag.param_kind:
@@ -889,84 +1355,156 @@ class SignatureHelper:
 
                 case inspect.Parameter.VAR_POSITIONAL:
                     has_var_positional = True
+                    self.var_positional_index = idx
 
                 case inspect.Parameter.KEYWORD_ONLY:
                     count_keywords += 1
 
                 case inspect.Parameter.VAR_KEYWORD:
                     has_var_keyword = True
+                    self.var_keyword_index = idx
 
         self.count_positionals = count_positionals
         self.has_var_positional = has_var_positional
         self.count_keywords = count_keywords
         self.has_var_keyword = has_var_keyword
-
-
+        # Replaces signature.bind and apply_defaults, generated once per signature
+        self.bind = make_binder(self.signature, func.__name__)
 
     def bind_traced_function(self, args, kwargs):
         """ Binds and traces the arugments to call or a dispatch """
-        bound_args = self.signature.bind(*args, **kwargs)
-        bound_args.apply_defaults()
-        arguments = bound_args.arguments
-
-        arg_iter = zip(self.argument_tags, arguments.values())
-        def unroll_arg(has_traced):
-            tag, value = next(arg_iter)
+        has_traced = False
+        arguments = list()
+        for idx, (tag, value) in enumerate(zip(self.argument_tags,
+                                               self.bind(*args, **kwargs))):
             if isinstance(value, Traced):
-                has_traced = True 
+                # the traced self of a method does not count as traced input
+                has_traced = has_traced or idx != 0 or not isinstance(value, Obj)
             else:
                 value = to_traced(value)
             # As arguments are 'process' (unrolled) we tag them as arguments.
-            return Argument(tag, value), has_traced
-
-        has_traced = False
-
-        call_args = list()
-        for idx in range(0, self.count_positionals):
-            argument, has_traced = unroll_arg(has_traced)
-            if idx == 0 and isinstance(argument._trace, Obj):
-                has_traced = False
-            assert(argument._tag.param_kind 
-                   == inspect.Parameter.POSITIONAL_ONLY or
-                   argument._tag.param_kind 
-                   == inspect.Parameter.POSITIONAL_OR_KEYWORD)
-            call_args.append(argument)
-
+            arguments.append(Argument(tag, value))
+
+        n_args = self.count_positionals + self.has_var_positional
+        call_args = tuple(arguments[:n_args])
+        call_kwargs = {argument._tag.name: argument 
+                       for argument in arguments[n_args:]}
+        return call_args, call_kwargs, has_traced
+
+    def call_traced_function(self, call_args, call_kwargs):
+        """ Calls the function with bound arguments, *args and **kwargs spread """
+        def content(argument):
+            # the traced elements of a deep traced argument are kept as is
+            trace = argument._trace
+            if isinstance(trace, DeepTraced):
+                return trace._traced_value
+            return trace._value
         if self.has_var_positional:
-            argument, has_traced = unrol_arg(has_traced)
-            assert(argument._tag.param_kind 
-                   == inspect.Parameter.VAR_POSITIONAL) 
-            call_args.append(argument) 
-
-        call_kwargs = dict()
-        for _ in range(0, self.count_keywords):
-            argument, has_traced = unrol_arg(has_traced)
-            assert(argument._tag.param_kind 
-                   == inspect.Parameter.KEYWORD_ONLY) 
-            call_kwargs[argument._tag.name] = argument
-
+            call_args = (call_args[:-1] + 
+                         tuple(to_traced(v) for v in content(call_args[-1])))
         if self.has_var_keyword:
-            argument, has_traced = unroll_arg(has_traced)
-            assert(argument._tag.param_kind 
-                   == inspect.Parameter.VAR_KEYWORD) 
-            call_kwargs[argument._tag.name] = argument
-
-        return tuple(call_args), call_kwargs, has_traced
+            var_keyword = self.argument_tags[self.var_keyword_index].name
+            call_kwargs = dict(call_kwargs)
+            call_kwargs.update((name, to_traced(v)) for name, v 
+                               in content(call_kwargs.pop(var_keyword)).items())
+        return self.func(*call_args, **call_kwargs)
 
 
 TRACED_MODULE_NAMES = set()
 TRACED_CLASSES = set()
 MODULES_WITH_UNTRACED_PARENTS = list()
 
-def trace_class(cls, has_members):
+# Routing caches, cleared by trace_modules when the traced modules change.
+# Functions and classes are keyed by id, and referenced weakly: their routes
+# are dropped when they are freed, as their id may be reused. Lookups by id
+# need no hashable key. Builtin (static) types are never freed, the classes
+# of object values are keys as is when builtin, for a single lookup.
+CALL_ROUTES = dict()            # id of function or class -> is traced
+CLASS_VALUE_ROUTES = dict()     # id of class value -> is traced
+OBJECT_VALUE_ROUTES = dict()    # class of an object value, or its id -> is traced
+ROUTE_REFS = dict()             # id -> weak reference of the function or class
+HEAP_TYPE_FLAG = 1 << 9         # Py_TPFLAGS_HEAPTYPE
+
+def forget_routes(ref):
+    if ROUTE_REFS.get(ref.key) is ref:
+        del ROUTE_REFS[ref.key]
+        for routes in (CALL_ROUTES, CLASS_VALUE_ROUTES, OBJECT_VALUE_ROUTES):
+            routes.pop(ref.key, None)
+
+def add_route(routes, key_object, route):
+    """ Cache the route of key_object, unless it is not weak referenceable """
+    key = id(key_object)
+    if key not in ROUTE_REFS:
+        try:
+            ROUTE_REFS[key] = weakref.KeyedRef(key_object, forget_routes, key)
+        except TypeError:
+            return
+    routes[key] = route
+
+def clear_routes():
+    CALL_ROUTES.clear()
+    CLASS_VALUE_ROUTES.clear()
+    OBJECT_VALUE_ROUTES.clear()
+    ROUTE_REFS.clear()
+
+def is_traced_callable(callable_):
+    """ True when callable_ is defined in a traced module. Routes of functions
+    and classes are cached without keeping them alive. """
+    route = CALL_ROUTES.get(id(callable_), None)
+    if route is None:
+        route = (hasattr(callable_, '__module__') and
+                 callable_.__module__ in TRACED_MODULE_NAMES)
+        if type(callable_) in (types.FunctionType, type):
+            add_route(CALL_ROUTES, callable_, route)
+    return route
+
+def is_traced_value(value):
+    """ True when value is a class, or object of a class, of a traced module """
+    cls = value.__class__
+    try:
+        route = OBJECT_VALUE_ROUTES.get(cls, None)
+    except TypeError:
+        # class of an unhashable metaclass
+        route = None
+    if route is None:
+        route = OBJECT_VALUE_ROUTES.get(id(cls), None)
+    if route is None:
+        if issubclass(cls, type):
+            # value is a class, keyed on the value itself
+            route = CLASS_VALUE_ROUTES.get(id(value), None)
+            if route is None:
+                route = (value.__module__ in TRACED_MODULE_NAMES or
+                         cls.__module__ in TRACED_MODULE_NAMES)
+                add_route(CLASS_VALUE_ROUTES, value, route)
+            return route
+        route = cls.__module__ in TRACED_MODULE_NAMES
+        if type(cls) is type and not cls.__flags__ & HEAP_TYPE_FLAG:
+            OBJECT_VALUE_ROUTES[cls] = route
+        else:
+            add_route(OBJECT_VALUE_ROUTES, cls, route)
+    return route
+
+def trace_class(cls, has_members, tiered=None):
     assert(isinstance(type(cls), type))
     sighelper = signature_helper(cls.__init__)
     TRACED_CLASSES.add(cls)
-    setattr(has_members, cls.__name__, Class(cls))
+    setattr(has_members, cls.__name__, tier(Class(cls), tiered))
 
 
-def trace_modules(module_names):
-    """ Trace all classes and top-level functions of given module names """
+def tier(traced_callable, tiered):
+    """ With tiered calls, the traced function or class is traced for its first
+    tiered calls per input signature, then runs compiled (see jit module) """
+    if tiered is not None:
+        from jit import JitFunction
+        traced_callable._s('_tiered', JitFunction(traced_callable._value, 
+                                                  warmup=tiered))
+    return traced_callable
+
+
+def trace_modules(module_names, tiered=None):
+    """ Trace all classes and top-level functions of given module names.
+    With tiered=N, calls from untraced code are traced N times per input
+    signature, and then run compiled code of the trace. """
 
 
     def trace_module(module_name):
@@ -995,36 +1533,90 @@ def trace_modules(module_names):
                         else:
                             MODULES_WITH_UNTRACED_PARENTS.append((has_members,
                                                                   obj, 
-                                                                  untraced_parents))
+                                                                  untraced_parents,
+                                                                  tiered))
         trace_classes(module, to_process_classes)
         for has_members, cls in to_process_classes:
-            trace_class(cls, has_members)
+            trace_class(cls, has_members, tiered)
         for name, obj in inspect.getmembers(module):
             if inspect.isfunction(obj) and obj.__module__ == module_name:
-                setattr(module, name, Function(obj))
+                setattr(module, name, tier(Function(obj), tiered))
 
 
     def recheck_tracing_of_parents():
         to_recheck = MODULES_WITH_UNTRACED_PARENTS.copy()
         MODULES_WITH_UNTRACED_PARENTS.clear()
-        for has_members, obj, parents_to_recheck in to_recheck:
+        for has_members, obj, parents_to_recheck, obj_tiered in to_recheck:
             untraced_parents = parents_to_recheck - TRACED_CLASSES
             if not untraced_parents:
-                trace_class(cls, has_members)
+                # with the tiered setting of the call that found the class
+                trace_class(obj, has_members, obj_tiered)
             else:
                 MODULES_WITH_UNTRACED_PARENTS.append((has_members,
                                                       obj, 
-                                                      untraced_parents))
+                                                      untraced_parents,
+                                                      obj_tiered))
     for module_name in module_names:
         if (module_name not in TRACED_MODULE_NAMES and
             module_name not in ['traced']):
             TRACED_MODULE_NAMES.add(module_name)
+            clear_routes()
             trace_module(module_name)
     recheck_tracing_of_parents()
 
 # table to lookup symbol, precedence and arity of standard expression operators
+expression_support = build_expression_support()
 callable_name2symbol_precedence = \
-        build_expression_support()['callable_name2symbol_precedence_arity']
+        expression_support['callable_name2symbol_precedence_arity']
+callable_name2type_reflected = expression_support['callable_name2type_reflected']
+
+def make_builtin_op_classes():
+    """ One BuiltinOp1/BuiltinOp2 class per standard operator of the table """
+    def reflected(function):
+        return lambda v1, v2: function(v2, v1)
+
+    def op_function(name):
+        if name == '__divmod__':
+            return divmod
+        elif name == '__len__':
+            return len
+        else:
+            return getattr(operator, name)
+
+    def op_class(base, name, symbol, symbol_precedence, function):
+        if symbol is not None and symbol.isidentifier():
+            # abs, divmod are function like
+            symbol_precedence = CALL_PRECEDENCE
+        class_name = 'Op'+name.strip('_').capitalize()
+        return type(class_name, (base,), {
+            '__slots__': (),
+            '__module__': __name__,
+            '_name': name, 
+            '_symbol': symbol,
+            '_symbol_precedence': symbol_precedence,
+            '_function': staticmethod(function)})
+
+    op1_classes, op2_classes = dict(), dict()
+    for name, (symbol, precedence, arity) in callable_name2symbol_precedence.items():
+        op_type, reflected_name = callable_name2type_reflected[name]
+        if op_type == 'Unary':
+            op1_classes[name] = op_class(BuiltinOp1, name, symbol, precedence, 
+                                         op_function(name))
+        elif op_type in ('Binary Arithmetic', 'Binary Bitwise', 'Comparison'):
+            function = op_function(name)
+            op2_classes[name] = op_class(BuiltinOp2, name, symbol, precedence, 
+                                         function)
+            if reflected_name:
+                op2_classes[reflected_name] = op_class(BuiltinOp2, reflected_name,
+                                                       None, CALL_PRECEDENCE,
+                                                       reflected(function))
+    # operators without a symbol
+    op1_classes['__len__'] = op_class(BuiltinOp1, '__len__', None, CALL_PRECEDENCE, len)
+    op2_classes['__contains__'] = op_class(BuiltinOp2, '__contains__', None, 
+                                           CALL_PRECEDENCE, operator.contains)
+    return op1_classes, op2_classes
+
+BUILTIN_OP1_CLASSES, BUILTIN_OP2_CLASSES = make_builtin_op_classes()
 
 
 
@@ -84,6 +84,7 @@ right2left_ops = {'': '',
 
 def build_expression_support():
     callable_name2symbol_precedence_arity = {}
+    callable_name2type_reflected = {}
 
     f = io.StringIO(full_operator_data)
     reader = csv.reader(filter(lambda row: row.strip() and not row.startswith('#'), f))
@@ -96,7 +97,11 @@ def build_expression_support():
                 symbol, 
                 int(precedence), 
                 int(arity) if arity != 'Variadic' else None)
-    return { 'callable_name2symbol_precedence_arity' : callable_name2symbol_precedence_arity }
+        callable_name2type_reflected[callable_name] = (
+                op_type,
+                reflected_name if reflected_name else None)
+    return { 'callable_name2symbol_precedence_arity' : callable_name2symbol_precedence_arity,
+             'callable_name2type_reflected' : callable_name2type_reflected }
 
 
 def is_builtin(value):